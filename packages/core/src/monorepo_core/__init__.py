@@ -7,18 +7,158 @@ This package provides core functionality including:
 - Framework-level helpers
 """
 
-from monorepo_core.base import BaseRepository, BaseService
-from monorepo_core.decorators import cached, retry, timed
-from monorepo_core.utils import deep_merge, generate_id, slugify
+from monorepo_core.backends import (
+    CacheBackend,
+    RedisBackend,
+    SharedMemoryBackend,
+    SQLiteBackend,
+    TieredCache,
+)
+from monorepo_core.base import BaseEntity, BaseRepository, BaseService
+from monorepo_core.batching import BatchFunction, BatchLoader
+from monorepo_core.bulkhead import AIMDLimit, Bulkhead, ConcurrencyLimit, GradientLimit
+from monorepo_core.cache import Cache, CacheInfo, EvictionPolicy
+from monorepo_core.caching import CachedRepository
+from monorepo_core.decorators import batched, cached, limit_concurrency, rate_limit, retry, timed
+from monorepo_core.entities import EntityBatch, entity
+from monorepo_core.ids import (
+    IdEngine,
+    RandomIdEngine,
+    SnowflakeEngine,
+    UlidEngine,
+    UuidV7Engine,
+)
+from monorepo_core.lifecycle import ServiceRegistry
+from monorepo_core.memory import InMemoryRepository, Range, RepositorySnapshot
+from monorepo_core.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    LoggingExporter,
+    MetricsExporter,
+    MetricsRegistry,
+    PrometheusExporter,
+    StatsDExporter,
+    default_registry,
+)
+from monorepo_core.pool import ConnectionPool, PoolStats
+from monorepo_core.profiling import (
+    AdaptiveSampler,
+    EveryNthSampler,
+    ProbabilisticSampler,
+    ProfileCapture,
+    Sampler,
+    SlowCall,
+    SlowCallLog,
+    default_slow_log,
+)
+from monorepo_core.ratelimit import (
+    RateLimiter,
+    SharedTokenBucket,
+    SlidingWindowCounter,
+    SlidingWindowLog,
+    TokenBucket,
+)
+from monorepo_core.resilience import (
+    CircuitBreaker,
+    CircuitState,
+    Jitter,
+    RetryBudget,
+    backoff_delay,
+    circuit_breaker,
+)
+from monorepo_core.utils import (
+    ConflictStrategy,
+    ListStrategy,
+    achunked,
+    chunked,
+    deep_merge,
+    deep_merge_many,
+    generate_id,
+    generate_ids,
+    iter_flattened,
+    slugify,
+    slugify_many,
+    unflatten_dict,
+)
 
 __version__ = "0.1.0"
 __all__ = [
+    "AIMDLimit",
+    "AdaptiveSampler",
+    "BaseEntity",
     "BaseRepository",
     "BaseService",
+    "BatchFunction",
+    "BatchLoader",
+    "Bulkhead",
+    "Cache",
+    "CacheBackend",
+    "CacheInfo",
+    "CachedRepository",
+    "CircuitBreaker",
+    "CircuitState",
+    "ConcurrencyLimit",
+    "ConflictStrategy",
+    "ConnectionPool",
+    "Counter",
+    "EntityBatch",
+    "EveryNthSampler",
+    "EvictionPolicy",
+    "Gauge",
+    "GradientLimit",
+    "Histogram",
+    "IdEngine",
+    "InMemoryRepository",
+    "Jitter",
+    "ListStrategy",
+    "LoggingExporter",
+    "MetricsExporter",
+    "MetricsRegistry",
+    "PoolStats",
+    "ProbabilisticSampler",
+    "ProfileCapture",
+    "PrometheusExporter",
+    "RandomIdEngine",
+    "Range",
+    "RateLimiter",
+    "RedisBackend",
+    "RepositorySnapshot",
+    "RetryBudget",
+    "SQLiteBackend",
+    "Sampler",
+    "ServiceRegistry",
+    "SharedMemoryBackend",
+    "SharedTokenBucket",
+    "SlidingWindowCounter",
+    "SlidingWindowLog",
+    "SlowCall",
+    "SlowCallLog",
+    "SnowflakeEngine",
+    "StatsDExporter",
+    "TieredCache",
+    "TokenBucket",
+    "UlidEngine",
+    "UuidV7Engine",
+    "achunked",
+    "backoff_delay",
+    "batched",
     "cached",
+    "chunked",
+    "circuit_breaker",
     "deep_merge",
+    "deep_merge_many",
+    "default_registry",
+    "default_slow_log",
+    "entity",
     "generate_id",
+    "generate_ids",
+    "iter_flattened",
+    "limit_concurrency",
+    "rate_limit",
     "retry",
     "slugify",
+    "slugify_many",
     "timed",
+    "unflatten_dict",
 ]
@@ -0,0 +1,34 @@
+"""Reset process-local state in children created with ``os.fork()``.
+
+Locks held by other threads at fork time stay locked forever in the child,
+and worker threads, event-loop tasks and database connections do not carry
+over. Objects owning such state register here and get a hook invoked in the
+child right after the fork.
+"""
+
+import os
+import weakref
+from typing import Protocol
+
+
+class ForkAware(Protocol):
+    """Object that rebuilds its process-local state after a fork."""
+
+    def _after_fork_in_child(self) -> None: ...
+
+
+_registered: "weakref.WeakSet[ForkAware]" = weakref.WeakSet()
+
+
+def register(obj: ForkAware) -> None:
+    """Call ``obj._after_fork_in_child()`` in every future forked child."""
+    _registered.add(obj)
+
+
+def _reset_in_child() -> None:
+    for obj in list(_registered):
+        obj._after_fork_in_child()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_in_child)
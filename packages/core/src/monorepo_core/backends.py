@@ -0,0 +1,420 @@
+"""Storage backends for sharing cached values across processes and restarts.
+
+Values are pickled by the out-of-process backends, so their storage must be
+trusted: anyone able to write to it can execute code in the reader.
+"""
+
+import hashlib
+import mmap
+import os
+import pickle
+import sqlite3
+import struct
+import threading
+import time
+from collections.abc import Hashable, Iterator, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Protocol, runtime_checkable
+
+from monorepo_core import _fork
+from monorepo_core.cache import _MISSING
+
+_SEGMENT_MAGIC = b"MCSHM001"
+_SEGMENT_HEADER = struct.Struct("<8sII")
+_SLOT_HEADER = struct.Struct("<16sdI")
+_EMPTY_DIGEST = bytes(16)
+_MAX_PROBES = 8
+
+
+@runtime_checkable
+class CacheBackend(Protocol):
+    """Storage tier for cached values.
+
+    :class:`~monorepo_core.cache.Cache` satisfies this protocol and serves as
+    the in-process tier.
+    """
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """Return the value stored under ``key``, or ``default``."""
+        ...
+
+    def set(self, key: Any, value: Any, ttl_seconds: float | None = None) -> bool:
+        """Store ``value`` under ``key``, returning whether it was stored."""
+        ...
+
+    def invalidate(self, key: Any) -> bool:
+        """Remove ``key``, returning whether it was present."""
+        ...
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        ...
+
+
+def _expiry(ttl_seconds: float | None) -> float:
+    return time.time() + ttl_seconds if ttl_seconds is not None else float("inf")
+
+
+def _import_fcntl(feature: str) -> ModuleType:
+    """Import ``fcntl`` for ``feature``, which needs POSIX record locks."""
+    try:
+        import fcntl  # noqa: PLC0415
+    except ImportError as e:
+        raise ImportError(f"{feature} requires POSIX file locking (fcntl)") from e
+    return fcntl
+
+
+class SharedMemoryBackend:
+    """Cross-process cache in a memory-mapped file.
+
+    The file holds a fixed number of equally sized slots addressed by a hash
+    of the key, with linear probing over a short window. When the window is
+    full, the entry closest to expiry is overwritten. Access is serialized
+    with a thread lock plus a POSIX record lock on the file, so every worker
+    on the host that maps the same path shares the same entries, including
+    workers forked after the segment was opened. Placing the file under
+    ``/dev/shm`` keeps it in memory; any other path also survives restarts.
+    Requires POSIX file locking; elsewhere the constructor raises
+    ``ImportError``.
+
+    Args:
+        path: File backing the segment. Created if missing.
+        slots: Number of entries the segment can hold.
+        slot_size: Bytes per slot, including a 28-byte header. Pickled values
+            that do not fit are not stored.
+        ttl_seconds: Default time-to-live for entries, or None for no expiry.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        slots: int = 4096,
+        slot_size: int = 4096,
+        ttl_seconds: float | None = None,
+    ) -> None:
+        if slots < 1:
+            raise ValueError("slots must be at least 1")
+        if slot_size <= _SLOT_HEADER.size:
+            raise ValueError(f"slot_size must exceed {_SLOT_HEADER.size} bytes")
+
+        self.path = Path(path)
+        self.slots = slots
+        self.slot_size = slot_size
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        size = _SEGMENT_HEADER.size + slots * slot_size
+
+        self._fcntl = _import_fcntl("SharedMemoryBackend")
+        self._lock = threading.Lock()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked(exclusive=True):
+            if os.fstat(self._fd).st_size != size:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, _SEGMENT_HEADER.pack(_SEGMENT_MAGIC, slots, slot_size), 0)
+            magic, stored_slots, stored_size = _SEGMENT_HEADER.unpack(
+                os.pread(self._fd, _SEGMENT_HEADER.size, 0)
+            )
+            if (magic, stored_slots, stored_size) != (_SEGMENT_MAGIC, slots, slot_size):
+                raise ValueError(f"{self.path} holds an incompatible cache segment")
+        self._map = mmap.mmap(self._fd, size)
+        _fork.register(self)
+
+    def close(self) -> None:
+        """Unmap the segment and close its file."""
+        self._map.close()
+        os.close(self._fd)
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        # Record locks are per process, so the thread lock guards within one.
+        with self._lock:
+            fcntl = self._fcntl
+            fcntl.lockf(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def _after_fork_in_child(self) -> None:
+        # The mapping stays shared with the parent; only the thread lock is reset.
+        self._lock = threading.Lock()
+
+    def _probe(self, digest: bytes) -> Iterator[int]:
+        start = int.from_bytes(digest[:8], "little") % self.slots
+        for i in range(min(_MAX_PROBES, self.slots)):
+            yield _SEGMENT_HEADER.size + ((start + i) % self.slots) * self.slot_size
+
+    @staticmethod
+    def _digest(key: Any) -> bytes:
+        return hashlib.blake2b(str(key).encode(), digest_size=16).digest()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """Return the value stored under ``key``, or ``default``."""
+        digest = self._digest(key)
+        with self._locked(exclusive=False):
+            for offset in self._probe(digest):
+                slot_digest, expires_at, length = _SLOT_HEADER.unpack_from(self._map, offset)
+                if slot_digest == _EMPTY_DIGEST:
+                    break
+                if slot_digest == digest:
+                    if expires_at <= time.time():
+                        break
+                    start = offset + _SLOT_HEADER.size
+                    payload = self._map[start : start + length]
+                    return pickle.loads(payload)
+        return default
+
+    def set(self, key: Any, value: Any, ttl_seconds: float | None = None) -> bool:
+        """Store ``value`` under ``key``, overwriting the entry nearest expiry if full."""
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.slot_size - _SLOT_HEADER.size:
+            return False
+        digest = self._digest(key)
+        expires_at = _expiry(self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        now = time.time()
+
+        with self._locked(exclusive=True):
+            target: int | None = None
+            occupied: list[tuple[float, int]] = []
+            for offset in self._probe(digest):
+                slot_digest, slot_expires_at, _ = _SLOT_HEADER.unpack_from(self._map, offset)
+                if slot_digest in (digest, _EMPTY_DIGEST):
+                    target = offset
+                    break
+                occupied.append((slot_expires_at, offset))
+            if target is None:
+                # Reuse an expired slot, or else evict the one expiring soonest.
+                slot_expires_at, target = min(occupied)
+                if slot_expires_at > now:
+                    self.evictions += 1
+
+            start = target + _SLOT_HEADER.size
+            self._map[start : start + len(payload)] = payload
+            _SLOT_HEADER.pack_into(self._map, target, digest, expires_at, len(payload))
+        return True
+
+    def invalidate(self, key: Any) -> bool:
+        """Remove ``key``, returning whether it was present."""
+        digest = self._digest(key)
+        with self._locked(exclusive=True):
+            for offset in self._probe(digest):
+                slot_digest, expires_at, _ = _SLOT_HEADER.unpack_from(self._map, offset)
+                if slot_digest == _EMPTY_DIGEST:
+                    break
+                if slot_digest == digest:
+                    # Keep the digest as a tombstone so later probe chains stay intact.
+                    _SLOT_HEADER.pack_into(self._map, offset, digest, 0.0, 0)
+                    was_live: bool = expires_at > time.time()
+                    return was_live
+        return False
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._locked(exclusive=True):
+            start = _SEGMENT_HEADER.size
+            self._map[start:] = bytes(len(self._map) - start)
+
+
+class SQLiteBackend:
+    """On-disk cache in a SQLite database, for results that survive restarts.
+
+    The database runs in WAL mode so several processes can share it, and
+    forked children reconnect automatically. Expired rows are dropped when
+    read and by :meth:`purge`.
+
+    Args:
+        path: Database file. Created if missing.
+        ttl_seconds: Default time-to-live for entries, or None for no expiry.
+        table: Name of the table holding the entries.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        ttl_seconds: float | None = None,
+        table: str = "cache",
+    ) -> None:
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table!r}")
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self._table = table
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        _fork.register(self)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _after_fork_in_child(self) -> None:
+        # SQLite connections must not be used across fork; open a fresh one.
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._conn.close()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """Return the value stored under ``key``, or ``default``."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self._table} WHERE key = ?", (str(key),)
+            ).fetchone()
+            if row is None:
+                return default
+            if row[1] <= time.time():
+                self._conn.execute(f"DELETE FROM {self._table} WHERE key = ?", (str(key),))
+                return default
+        return pickle.loads(row[0])
+
+    def set(self, key: Any, value: Any, ttl_seconds: float | None = None) -> bool:
+        """Store ``value`` under ``key``."""
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        expires_at = _expiry(self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (str(key), payload, expires_at),
+            )
+        return True
+
+    def invalidate(self, key: Any) -> bool:
+        """Remove ``key``, returning whether it was present."""
+        with self._lock:
+            cursor = self._conn.execute(f"DELETE FROM {self._table} WHERE key = ?", (str(key),))
+        return cursor.rowcount > 0
+
+    def purge(self) -> int:
+        """Delete expired rows, returning how many were removed."""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM {self._table} WHERE expires_at <= ?", (time.time(),)
+            )
+        return cursor.rowcount
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self._table}")
+
+
+class RedisClient(Protocol):
+    """Subset of the ``redis.Redis`` client API used by :class:`RedisBackend`."""
+
+    def get(self, name: str) -> bytes | None: ...
+
+    def set(self, name: str, value: bytes, px: int | None = None) -> Any: ...
+
+    def delete(self, *names: str) -> int: ...
+
+    def scan_iter(self, match: str | None = None) -> Iterator[Any]: ...
+
+
+class RedisBackend:
+    """Cache backed by Redis or any server speaking its protocol.
+
+    Args:
+        client: A ``redis.Redis`` instance or compatible client.
+        ttl_seconds: Default time-to-live for entries, or None for no expiry.
+        prefix: Prefix for every key, so :meth:`clear` only touches this cache.
+    """
+
+    def __init__(
+        self,
+        client: RedisClient,
+        ttl_seconds: float | None = None,
+        prefix: str = "cache:",
+    ) -> None:
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "RedisBackend":
+        """Create a backend from a URL such as ``Settings.redis_url``.
+
+        Requires the ``redis`` package (``monorepo-core[redis]``).
+        """
+        try:
+            import redis  # noqa: PLC0415
+        except ImportError as e:
+            raise ImportError(
+                "RedisBackend.from_url requires the 'redis' package: install monorepo-core[redis]"
+            ) from e
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """Return the value stored under ``key``, or ``default``."""
+        payload = self.client.get(f"{self.prefix}{key}")
+        return default if payload is None else pickle.loads(payload)
+
+    def set(self, key: Any, value: Any, ttl_seconds: float | None = None) -> bool:
+        """Store ``value`` under ``key``."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        px = max(1, int(ttl * 1000)) if ttl is not None else None
+        self.client.set(f"{self.prefix}{key}", payload, px=px)
+        return True
+
+    def invalidate(self, key: Any) -> bool:
+        """Remove ``key``, returning whether it was present."""
+        return self.client.delete(f"{self.prefix}{key}") > 0
+
+    def clear(self) -> None:
+        """Remove every entry under this backend's prefix."""
+        keys = list(self.client.scan_iter(match=f"{self.prefix}*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class TieredCache:
+    """Chains backends from fastest to slowest.
+
+    Lookups try each tier in order; a hit in a lower tier is copied into
+    every tier above it so hot entries migrate towards the fastest one.
+    Writes and invalidations go to every tier.
+
+    Args:
+        tiers: Backends ordered from fastest to slowest.
+    """
+
+    def __init__(self, tiers: Sequence[CacheBackend]) -> None:
+        if not tiers:
+            raise ValueError("TieredCache needs at least one tier")
+        self.tiers = list(tiers)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the value from the fastest tier holding ``key``, or ``default``."""
+        for depth, tier in enumerate(self.tiers):
+            value = tier.get(key, _MISSING)
+            if value is not _MISSING:
+                for upper in self.tiers[:depth]:
+                    upper.set(key, value)
+                return value
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: float | None = None) -> bool:
+        """Store ``value`` in every tier, returning whether any tier kept it."""
+        stored = [tier.set(key, value, ttl_seconds) for tier in self.tiers]
+        return any(stored)
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Remove ``key`` from every tier, returning whether any tier held it."""
+        removed = [tier.invalidate(key) for tier in self.tiers]
+        return any(removed)
+
+    def clear(self) -> None:
+        """Clear every tier."""
+        for tier in self.tiers:
+            tier.clear()
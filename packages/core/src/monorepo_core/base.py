@@ -1,7 +1,10 @@
 """Base classes for services and repositories."""
 
 from abc import ABC, abstractmethod
-from typing import Any, Generic, TypeVar
+from collections.abc import AsyncIterator, Iterable, Mapping
+from typing import Any, ClassVar, Generic, TypeVar
+
+from monorepo_shared.types import CursorPaginated, CursorParams
 
 T = TypeVar("T")
 ID = TypeVar("ID")
@@ -27,9 +30,17 @@ class BaseService(ABC):
 class BaseRepository(ABC, Generic[T, ID]):
     """Abstract base class for repositories.
 
-    Provides a common interface for data access operations.
+    Provides a common interface for data access operations. The bulk and
+    streaming methods have default implementations built on the
+    single-entity methods; override them to use the store's own bulk I/O.
+
+    Attributes:
+        id_field: Attribute holding an entity's ID, used as the tie-breaker
+            in cursor pagination.
     """
 
+    id_field: ClassVar[str] = "id"
+
     @abstractmethod
     async def get(self, id: ID) -> T | None:
         """Get an entity by ID."""
@@ -60,9 +71,152 @@ class BaseRepository(ABC, Generic[T, ID]):
         """Check if an entity exists."""
         ...
 
+    async def get_many(self, ids: Iterable[ID]) -> list[T | None]:
+        """Get entities by ID, in the order of ``ids``, with ``None`` for missing ones."""
+        return [await self.get(id) for id in ids]
+
+    async def create_many(self, entities: Iterable[T]) -> list[T]:
+        """Create several entities."""
+        return [await self.create(entity) for entity in entities]
+
+    async def update_many(self, entities: Mapping[ID, T]) -> list[T | None]:
+        """Update entities by ID, with ``None`` for those that do not exist."""
+        return [await self.update(id, entity) for id, entity in entities.items()]
+
+    async def delete_many(self, ids: Iterable[ID]) -> int:
+        """Delete entities by ID and return how many were deleted."""
+        deleted = 0
+        for id in ids:
+            deleted += await self.delete(id)
+        return deleted
+
+    async def upsert_many(self, entities: Mapping[ID, T]) -> list[T]:
+        """Update the entities that exist and create the others."""
+        results = []
+        for id, entity in entities.items():
+            updated = await self.update(id, entity) if await self.exists(id) else None
+            results.append(updated if updated is not None else await self.create(entity))
+        return results
+
+    async def get_page(self, offset: int, limit: int) -> list[T]:
+        """Get up to ``limit`` entities starting at ``offset``.
+
+        The default slices :meth:`get_all`; override it with a paginated
+        query so :meth:`stream` does not load every entity at once.
+        """
+        return (await self.get_all())[offset : offset + limit]
+
+    async def stream(self, chunk_size: int = 1000) -> AsyncIterator[list[T]]:
+        """Iterate over all entities in chunks of up to ``chunk_size``.
+
+        Chunks are fetched with :meth:`get_page` if a subclass overrides it.
+        Otherwise :meth:`get_all` is called once and its result split, since
+        the default :meth:`get_page` would load every entity per chunk.
+
+        Raises:
+            ValueError: If ``chunk_size`` is less than 1.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        if type(self).get_page is BaseRepository.get_page:
+            entities = await self.get_all()
+            for start in range(0, len(entities), chunk_size):
+                yield entities[start : start + chunk_size]
+            return
+        offset = 0
+        while True:
+            chunk = await self.get_page(offset, chunk_size)
+            if chunk:
+                yield chunk
+            if len(chunk) < chunk_size:
+                return
+            offset += chunk_size
+
+    async def iter_all(self, chunk_size: int = 1000) -> AsyncIterator[T]:
+        """Iterate over all entities, fetching ``chunk_size`` at a time."""
+        async for chunk in self.stream(chunk_size):
+            for entity in chunk:
+                yield entity
+
+    def cursor_key(self, entity: T, sort_by: str | None = None) -> tuple[Any, ...]:
+        """Sort key values of ``entity``: the sort field, then its ID."""
+        id = getattr(entity, self.id_field)
+        return (id,) if sort_by is None else (getattr(entity, sort_by), id)
+
+    async def get_after(
+        self,
+        after: tuple[Any, ...] | None,
+        limit: int,
+        *,
+        sort_by: str | None = None,
+        descending: bool = False,
+    ) -> list[T]:
+        """Get up to ``limit`` entities whose :meth:`cursor_key` sorts after ``after``.
+
+        This is the keyset query behind :meth:`paginate_by_cursor`. The
+        default sorts :meth:`get_all`; override it with an indexed query
+        such as ``WHERE (name, id) > (:name, :id) ORDER BY name, id LIMIT
+        :limit`` so every page costs the same however deep it is.
+        """
+
+        def key(entity: T) -> tuple[tuple[bool, Any], ...]:
+            return _none_last(self.cursor_key(entity, sort_by))
+
+        entities = sorted(await self.get_all(), key=key, reverse=descending)
+        if after is not None:
+            bound = _none_last(after)
+            entities = [
+                entity
+                for entity in entities
+                if (key(entity) < bound if descending else key(entity) > bound)
+            ]
+        return entities[:limit]
+
+    async def paginate_by_cursor(
+        self,
+        params: CursorParams,
+        *,
+        secret: str | bytes | None = None,
+    ) -> CursorPaginated[T]:
+        """Get the page of entities following ``params.cursor``.
+
+        Args:
+            params: Cursor, page size and sort of the request.
+            secret: Key for signing and verifying cursors.
+
+        Returns:
+            The page, with a cursor for the next one if there is more.
+
+        Raises:
+            ValidationError: If the cursor is invalid or was issued for a
+                different sort.
+        """
+        cursor = params.decode_cursor(secret)
+        items = await self.get_after(
+            cursor.values if cursor else None,
+            params.page_size + 1,
+            sort_by=params.sort_by,
+            descending=params.sort_order == "desc",
+        )
+        return CursorPaginated.create(
+            items, params, lambda entity: self.cursor_key(entity, params.sort_by), secret=secret
+        )
+
+
+def _none_last(values: tuple[Any, ...]) -> tuple[tuple[bool, Any], ...]:
+    """Order key placing ``None`` after all other values, as it cannot be compared."""
+    return tuple((value is None, value) for value in values)
+
 
 class BaseEntity:
-    """Base class for domain entities."""
+    """Base class for domain entities.
+
+    The ID is kept in a slot rather than an instance ``__dict__``; declare
+    ``__slots__`` in subclasses too to keep instances compact, or use
+    :func:`~monorepo_core.entities.entity` for dataclass-style entities.
+    """
+
+    __slots__ = ("_id",)
 
     def __init__(self, id: Any | None = None) -> None:
         self._id = id
@@ -0,0 +1,166 @@
+"""Coalescing of individual async loads into bulk calls.
+
+A :class:`BatchLoader` collects the keys requested by concurrent coroutines
+during one event-loop tick (or a short window), calls a bulk function once
+with the distinct keys, and resolves each caller with its own result. This
+turns ``N`` concurrent ``get(id)`` round trips into one ``get_many(ids)``.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable, Iterable, Mapping, Sequence
+from typing import Generic, TypeVar, cast
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+BatchFunction = Callable[[list[K]], Awaitable[Sequence[V | BaseException] | Mapping[K, V]]]
+"""Bulk loader: receives distinct keys and returns results in the same order,
+or a mapping from key to result. Exception instances fail only their key."""
+
+
+class _Batch(Generic[K, V]):
+    __slots__ = ("futures", "handle", "loop")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.futures: dict[K, asyncio.Future[V]] = {}
+        self.handle: asyncio.Handle | None = None
+
+
+class BatchLoader(Generic[K, V]):
+    """Loads values by key, batching and deduplicating concurrent requests.
+
+    Keys requested while a batch is open join it; the batch is dispatched on
+    the next loop iteration, after ``max_wait`` seconds, or as soon as it
+    holds ``max_batch_size`` keys. A key requested several times in one batch
+    is loaded once. With ``cache=True`` results are also remembered for the
+    loader's lifetime, DataLoader-style, so create one loader per request or
+    unit of work; failed keys are never cached.
+
+    Args:
+        load_batch: Bulk function, see :data:`BatchFunction`. Keys missing
+            from a returned mapping resolve to ``None``.
+        max_batch_size: Most keys passed to one call of ``load_batch``.
+        max_wait: Seconds to keep a batch open; ``0`` dispatches on the next
+            loop iteration.
+        cache: Whether to reuse results across batches.
+    """
+
+    def __init__(
+        self,
+        load_batch: BatchFunction[K, V],
+        *,
+        max_batch_size: int = 100,
+        max_wait: float = 0.0,
+        cache: bool = False,
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_wait < 0:
+            raise ValueError("max_wait must not be negative")
+        self.load_batch = load_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._cache: dict[K, asyncio.Future[V]] | None = {} if cache else None
+        self._cache_loop: asyncio.AbstractEventLoop | None = None
+        self._batch: _Batch[K, V] | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def load(self, key: K) -> V:
+        """Load the value for ``key``."""
+        # Shielded so one cancelled caller does not fail others sharing the key.
+        return await asyncio.shield(self._future(key))
+
+    __call__ = load
+
+    async def load_many(self, keys: Iterable[K]) -> list[V]:
+        """Load several values, in the order of ``keys``."""
+        futures = [self._future(key) for key in keys]
+        return list(await asyncio.shield(asyncio.gather(*futures)))
+
+    def prime(self, key: K, value: V) -> None:
+        """Put a known value in the cache, if caching is enabled."""
+        if self._cache is not None and key not in self._cache:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+            self._cache[key] = future
+
+    def clear(self, key: K | None = None) -> None:
+        """Forget the cached value for ``key``, or every cached value."""
+        if self._cache is None:
+            return
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(key, None)
+
+    def _future(self, key: K) -> asyncio.Future[V]:
+        loop = asyncio.get_running_loop()
+        if self._cache is not None:
+            if self._cache_loop is not loop:
+                self._cache.clear()
+                self._cache_loop = loop
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+
+        batch = self._batch
+        if batch is None or batch.loop is not loop:
+            batch = self._batch = _Batch(loop)
+            if self.max_wait:
+                batch.handle = loop.call_later(self.max_wait, self._dispatch, batch)
+            else:
+                batch.handle = loop.call_soon(self._dispatch, batch)
+        future = batch.futures.get(key)
+        if future is None:
+            future = batch.futures[key] = loop.create_future()
+            if len(batch.futures) >= self.max_batch_size:
+                if batch.handle is not None:
+                    batch.handle.cancel()
+                self._dispatch(batch)
+        if self._cache is not None:
+            self._cache[key] = future
+        return future
+
+    def _dispatch(self, batch: _Batch[K, V]) -> None:
+        if self._batch is batch:
+            self._batch = None
+        task = batch.loop.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: _Batch[K, V]) -> None:
+        keys = list(batch.futures)
+        try:
+            results = await self.load_batch(keys)
+            if isinstance(results, Mapping):
+                values: list[V | BaseException] = [cast("V", results.get(key)) for key in keys]
+            else:
+                values = list(results)
+                if len(values) != len(keys):
+                    raise ValueError(
+                        f"load_batch returned {len(values)} results for {len(keys)} keys"
+                    )
+        except Exception as e:
+            values = [e] * len(keys)
+        except BaseException:
+            # Cancelled or interrupted: callers awaiting the batch must not
+            # wait forever, and shielded callers cannot give up on their own.
+            for key, future in batch.futures.items():
+                if not future.done():
+                    future.cancel()
+                    self._forget_failed(key, future)
+            raise
+        for key, value in zip(keys, values, strict=True):
+            future = batch.futures[key]
+            if future.done():
+                continue
+            if isinstance(value, BaseException):
+                future.set_exception(value)
+                self._forget_failed(key, future)
+            else:
+                future.set_result(value)
+
+    def _forget_failed(self, key: K, future: asyncio.Future[V]) -> None:
+        if self._cache is not None and self._cache.get(key) is future:
+            del self._cache[key]
@@ -0,0 +1,330 @@
+"""Concurrency limits (bulkheads) with bounded queues and adaptive limits.
+
+A :class:`Bulkhead` admits up to ``limit`` concurrent calls and queues the
+rest, shedding load once the queue is full or a caller has waited too long.
+The limit can follow an :class:`AIMDLimit` or :class:`GradientLimit` that
+shrinks it when latency rises, so a slow dependency is given less work
+instead of an ever-growing backlog.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Callable
+from typing import Protocol, TypeVar
+
+from monorepo_core import _fork
+from monorepo_core.metrics import MetricsRegistry, default_registry
+from monorepo_shared.errors import BulkheadFullError
+
+
+class ConcurrencyLimit(Protocol):
+    """Algorithm adjusting a concurrency limit from observed calls."""
+
+    @property
+    def limit(self) -> int:
+        """Current limit."""
+        ...
+
+    def update(self, latency: float, in_flight: int, dropped: bool) -> int:
+        """Account for a finished call and return the new limit.
+
+        Args:
+            latency: Seconds the call took, excluding time spent queued.
+            in_flight: Calls running when it finished, itself included.
+            dropped: Whether the call timed out.
+        """
+        ...
+
+
+class AIMDLimit:
+    """Additive-increase, multiplicative-decrease limit.
+
+    The limit grows by one after a successful call while at least half of it
+    is in use, and is multiplied by ``backoff_ratio`` when a call times out
+    or takes longer than ``latency_threshold``.
+    """
+
+    def __init__(
+        self,
+        initial: int = 10,
+        *,
+        min_limit: int = 1,
+        max_limit: int = 1000,
+        backoff_ratio: float = 0.9,
+        latency_threshold: float | None = None,
+    ) -> None:
+        if not 1 <= min_limit <= initial <= max_limit:
+            raise ValueError("limits must satisfy 1 <= min_limit <= initial <= max_limit")
+        if not 0.0 < backoff_ratio < 1.0:
+            raise ValueError("backoff_ratio must be in (0, 1)")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_threshold = latency_threshold
+        self._limit = initial
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    def update(self, latency: float, in_flight: int, dropped: bool) -> int:
+        if dropped or (self.latency_threshold is not None and latency > self.latency_threshold):
+            self._limit = max(self.min_limit, int(self._limit * self.backoff_ratio))
+        elif in_flight * 2 >= self._limit:
+            self._limit = min(self.max_limit, self._limit + 1)
+        return self._limit
+
+
+class GradientLimit:
+    """Limit following the ratio of long-term to recent latency.
+
+    While recent latency matches the long-term average the limit grows by
+    about its square root, leaving room for a small queue; when recent
+    latency rises the limit shrinks in proportion, down to half per update.
+    """
+
+    def __init__(
+        self,
+        initial: int = 10,
+        *,
+        min_limit: int = 1,
+        max_limit: int = 1000,
+        smoothing: float = 0.2,
+        tolerance: float = 1.5,
+        long_window: int = 600,
+    ) -> None:
+        if not 1 <= min_limit <= initial <= max_limit:
+            raise ValueError("limits must satisfy 1 <= min_limit <= initial <= max_limit")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        self._long_alpha = 2.0 / (long_window + 1)
+        self._estimate = float(initial)
+        self._long_rtt = 0.0
+
+    @property
+    def limit(self) -> int:
+        return int(self._estimate)
+
+    def update(self, latency: float, in_flight: int, dropped: bool) -> int:
+        if dropped:
+            self._estimate = max(self.min_limit, self._estimate / 2)
+            return self.limit
+        if not self._long_rtt:
+            self._long_rtt = latency
+        self._long_rtt += self._long_alpha * (latency - self._long_rtt)
+        gradient = max(0.5, min(1.0, self.tolerance * self._long_rtt / max(latency, 1e-9)))
+        if gradient == 1.0 and in_flight * 2 < self._estimate:
+            return self.limit  # not using the limit, so latency says nothing about it
+        target = self._estimate * gradient + math.sqrt(self._estimate)
+        estimate = self._estimate + self.smoothing * (target - self._estimate)
+        self._estimate = min(max(estimate, self.min_limit), self.max_limit)
+        return self.limit
+
+
+class _Waiter(ABC):
+    __slots__ = ("granted",)
+
+    def __init__(self) -> None:
+        self.granted = False
+
+    @abstractmethod
+    def wake(self) -> None:
+        """Let the waiting thread or task proceed."""
+        ...
+
+
+class _ThreadWaiter(_Waiter):
+    __slots__ = ("event",)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.event = threading.Event()
+
+    def wake(self) -> None:
+        self.event.set()
+
+
+class _TaskWaiter(_Waiter):
+    __slots__ = ("future", "loop")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        super().__init__()
+        self.loop = loop
+        self.future: asyncio.Future[None] = loop.create_future()
+
+    def wake(self) -> None:
+        # Slots may be released from another thread than the waiter's loop.
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+W = TypeVar("W", bound=_Waiter)
+
+
+class Bulkhead:
+    """Limits concurrent calls, queueing and then shedding the excess.
+
+    One bulkhead can be shared by threads and event loops alike. Waiters are
+    admitted in FIFO order. Queue depth, calls in flight and the current
+    limit are published as ``bulkhead_*`` gauges, rejections as a counter and
+    time spent queued as a histogram, all labelled with the bulkhead name.
+
+    Args:
+        limit: Maximum concurrent calls, or an adaptive limit.
+        max_queue: Maximum callers waiting for a slot; ``None`` is
+            unbounded and ``0`` rejects as soon as the limit is reached.
+        queue_timeout: Seconds a caller may wait before being rejected.
+        name: Label for metrics and errors.
+        registry: Registry for metrics. Defaults to
+            :data:`~monorepo_core.metrics.default_registry`.
+    """
+
+    def __init__(
+        self,
+        limit: int | ConcurrencyLimit = 10,
+        *,
+        max_queue: int | None = None,
+        queue_timeout: float | None = None,
+        name: str = "default",
+        registry: MetricsRegistry | None = None,
+    ) -> None:
+        self.adaptive = None if isinstance(limit, int) else limit
+        self._limit = limit if isinstance(limit, int) else limit.limit
+        if self._limit < 1:
+            raise ValueError("limit must be at least 1")
+        if max_queue is not None and max_queue < 0:
+            raise ValueError("max_queue must not be negative")
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.name = name
+        registry = registry or default_registry
+        self._queue_gauge = registry.gauge("bulkhead_queue_depth", bulkhead=name)
+        self._in_flight_gauge = registry.gauge("bulkhead_in_flight", bulkhead=name)
+        self._limit_gauge = registry.gauge("bulkhead_limit", bulkhead=name)
+        self._rejected = registry.counter("bulkhead_rejected", bulkhead=name)
+        self._queue_wait = registry.histogram("bulkhead_queue_wait_seconds", bulkhead=name)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters: deque[_Waiter] = deque()
+        self._limit_gauge.set(self._limit)
+        _fork.register(self)
+
+    @property
+    def limit(self) -> int:
+        """Current concurrency limit."""
+        return self._limit
+
+    @property
+    def in_flight(self) -> int:
+        """Calls currently holding a slot."""
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """Callers waiting for a slot."""
+        return len(self._waiters)
+
+    def acquire(self) -> None:
+        """Take a slot, blocking the thread while queued.
+
+        Raises:
+            BulkheadFullError: If the queue is full or the wait timed out.
+        """
+        waiter = self._enqueue(_ThreadWaiter)
+        if waiter is None:
+            return
+        start = time.perf_counter()
+        waiter.event.wait(self.queue_timeout)
+        self._admit_or_reject(waiter, start)
+
+    async def acquire_async(self) -> None:
+        """Take a slot, suspending the coroutine while queued.
+
+        Raises:
+            BulkheadFullError: If the queue is full or the wait timed out.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = self._enqueue(lambda: _TaskWaiter(loop))
+        if waiter is None:
+            return
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await waiter.future
+        except TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.granted:
+                    self._release_locked()
+                else:
+                    self._waiters.remove(waiter)
+                    self._publish_locked()
+            raise
+        self._admit_or_reject(waiter, start)
+
+    def release(self, latency: float = 0.0, *, dropped: bool = False) -> None:
+        """Return a slot, feeding the call's outcome to an adaptive limit.
+
+        Args:
+            latency: Seconds the call took.
+            dropped: Whether the call timed out.
+        """
+        with self._lock:
+            if self.adaptive is not None:
+                self._limit = max(self.adaptive.update(latency, self._in_flight, dropped), 1)
+            self._release_locked()
+
+    def _enqueue(self, make_waiter: Callable[[], W]) -> W | None:
+        """Take a free slot and return ``None``, or queue a waiter."""
+        with self._lock:
+            if self._in_flight < self._limit and not self._waiters:
+                self._in_flight += 1
+                self._in_flight_gauge.set(self._in_flight)
+                return None
+            if self.max_queue is not None and len(self._waiters) >= self.max_queue:
+                self._rejected.inc()
+                raise BulkheadFullError(self.name, "queue full")
+            waiter = make_waiter()
+            self._waiters.append(waiter)
+            self._queue_gauge.set(len(self._waiters))
+            return waiter
+
+    def _admit_or_reject(self, waiter: _Waiter, start: float) -> None:
+        with self._lock:
+            if not waiter.granted:
+                self._waiters.remove(waiter)
+                self._queue_gauge.set(len(self._waiters))
+                self._rejected.inc()
+                raise BulkheadFullError(self.name, "queue timeout")
+        self._queue_wait.record(time.perf_counter() - start)
+
+    def _release_locked(self) -> None:
+        self._in_flight -= 1
+        while self._waiters and self._in_flight < self._limit:
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+            self._in_flight += 1
+            waiter.wake()
+        self._publish_locked()
+
+    def _publish_locked(self) -> None:
+        self._queue_gauge.set(len(self._waiters))
+        self._in_flight_gauge.set(self._in_flight)
+        self._limit_gauge.set(self._limit)
+
+    def _after_fork_in_child(self) -> None:
+        # Slot holders and waiters belong to threads that did not survive.
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters = deque()
@@ -0,0 +1,693 @@
+"""Bounded in-memory cache engine with pluggable eviction policies."""
+
+import hashlib
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import Any, Protocol
+
+from monorepo_core import _fork
+
+_MISSING: Any = object()
+_FAST_KEY_TYPES = frozenset({int, str, bytes, float, bool, type(None)})
+
+# Lookup table used to halve every counter of a sketch row in one pass.
+_HALVE = bytes(i >> 1 for i in range(256))
+_SKETCH_SEEDS = (
+    0x9E3779B97F4A7C15,
+    0xC2B2AE3D27D4EB4F,
+    0x165667B19E3779F9,
+    0xD6E8FEB86659FD93,
+)
+_SKETCH_MAX_COUNT = 15
+_MASK_64 = (1 << 64) - 1
+_MAX_DEFAULT_SHARDS = 16
+
+
+class EvictionPolicy(StrEnum):
+    """Eviction policies supported by the cache engine."""
+
+    LRU = "lru"
+    LFU = "lfu"
+    TINYLFU = "tinylfu"
+
+
+@dataclass(frozen=True)
+class CacheInfo:
+    """Snapshot of cache statistics."""
+
+    hits: int
+    misses: int
+    stale_hits: int
+    evictions: int
+    expirations: int
+    rejections: int
+    currsize: int
+    nbytes: int
+    max_entries: int | None
+    max_bytes: int | None
+
+    @property
+    def hit_ratio(self) -> float:
+        """Fraction of lookups that were served from the cache."""
+        served = self.hits + self.stale_hits
+        total = served + self.misses
+        return served / total if total else 0.0
+
+
+class _Policy(Protocol):
+    """Bookkeeping interface shared by the eviction policies."""
+
+    def on_get(self, key: Hashable, hit: bool) -> None: ...
+
+    def on_insert(self, key: Hashable) -> None: ...
+
+    def on_remove(self, key: Hashable) -> None: ...
+
+    def victim(self) -> Hashable: ...
+
+    def admit(self, candidate: Hashable, victim: Hashable) -> bool: ...
+
+    def clear(self) -> None: ...
+
+
+class _LRUPolicy:
+    """Evicts the least recently used key."""
+
+    __slots__ = ("_order",)
+
+    def __init__(self) -> None:
+        self._order: OrderedDict[Hashable, None] = OrderedDict()
+
+    def on_get(self, key: Hashable, hit: bool) -> None:
+        if hit:
+            self._order.move_to_end(key)
+
+    def on_insert(self, key: Hashable) -> None:
+        self._order[key] = None
+
+    def on_remove(self, key: Hashable) -> None:
+        self._order.pop(key, None)
+
+    def victim(self) -> Hashable:
+        return next(iter(self._order))
+
+    def admit(self, candidate: Hashable, victim: Hashable) -> bool:  # noqa: ARG002
+        return True
+
+    def clear(self) -> None:
+        self._order.clear()
+
+
+class _LFUPolicy:
+    """Evicts the least frequently used key in O(1), breaking ties by recency."""
+
+    __slots__ = ("_buckets", "_freq", "_min_freq")
+
+    def __init__(self) -> None:
+        self._freq: dict[Hashable, int] = {}
+        self._buckets: dict[int, OrderedDict[Hashable, None]] = {}
+        self._min_freq = 0
+
+    def on_get(self, key: Hashable, hit: bool) -> None:
+        if not hit:
+            return
+        freq = self._freq[key]
+        bucket = self._buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[freq]
+            if self._min_freq == freq:
+                self._min_freq = freq + 1
+        self._freq[key] = freq + 1
+        self._buckets.setdefault(freq + 1, OrderedDict())[key] = None
+
+    def on_insert(self, key: Hashable) -> None:
+        self._freq[key] = 1
+        self._buckets.setdefault(1, OrderedDict())[key] = None
+        self._min_freq = 1
+
+    def on_remove(self, key: Hashable) -> None:
+        freq = self._freq.pop(key, None)
+        if freq is None:
+            return
+        bucket = self._buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[freq]
+            if self._min_freq == freq:
+                self._min_freq = min(self._buckets, default=0)
+
+    def victim(self) -> Hashable:
+        return next(iter(self._buckets[self._min_freq]))
+
+    def admit(self, candidate: Hashable, victim: Hashable) -> bool:  # noqa: ARG002
+        return True
+
+    def clear(self) -> None:
+        self._freq.clear()
+        self._buckets.clear()
+        self._min_freq = 0
+
+
+class _FrequencySketch:
+    """Count-min sketch of recent access frequency with periodic aging.
+
+    Counters saturate at 15 and are halved once ``sample_size`` increments
+    have been recorded, so the sketch tracks recent popularity rather than
+    all-time totals.
+    """
+
+    __slots__ = ("_additions", "_rows", "_sample_size", "_shift")
+
+    def __init__(self, capacity: int) -> None:
+        bits = max(4, (max(capacity, 1) * 4 - 1).bit_length())
+        self._shift = 64 - bits
+        self._rows = [bytearray(1 << bits) for _ in _SKETCH_SEEDS]
+        self._sample_size = max(capacity, 1) * 10
+        self._additions = 0
+
+    def _indexes(self, key: Hashable) -> list[int]:
+        h = hash(key) & _MASK_64
+        return [((h * seed) & _MASK_64) >> self._shift for seed in _SKETCH_SEEDS]
+
+    def increment(self, key: Hashable) -> None:
+        for row, index in zip(self._rows, self._indexes(key), strict=True):
+            if row[index] < _SKETCH_MAX_COUNT:
+                row[index] += 1
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            self._rows = [bytearray(row.translate(_HALVE)) for row in self._rows]
+            self._additions //= 2
+
+    def estimate(self, key: Hashable) -> int:
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key), strict=True))
+
+    def clear(self) -> None:
+        for row in self._rows:
+            row[:] = bytes(len(row))
+        self._additions = 0
+
+
+class _TinyLFUPolicy(_LRUPolicy):
+    """LRU ordering guarded by a TinyLFU admission filter.
+
+    A new key only displaces the LRU victim when it has been requested more
+    often recently, which keeps one-hit wonders from flushing hot entries.
+    """
+
+    __slots__ = ("_sketch",)
+
+    def __init__(self, capacity: int) -> None:
+        super().__init__()
+        self._sketch = _FrequencySketch(capacity)
+
+    def on_get(self, key: Hashable, hit: bool) -> None:
+        self._sketch.increment(key)
+        super().on_get(key, hit)
+
+    def admit(self, candidate: Hashable, victim: Hashable) -> bool:
+        return self._sketch.estimate(candidate) > self._sketch.estimate(victim)
+
+    def clear(self) -> None:
+        super().clear()
+        self._sketch.clear()
+
+
+class _Entry:
+    """A cached value with its expiry deadline and accounted size."""
+
+    __slots__ = ("expires_at", "size", "value")
+
+    def __init__(self, value: Any, expires_at: float, size: int) -> None:
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+
+
+def _make_policy(policy: EvictionPolicy | str, capacity: int) -> _Policy:
+    match EvictionPolicy(policy):
+        case EvictionPolicy.LRU:
+            return _LRUPolicy()
+        case EvictionPolicy.LFU:
+            return _LFUPolicy()
+        case EvictionPolicy.TINYLFU:
+            return _TinyLFUPolicy(capacity)
+
+
+class _Shard:
+    """One lock-striped partition of a :class:`Cache`, with its own policy."""
+
+    __slots__ = (
+        "entries",
+        "evictions",
+        "expirations",
+        "hits",
+        "lock",
+        "max_bytes",
+        "max_entries",
+        "misses",
+        "nbytes",
+        "next_sweep",
+        "policy",
+        "rejections",
+        "stale_hits",
+    )
+
+    def __init__(self, max_entries: int | None, max_bytes: int | None, policy: _Policy) -> None:
+        self.lock = threading.Lock()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.entries: dict[Hashable, _Entry] = {}
+        self.nbytes = 0
+        self.next_sweep = 0.0
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.hits = self.misses = self.stale_hits = 0
+        self.evictions = self.expirations = self.rejections = 0
+
+    def lookup(self, key: Hashable, now: float, stale_until: float | None) -> _Entry | None:
+        """Find a live entry, or one expired after ``stale_until`` if given."""
+        entry = self.entries.get(key)
+        if entry is not None and entry.expires_at <= now:
+            if stale_until is not None and entry.expires_at > stale_until:
+                self.stale_hits += 1
+                self.policy.on_get(key, True)
+                return entry
+            self.remove(key)
+            self.expirations += 1
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            self.policy.on_get(key, False)
+            return None
+
+        self.hits += 1
+        self.policy.on_get(key, True)
+        return entry
+
+    def insert(self, key: Hashable, entry: _Entry) -> bool:
+        if self.max_bytes is not None and entry.size > self.max_bytes:
+            self.rejections += 1
+            return False
+
+        if key in self.entries:
+            self.remove(key)
+
+        while self.entries and self._over_capacity(entry.size):
+            victim = self.policy.victim()
+            if not self.policy.admit(key, victim):
+                self.rejections += 1
+                return False
+            self.remove(victim)
+            self.evictions += 1
+
+        self.entries[key] = entry
+        self.nbytes += entry.size
+        self.policy.on_insert(key)
+        return True
+
+    def expire(self, deadline: float) -> int:
+        expired = [key for key, entry in self.entries.items() if entry.expires_at <= deadline]
+        for key in expired:
+            self.remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.policy.clear()
+        self.nbytes = 0
+        self.reset_stats()
+
+    def remove(self, key: Hashable) -> None:
+        entry = self.entries.pop(key)
+        self.nbytes -= entry.size
+        self.policy.on_remove(key)
+
+    def _over_capacity(self, incoming_size: int) -> bool:
+        if self.max_entries is not None and len(self.entries) >= self.max_entries:
+            return True
+        return self.max_bytes is not None and self.nbytes + incoming_size > self.max_bytes
+
+
+def _split(limit: int | None, parts: int, index: int) -> int | None:
+    """Share of ``limit`` for partition ``index`` so that all shares sum to it."""
+    if limit is None:
+        return None
+    return limit // parts + (1 if index < limit % parts else 0)
+
+
+def _default_shards(max_entries: int | None) -> int:
+    """Pick a shard count that keeps at least 256 entries per shard."""
+    shards = 1
+    if max_entries is not None:
+        while shards < _MAX_DEFAULT_SHARDS and max_entries // (shards * 2) >= 256:
+            shards *= 2
+    return shards
+
+
+class Cache:
+    """Bounded, thread-safe key/value cache with TTL expiry.
+
+    Entries are evicted according to ``policy`` once ``max_entries`` or
+    ``max_bytes`` would be exceeded. Expired entries are dropped lazily on
+    lookup and by a full sweep at most once every ``sweep_interval`` seconds,
+    piggybacked on writes. With ``stale_seconds`` set, expired entries are
+    retained for that grace window so :meth:`lookup` can serve them stale.
+
+    Keys are spread over ``shards`` partitions by hash, each with its own
+    lock, eviction policy and an equal share of the limits, so concurrent
+    threads rarely contend. After ``os.fork()`` the child gets fresh locks
+    and, unless ``clear_on_fork`` is False, an empty cache.
+
+    Args:
+        max_entries: Maximum number of entries, or None for no limit.
+        max_bytes: Maximum total size of cached values, or None for no limit.
+        ttl_seconds: Time-to-live for entries, or None to never expire.
+        policy: Eviction policy to apply when the cache is full.
+        sweep_interval: Seconds between expiry sweeps. Defaults to the TTL.
+        stale_seconds: Grace window after expiry during which entries are
+            still available to :meth:`lookup`.
+        shards: Number of lock stripes. Defaults to one per 256 entries of
+            ``max_entries``, up to 16, or 1 for unbounded caches.
+        clear_on_fork: Whether forked children start with an empty cache.
+        sizeof: Function measuring a value for ``max_bytes`` accounting.
+            Defaults to ``sys.getsizeof``, which is shallow.
+        clock: Monotonic time source, injectable for tests.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+        ttl_seconds: float | None = None,
+        policy: EvictionPolicy | str = EvictionPolicy.LRU,
+        sweep_interval: float | None = None,
+        stale_seconds: float = 0.0,
+        shards: int | None = None,
+        clear_on_fork: bool = True,
+        sizeof: Callable[[Any], int] = sys.getsizeof,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+        if stale_seconds < 0:
+            raise ValueError("stale_seconds must not be negative")
+        shards = _default_shards(max_entries) if shards is None else shards
+        if shards < 1 or (max_entries is not None and shards > max_entries):
+            raise ValueError("shards must be between 1 and max_entries")
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = ttl_seconds if sweep_interval is None else sweep_interval
+        self.stale_seconds = stale_seconds
+        self.clear_on_fork = clear_on_fork
+        self._sizeof = sizeof
+        self._clock = clock
+        self._shards: list[_Shard] = []
+        for index in range(shards):
+            shard_entries = _split(max_entries, shards, index)
+            shard = _Shard(
+                shard_entries,
+                _split(max_bytes, shards, index),
+                _make_policy(policy, shard_entries or 1024),
+            )
+            shard.next_sweep = clock() + (self.sweep_interval or 0.0)
+            self._shards.append(shard)
+        _fork.register(self)
+
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self._shards)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._shard(key).entries.get(key)
+        return entry is not None and entry.expires_at > self._clock()
+
+    def _shard(self, key: Hashable) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for ``key``, or ``default`` on a miss."""
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.lookup(key, self._clock(), None)
+        return default if entry is None else entry.value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Like :meth:`get`, without updating statistics or eviction order."""
+        entry = self._shard(key).entries.get(key)
+        if entry is None or entry.expires_at <= self._clock():
+            return default
+        return entry.value
+
+    def lookup(self, key: Hashable) -> tuple[Any, float] | None:
+        """Return the cached value for ``key`` along with its remaining TTL.
+
+        Unlike :meth:`get`, entries past their TTL but still inside the
+        ``stale_seconds`` grace window are returned, with a negative
+        remaining TTL, so callers can serve them while refreshing.
+
+        Returns:
+            A ``(value, remaining_seconds)`` pair, or None on a miss.
+        """
+        now = self._clock()
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.lookup(key, now, now - self.stale_seconds)
+        return None if entry is None else (entry.value, entry.expires_at - now)
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: float | None = None) -> bool:
+        """Store ``value`` under ``key``.
+
+        Args:
+            key: Cache key.
+            value: Value to store.
+            ttl_seconds: Time-to-live for this entry. Defaults to the cache TTL.
+
+        Returns:
+            True if the value was cached, False if it was too large or the
+            admission policy rejected it.
+        """
+        now = self._clock()
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = now + ttl if ttl is not None else float("inf")
+        size = self._sizeof(value) if self.max_bytes is not None else 0
+        shard = self._shard(key)
+        with shard.lock:
+            if self.sweep_interval is not None and now >= shard.next_sweep:
+                shard.expire(now - self.stale_seconds)
+                shard.next_sweep = now + self.sweep_interval
+            return shard.insert(key, _Entry(value, expires_at, size))
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Remove ``key`` from the cache.
+
+        Returns:
+            True if the key was present.
+        """
+        shard = self._shard(key)
+        with shard.lock:
+            if key not in shard.entries:
+                return False
+            shard.remove(key)
+            return True
+
+    def expire(self) -> int:
+        """Drop every entry that is past its TTL and stale grace window.
+
+        Returns:
+            Number of entries removed.
+        """
+        now = self._clock()
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                removed += shard.expire(now - self.stale_seconds)
+                shard.next_sweep = now + (self.sweep_interval or 0.0)
+        return removed
+
+    def clear(self) -> None:
+        """Remove all entries and reset statistics."""
+        for shard in self._shards:
+            with shard.lock:
+                shard.clear()
+
+    def info(self) -> CacheInfo:
+        """Return a snapshot of the cache statistics."""
+        shards = self._shards
+        return CacheInfo(
+            hits=sum(shard.hits for shard in shards),
+            misses=sum(shard.misses for shard in shards),
+            stale_hits=sum(shard.stale_hits for shard in shards),
+            evictions=sum(shard.evictions for shard in shards),
+            expirations=sum(shard.expirations for shard in shards),
+            rejections=sum(shard.rejections for shard in shards),
+            currsize=sum(len(shard.entries) for shard in shards),
+            nbytes=sum(shard.nbytes for shard in shards),
+            max_entries=self.max_entries,
+            max_bytes=self.max_bytes,
+        )
+
+    def _after_fork_in_child(self) -> None:
+        for shard in self._shards:
+            shard.lock = threading.Lock()
+            if self.clear_on_fork:
+                shard.clear()
+
+
+class _KeywordMark:
+    """Separates positional from keyword arguments inside a cache key."""
+
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "<kwargs>"
+
+
+_KWD_MARK = _KeywordMark()
+
+
+class _HashedKey(list[Any]):
+    """Key tuple that computes its hash once instead of on every dict probe."""
+
+    __slots__ = ("hashvalue",)
+
+    def __init__(self, items: tuple[Any, ...]) -> None:
+        super().__init__(items)
+        self.hashvalue = hash(items)
+
+    def __hash__(self) -> int:  # type: ignore[override]
+        return self.hashvalue
+
+
+def fingerprint(value: Any) -> Hashable:
+    """Return a hashable, canonical stand-in for ``value``.
+
+    Hashable values are returned unchanged. Dicts, lists, sets, and objects
+    carrying a ``__dict__`` (dataclasses, Pydantic models) are converted to
+    nested tuples and frozensets tagged with their type, so equal values map
+    to equal fingerprints without paying for a ``repr``.
+
+    Args:
+        value: Value to fingerprint.
+
+    Returns:
+        A hashable value that compares equal for equal inputs.
+
+    Raises:
+        TypeError: If the value cannot be fingerprinted.
+    """
+    try:
+        hash(value)
+    except TypeError:
+        pass
+    else:
+        hashable: Hashable = value
+        return hashable
+
+    cls = type(value)
+    if isinstance(value, dict):
+        return (cls, frozenset((k, fingerprint(v)) for k, v in value.items()))
+    if isinstance(value, list | tuple):
+        return (cls, tuple(fingerprint(item) for item in value))
+    if isinstance(value, set | frozenset):
+        return (cls, frozenset(fingerprint(item) for item in value))
+    if isinstance(value, bytearray | memoryview):
+        return (cls, bytes(value))
+    if hasattr(value, "__dict__"):
+        return (cls, fingerprint(vars(value)))
+    raise TypeError(f"Cannot build a cache key for {cls.__name__!r} values")
+
+
+def make_key(args: tuple[Any, ...], kwargs: dict[str, Any]) -> Hashable:
+    """Build a cache key from call arguments.
+
+    A single argument of a builtin scalar type is keyed by its type and
+    value, so ``1``, ``1.0`` and ``True`` get separate entries. Otherwise
+    the arguments are packed into a tuple whose hash is computed once;
+    unhashable arguments are replaced by their :func:`fingerprint`.
+
+    Args:
+        args: Positional arguments of the call.
+        kwargs: Keyword arguments of the call.
+
+    Returns:
+        A hashable key. Calls with equal arguments produce equal keys,
+        regardless of keyword order.
+    """
+    if not kwargs and len(args) == 1 and type(args[0]) in _FAST_KEY_TYPES:
+        return (type(args[0]), args[0])
+
+    items = args
+    if kwargs:
+        pairs = sorted(kwargs.items()) if len(kwargs) > 1 else kwargs.items()
+        items += (_KWD_MARK, *(part for pair in pairs for part in pair))
+
+    try:
+        return _HashedKey(items)
+    except TypeError:
+        return _HashedKey(tuple(fingerprint(item) for item in items))
+
+
+def _encode_key(value: Any, out: list[bytes]) -> None:
+    if value is None or isinstance(value, bool | int | float):
+        out.append(b"%s:%r;" % (type(value).__name__.encode(), value))
+    elif isinstance(value, str):
+        data = value.encode()
+        out.append(b"s%d:%s" % (len(data), data))
+    elif isinstance(value, bytes):
+        out.append(b"b%d:%s" % (len(value), value))
+    elif isinstance(value, tuple | list):
+        # Argument tuples (lists) and scalar keys (tuples) must not coincide.
+        out.append(b"(" if isinstance(value, tuple) else b"[")
+        for item in value:
+            _encode_key(item, out)
+        out.append(b")" if isinstance(value, tuple) else b"]")
+    elif isinstance(value, frozenset | set):
+        parts = []
+        for item in value:
+            encoded: list[bytes] = []
+            _encode_key(item, encoded)
+            parts.append(b"".join(encoded))
+        out.append(b"{%s}" % b"".join(sorted(parts)))
+    elif isinstance(value, type):
+        out.append(b"t%s.%s;" % (value.__module__.encode(), value.__qualname__.encode()))
+    elif value is _KWD_MARK:
+        out.append(b"k;")
+    else:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        out.append(b"p%d:%s" % (len(data), data))
+
+
+def stable_key(key: Hashable, namespace: str = "") -> str:
+    """Derive a process-independent string key from a cache key.
+
+    Python's ``hash()`` is salted per process, so keys built by
+    :func:`make_key` cannot be shared between workers directly. This encodes
+    the key canonically (sets are ordered by their encoding, other objects
+    are pickled) and digests it.
+
+    Args:
+        key: Key as returned by :func:`make_key` or a user key function.
+        namespace: Prefix distinguishing keys of different functions.
+
+    Returns:
+        A ``namespace:hexdigest`` string that is identical in every process.
+    """
+    out: list[bytes] = []
+    _encode_key(key, out)
+    digest = hashlib.blake2b(b"".join(out), digest_size=16).hexdigest()
+    return f"{namespace}:{digest}" if namespace else digest
@@ -0,0 +1,330 @@
+"""Read-through and write-behind caching in front of a repository.
+
+:class:`CachedRepository` answers reads from a :class:`~monorepo_core.cache.Cache`
+and coalesces concurrent misses into ``get_many`` calls on the wrapped
+repository. With ``write_behind`` enabled, creates and updates are buffered
+and written in bulk, periodically and on :meth:`CachedRepository.shutdown`.
+"""
+
+import asyncio
+import contextlib
+import logging
+from collections.abc import AsyncIterator, Iterable, Iterator, Mapping
+from typing import Any, TypeVar, cast
+
+from monorepo_core.base import BaseRepository, BaseService
+from monorepo_core.batching import BatchLoader
+from monorepo_core.cache import Cache
+from monorepo_shared.errors import ConflictError
+
+T = TypeVar("T")
+ID = TypeVar("ID")
+
+logger = logging.getLogger(__name__)
+
+# Cached in place of entities known not to exist.
+_ABSENT: Any = object()
+_MISSING: Any = object()
+
+
+class CachedRepository(BaseRepository[T, ID], BaseService):
+    """Repository wrapper caching reads and optionally buffering writes.
+
+    ``get``, ``exists`` and ``get_many`` are served from the cache, including
+    cached misses; cache misses requested concurrently are loaded with one
+    ``get_many`` call on the wrapped repository. ``update`` and ``delete``
+    invalidate the cached entity.
+
+    In write-behind mode, ``create`` and ``update`` only record the entity,
+    and buffered writes are sent with ``create_many`` / ``update_many``
+    every ``flush_interval`` seconds, whenever ``max_pending`` entities are
+    waiting, before listing queries, and on :meth:`shutdown`. Reads see
+    buffered writes immediately. Only conflicts with entities already known
+    are raised by ``create``; other write errors surface at flush time, and
+    a failed flush keeps its entities buffered for the next attempt. When a
+    bulk create fails, the entities are created one at a time, so rows the
+    failed batch already wrote are not sent again. Deletes are always
+    written through.
+
+    Call :meth:`initialize` to start periodic flushing and :meth:`shutdown`
+    to stop it and write what is still buffered.
+
+    Args:
+        repository: Repository to wrap.
+        cache: Cache holding entities by ID. Defaults to an LRU cache of
+            ``max_entries`` entries expiring after ``ttl_seconds``; a cache
+            passed in should not be shared with other repositories.
+        ttl_seconds: Time-to-live of the default cache.
+        max_entries: Capacity of the default cache.
+        cache_missing: Whether to remember IDs that do not exist.
+        write_behind: Whether to buffer creates and updates.
+        flush_interval: Seconds between periodic flushes.
+        max_pending: Buffered entities that trigger an immediate flush.
+        max_batch_size: Most IDs loaded with one ``get_many`` call.
+    """
+
+    def __init__(
+        self,
+        repository: BaseRepository[T, ID],
+        *,
+        cache: Cache | None = None,
+        ttl_seconds: float | None = 60.0,
+        max_entries: int = 10_000,
+        cache_missing: bool = True,
+        write_behind: bool = False,
+        flush_interval: float = 1.0,
+        max_pending: int = 1000,
+        max_batch_size: int = 100,
+    ) -> None:
+        if flush_interval <= 0:
+            raise ValueError("flush_interval must be positive")
+        if max_pending < 1:
+            raise ValueError("max_pending must be at least 1")
+        self.repository = repository
+        self.cache = (
+            cache if cache is not None else Cache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        )
+        self.cache_missing = cache_missing
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._loader: BatchLoader[Any, T | None] = BatchLoader(
+            self._load, max_batch_size=max_batch_size
+        )
+        self._creates: dict[ID, T] = {}
+        self._updates: dict[ID, T] = {}
+        self._flushing: dict[ID, T] = {}
+        self._writes = 0
+        self._flush_lock = asyncio.Lock()
+        self._flusher: asyncio.Task[None] | None = None
+
+    @property
+    def pending(self) -> int:
+        """Entities buffered and not yet written."""
+        return len(self._creates) + len(self._updates)
+
+    def _id_of(self, entity: T) -> ID:
+        id: ID = getattr(entity, self.repository.id_field)
+        return id
+
+    async def initialize(self) -> None:
+        """Start periodic flushing of buffered writes."""
+        if self.write_behind and self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def shutdown(self) -> None:
+        """Stop periodic flushing and write every buffered entity."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._flusher
+            self._flusher = None
+        await self.flush()
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Write-behind flush failed; %d entities pending", self.pending)
+
+    async def flush(self) -> None:
+        """Write buffered creates and updates to the wrapped repository."""
+        async with self._flush_lock:
+            if not self._creates and not self._updates:
+                return
+            creates, self._creates = self._creates, {}
+            updates, self._updates = self._updates, {}
+            self._flushing = {**creates, **updates}
+            try:
+                if creates:
+                    try:
+                        await self.repository.create_many(creates.values())
+                    except Exception:
+                        await self._create_each(creates)
+                    creates = {}
+                if updates:
+                    await self.repository.update_many(updates)
+            except BaseException:
+                # Writes buffered meanwhile are newer, so they take precedence.
+                self._creates = {**creates, **self._creates}
+                self._updates = {**updates, **self._updates}
+                raise
+            finally:
+                self._flushing = {}
+
+    async def _create_each(self, creates: dict[ID, T]) -> None:
+        """Create ``creates`` one by one after a failed bulk create.
+
+        Each entity is removed from ``creates`` once settled, so the ones
+        left are still to be written. A conflict with an identical stored row
+        means the failed batch wrote it; any other conflict is raised after
+        the remaining entities were created, and other errors immediately.
+        """
+        conflict: ConflictError | None = None
+        for id, entity in list(creates.items()):
+            try:
+                await self.repository.create(entity)
+            except ConflictError as e:
+                if await self.repository.get(id) != entity:
+                    conflict = conflict or e
+            del creates[id]
+        if conflict is not None:
+            raise conflict
+
+    async def _load(self, ids: list[Any]) -> list[T | None]:
+        writes = self._writes
+        entities = await self.repository.get_many(ids)
+        if writes != self._writes:
+            return entities  # may predate a concurrent write, so not cached
+        for id, entity in zip(ids, entities, strict=True):
+            if entity is not None:
+                self.cache.set(id, entity)
+            elif self.cache_missing:
+                self.cache.set(id, _ABSENT)
+        return entities
+
+    def _store(self, id: ID, entity: T) -> None:
+        self._writes += 1
+        self.cache.set(id, entity)
+
+    def _invalidate(self, id: ID) -> None:
+        self._writes += 1
+        self.cache.invalidate(id)
+
+    @contextlib.contextmanager
+    def _writing(self, ids: Iterable[ID]) -> Iterator[None]:
+        # Invalidating again once the write is done drops anything a load
+        # overlapping the write cached, and stops loads still running from
+        # caching what they read.
+        ids = list(ids)
+        for id in ids:
+            self._invalidate(id)
+        try:
+            yield
+        finally:
+            for id in ids:
+                self._invalidate(id)
+
+    def _buffered(self, id: ID) -> Any:
+        """Buffered entity for ``id``, or ``_MISSING``."""
+        for buffer in (self._updates, self._creates, self._flushing):
+            if id in buffer:
+                return buffer[id]
+        return _MISSING
+
+    def _cached(self, id: ID) -> T | None:
+        """Entity known for ``id`` without a load, or ``_MISSING``."""
+        entity = self._buffered(id) if self.write_behind else _MISSING
+        if entity is _MISSING:
+            entity = self.cache.get(id, _MISSING)
+        return None if entity is _ABSENT else cast("T | None", entity)
+
+    async def get(self, id: ID) -> T | None:
+        entity = self._cached(id)
+        if entity is _MISSING:
+            entity = await self._loader.load(id)
+        return entity
+
+    async def get_many(self, ids: Iterable[ID]) -> list[T | None]:
+        entities = [(id, self._cached(id)) for id in ids]
+        missing = [id for id, entity in entities if entity is _MISSING]
+        loaded = dict(zip(missing, await self._loader.load_many(missing), strict=True))
+        return [loaded[id] if entity is _MISSING else entity for id, entity in entities]
+
+    async def exists(self, id: ID) -> bool:
+        """Check if an entity exists, loading it into the cache if needed."""
+        return await self.get(id) is not None
+
+    async def create(self, entity: T) -> T:
+        """Create a new entity.
+
+        Raises:
+            ConflictError: In write-behind mode, if the entity is known to
+                exist; other conflicts are raised by :meth:`flush`.
+        """
+        id = self._id_of(entity)
+        if self.write_behind:
+            existing = self._cached(id)
+            if existing is not None and existing is not _MISSING:
+                raise ConflictError(type(entity).__name__, details={"id": id})
+            self._creates[id] = entity
+            await self._flush_if_full()
+        else:
+            entity = await self.repository.create(entity)
+        self._store(id, entity)
+        return entity
+
+    async def update(self, id: ID, entity: T) -> T | None:
+        if not self.write_behind:
+            with self._writing([id]):
+                return await self.repository.update(id, entity)
+        if id in self._creates:
+            self._creates[id] = entity
+        elif await self.exists(id):
+            self._updates[id] = entity
+        else:
+            return None
+        self._store(id, entity)
+        await self._flush_if_full()
+        return entity
+
+    async def delete(self, id: ID) -> bool:
+        # Holding the flush lock keeps an in-flight flush from re-creating it.
+        async with self._flush_lock:
+            buffered = self._creates.pop(id, None) is not None
+            self._updates.pop(id, None)
+            with self._writing([id]):
+                return await self.repository.delete(id) or buffered
+
+    async def _flush_if_full(self) -> None:
+        if self.pending >= self.max_pending:
+            await self.flush()
+
+    async def create_many(self, entities: Iterable[T]) -> list[T]:
+        if self.write_behind:
+            return [await self.create(entity) for entity in entities]
+        created = await self.repository.create_many(entities)
+        for entity in created:
+            self._store(self._id_of(entity), entity)
+        return created
+
+    async def update_many(self, entities: Mapping[ID, T]) -> list[T | None]:
+        if self.write_behind:
+            return [await self.update(id, entity) for id, entity in entities.items()]
+        with self._writing(entities):
+            return await self.repository.update_many(entities)
+
+    async def delete_many(self, ids: Iterable[ID]) -> int:
+        ids = list(ids)
+        await self.flush()
+        with self._writing(ids):
+            return await self.repository.delete_many(ids)
+
+    async def get_all(self) -> list[T]:
+        await self.flush()
+        return await self.repository.get_all()
+
+    async def get_page(self, offset: int, limit: int) -> list[T]:
+        await self.flush()
+        return await self.repository.get_page(offset, limit)
+
+    async def stream(self, chunk_size: int = 1000) -> AsyncIterator[list[T]]:
+        await self.flush()
+        async for chunk in self.repository.stream(chunk_size):
+            yield chunk
+
+    def cursor_key(self, entity: T, sort_by: str | None = None) -> tuple[Any, ...]:
+        return self.repository.cursor_key(entity, sort_by)
+
+    async def get_after(
+        self,
+        after: tuple[Any, ...] | None,
+        limit: int,
+        *,
+        sort_by: str | None = None,
+        descending: bool = False,
+    ) -> list[T]:
+        await self.flush()
+        return await self.repository.get_after(after, limit, sort_by=sort_by, descending=descending)
@@ -2,12 +2,32 @@
 
 import asyncio
 import functools
+import logging
+import math
+import os
+import threading
 import time
-from collections.abc import Callable
-from typing import Any, ParamSpec, TypeVar
+from collections.abc import Awaitable, Callable, Hashable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, ParamSpec, Protocol, TypeVar, cast, overload
+
+from monorepo_core import _fork
+from monorepo_core.backends import CacheBackend
+from monorepo_core.batching import BatchFunction, BatchLoader, K, V
+from monorepo_core.bulkhead import Bulkhead, ConcurrencyLimit
+from monorepo_core.cache import _MISSING, Cache, CacheInfo, EvictionPolicy, make_key, stable_key
+from monorepo_core.metrics import Histogram, MetricsRegistry, default_registry
+from monorepo_core.profiling import ProfileCapture, Sampler, SlowCallLog, _Probe, default_slow_log
+from monorepo_core.ratelimit import RateLimiter
+from monorepo_core.resilience import CircuitBreaker, Jitter, RetryBudget, _Hedger, _RetryPolicy
+from monorepo_shared.errors import RateLimitError
 
 P = ParamSpec("P")
 R = TypeVar("R")
+R_co = TypeVar("R_co", covariant=True)
+
+logger = logging.getLogger(__name__)
 
 
 def retry(
@@ -15,52 +35,199 @@ def retry(
     delay: float = 1.0,
     backoff: float = 2.0,
     exceptions: tuple[type[Exception], ...] = (Exception,),
+    *,
+    max_delay: float | None = None,
+    jitter: Jitter = Jitter.FULL,
+    deadline: float | None = None,
+    budget: RetryBudget | None = None,
+    breaker: CircuitBreaker | None = None,
+    hedges: int = 0,
+    hedge_delay: float | None = None,
 ) -> Callable[[Callable[P, R]], Callable[P, R]]:
     """Decorator that retries a function on failure.
 
+    Delays are randomised (see :class:`~monorepo_core.resilience.Jitter`) so
+    that callers failing together do not retry together. Once attempts, the
+    deadline or the budget run out, the last exception is re-raised.
+
     Args:
         max_attempts: Maximum number of retry attempts.
         delay: Initial delay between retries in seconds.
         backoff: Multiplier for delay after each retry.
         exceptions: Tuple of exceptions to catch and retry.
+        max_delay: Upper bound on a single delay in seconds.
+        jitter: How delays are randomised.
+        deadline: Seconds from the first attempt after which no further
+            attempt is started.
+        budget: Retry budget shared with other functions, limiting retries
+            to a fraction of calls.
+        breaker: Circuit breaker for the dependency being called, usually
+            from :func:`~monorepo_core.resilience.circuit_breaker`. Retryable
+            exceptions count as failures.
+        hedges: For coroutine functions, how many extra copies of each
+            attempt may run concurrently. A copy is started whenever the
+            attempt has been running for ``hedge_delay``; the first success
+            is returned and the other copies are cancelled.
+        hedge_delay: Seconds before starting a hedge. Defaults to the p95
+            latency of recent successful calls, hedging only once enough
+            calls have been observed.
 
     Returns:
         Decorated function.
+
+    Raises:
+        ValueError: If ``hedges`` is used on a function that is not a
+            coroutine function.
+        CircuitOpenError: From the decorated function, when ``breaker``
+            rejects an attempt.
     """
+    policy = _RetryPolicy(
+        max_attempts=max_attempts,
+        delay=delay,
+        backoff=backoff,
+        exceptions=exceptions,
+        max_delay=max_delay,
+        jitter=jitter,
+        deadline=deadline,
+        budget=budget,
+        breaker=breaker,
+    )
 
     def decorator(func: Callable[P, R]) -> Callable[P, R]:
+        is_async = asyncio.iscoroutinefunction(func)
+        if hedges and not is_async:
+            raise ValueError("hedges requires a coroutine function")
+        hedger = _Hedger(hedges, hedge_delay, exceptions) if hedges else None
+
         @functools.wraps(func)
         async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
-            current_delay = delay
-            last_exception: Exception | None = None
+            started = policy.start()
+            wait = delay
+            last_exception: BaseException | None = None
+            attempt = 0
 
-            for attempt in range(max_attempts):
+            while True:
+                attempt += 1
+                policy.before_attempt(last_exception)
                 try:
-                    result: R = await func(*args, **kwargs)  # type: ignore[misc]
+                    if hedger is None:
+                        result: R = await func(*args, **kwargs)  # type: ignore[misc]
+                    else:
+                        call = cast(
+                            "Callable[[], Awaitable[R]]", functools.partial(func, *args, **kwargs)
+                        )
+                        result = await hedger.run(call)
+                except BaseException as e:
+                    next_wait = policy.failed(e, attempt, wait, started)
+                    if next_wait is None:
+                        raise
+                    last_exception, wait = e, next_wait
+                else:
+                    policy.succeeded()
                     return result
-                except exceptions as e:
-                    last_exception = e
-                    if attempt < max_attempts - 1:
-                        await asyncio.sleep(current_delay)
-                        current_delay *= backoff
-
-            raise last_exception  # type: ignore[misc]
+                await asyncio.sleep(wait)
 
         @functools.wraps(func)
         def sync_wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
-            current_delay = delay
-            last_exception: Exception | None = None
+            started = policy.start()
+            wait = delay
+            last_exception: BaseException | None = None
+            attempt = 0
 
-            for attempt in range(max_attempts):
+            while True:
+                attempt += 1
+                policy.before_attempt(last_exception)
                 try:
-                    return func(*args, **kwargs)
-                except exceptions as e:
-                    last_exception = e
-                    if attempt < max_attempts - 1:
-                        time.sleep(current_delay)
-                        current_delay *= backoff
+                    result = func(*args, **kwargs)
+                except BaseException as e:
+                    next_wait = policy.failed(e, attempt, wait, started)
+                    if next_wait is None:
+                        raise
+                    last_exception, wait = e, next_wait
+                else:
+                    policy.succeeded()
+                    return result
+                time.sleep(wait)
 
-            raise last_exception  # type: ignore[misc]
+        if is_async:
+            return async_wrapper  # type: ignore[return-value]
+        return sync_wrapper
+
+    return decorator
+
+
+def limit_concurrency(
+    limit: int | ConcurrencyLimit | Bulkhead = 10,
+    *,
+    max_queue: int | None = None,
+    queue_timeout: float | None = None,
+    name: str | None = None,
+    registry: MetricsRegistry | None = None,
+) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Decorator that bounds how many calls of a function run at once.
+
+    Calls over the limit wait in a FIFO queue; once the queue is full or a
+    call has waited ``queue_timeout`` seconds it is rejected, shedding load
+    instead of letting work pile up behind a slow dependency. Threads block
+    while queued and coroutines suspend. A :exc:`TimeoutError` raised by the
+    function counts as a dropped call for adaptive limits.
+
+    Args:
+        limit: Maximum concurrent calls, an adaptive limit such as
+            :class:`~monorepo_core.bulkhead.AIMDLimit`, or a
+            :class:`~monorepo_core.bulkhead.Bulkhead` to share between
+            functions (the other arguments are then taken from it).
+        max_queue: Maximum calls waiting; ``None`` means unbounded.
+        queue_timeout: Seconds a call may wait for a slot.
+        name: Bulkhead name used in metrics. Defaults to the qualified name.
+        registry: Registry for the bulkhead metrics.
+
+    Returns:
+        Decorated function.
+
+    Raises:
+        BulkheadFullError: From the decorated function, when a call is shed.
+    """
+
+    def decorator(func: Callable[P, R]) -> Callable[P, R]:
+        bulkhead = (
+            limit
+            if isinstance(limit, Bulkhead)
+            else Bulkhead(
+                limit,
+                max_queue=max_queue,
+                queue_timeout=queue_timeout,
+                name=name or func.__qualname__,
+                registry=registry,
+            )
+        )
+
+        @functools.wraps(func)
+        async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            await bulkhead.acquire_async()
+            start = time.perf_counter()
+            dropped = False
+            try:
+                result: R = await func(*args, **kwargs)  # type: ignore[misc]
+                return result
+            except TimeoutError:
+                dropped = True
+                raise
+            finally:
+                bulkhead.release(time.perf_counter() - start, dropped=dropped)
+
+        @functools.wraps(func)
+        def sync_wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            bulkhead.acquire()
+            start = time.perf_counter()
+            dropped = False
+            try:
+                return func(*args, **kwargs)
+            except TimeoutError:
+                dropped = True
+                raise
+            finally:
+                bulkhead.release(time.perf_counter() - start, dropped=dropped)
 
         if asyncio.iscoroutinefunction(func):
             return async_wrapper  # type: ignore[return-value]
@@ -69,67 +236,534 @@ def retry(
     return decorator
 
 
-def cached(ttl_seconds: float = 300.0) -> Callable[[Callable[P, R]], Callable[P, R]]:
-    """Simple in-memory cache decorator with TTL.
+def rate_limit(
+    limiter: RateLimiter,
+    *,
+    key: Callable[P, Hashable] | None = None,
+    cost: float = 1.0,
+    wait: bool = False,
+    max_wait: float | None = None,
+) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Decorator that limits how often a function may be called.
+
+    Each call takes ``cost`` units from ``limiter``. Over the limit the call
+    is rejected, or with ``wait=True`` delayed until units are available
+    (threads sleep, coroutines suspend).
 
     Args:
-        ttl_seconds: Time-to-live for cached values in seconds.
+        limiter: Engine enforcing the limit, e.g.
+            :class:`~monorepo_core.ratelimit.TokenBucket`. Share one limiter
+            between functions to give them a common limit.
+        key: Function of the call arguments selecting the quota to charge,
+            e.g. the tenant ID. Defaults to one quota for all calls.
+        cost: Units each call takes.
+        wait: Whether to wait for capacity instead of rejecting.
+        max_wait: With ``wait``, the longest total wait before rejecting.
 
     Returns:
         Decorated function.
+
+    Raises:
+        RateLimitError: From the decorated function, when a call is rejected.
+        ValueError: From the decorated function, when ``cost`` exceeds what
+            ``limiter`` can ever grant, so waiting would never end.
     """
-    cache: dict[str, tuple[float, Any]] = {}
+
+    def check(quota: Hashable, waited: float) -> float:
+        delay = limiter.acquire(quota, cost)
+        if delay == math.inf:
+            raise ValueError(f"cost {cost} exceeds the capacity of {type(limiter).__name__}")
+        if delay and (not wait or (max_wait is not None and waited + delay > max_wait)):
+            raise RateLimitError(delay, None if quota is None else str(quota))
+        return delay
 
     def decorator(func: Callable[P, R]) -> Callable[P, R]:
         @functools.wraps(func)
-        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
-            key = str((args, tuple(sorted(kwargs.items()))))
-            now = time.time()
+        async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            quota = key(*args, **kwargs) if key is not None else None
+            waited = 0.0
+            while delay := check(quota, waited):
+                await asyncio.sleep(delay)
+                waited += delay
+            result: R = await func(*args, **kwargs)  # type: ignore[misc]
+            return result
 
-            if key in cache:
-                cached_time, cached_value = cache[key]
-                if now - cached_time < ttl_seconds:
-                    cached_result: R = cached_value
-                    return cached_result
+        @functools.wraps(func)
+        def sync_wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            quota = key(*args, **kwargs) if key is not None else None
+            waited = 0.0
+            while delay := check(quota, waited):
+                time.sleep(delay)
+                waited += delay
+            return func(*args, **kwargs)
 
-            result: R = func(*args, **kwargs)
-            cache[key] = (now, result)
+        if asyncio.iscoroutinefunction(func):
+            return async_wrapper  # type: ignore[return-value]
+        return sync_wrapper
+
+    return decorator
+
+
+def batched(
+    *,
+    max_batch_size: int = 100,
+    max_wait: float = 0.0,
+    cache: bool = False,
+) -> Callable[[BatchFunction[K, V]], BatchLoader[K, V]]:
+    """Decorator turning a bulk async function into a per-key loader.
+
+    The decorated function takes a list of keys and returns their values in
+    order (or a key-to-value mapping). The result is a
+    :class:`~monorepo_core.batching.BatchLoader`: awaiting ``loader(key)``
+    from many coroutines issues one bulk call per batch.
+
+    Args:
+        max_batch_size: Most keys per bulk call.
+        max_wait: Seconds to collect keys before dispatching; ``0`` waits
+            for the current event-loop iteration only.
+        cache: Whether to remember results across batches.
+
+    Returns:
+        Decorator producing a :class:`~monorepo_core.batching.BatchLoader`.
+    """
+
+    def decorator(func: BatchFunction[K, V]) -> BatchLoader[K, V]:
+        loader = BatchLoader(func, max_batch_size=max_batch_size, max_wait=max_wait, cache=cache)
+        functools.update_wrapper(loader, func)
+        return loader
+
+    return decorator
+
+
+class CachedFunction(Protocol[P, R_co]):
+    """A function wrapped by :func:`cached`, exposing its cache controls."""
+
+    cache: Cache
+    cache_info: Callable[[], CacheInfo]
+    cache_clear: Callable[[], None]
+    invalidate: Callable[P, bool]
+
+    def __call__(self, *args: P.args, **kwargs: P.kwargs) -> R_co: ...
+
+
+@functools.cache
+def _refresh_executor() -> ThreadPoolExecutor:
+    """Shared worker pool for background refreshes of sync cached functions."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="cached-refresh")
+
+
+# The pool's threads do not survive a fork; children lazily start their own.
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_refresh_executor.cache_clear)
+
+
+class _KeyLock:
+    """Reentrant lock for one key, dropped once no thread is using it."""
+
+    __slots__ = ("lock", "users")
+
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self.users = 0
+
+
+class _CachedCalls:
+    """Per-function state shared by the sync and async :func:`cached` wrappers.
+
+    Values are looked up in the function's own cache first, then in the
+    optional shared backend, and computed only when both miss. Threads
+    missing on the same key wait on a per-key lock for the first one's
+    result instead of computing it again.
+    """
+
+    def __init__(
+        self,
+        cache: Cache,
+        name: str,
+        backend: CacheBackend | None,
+        ttl_seconds: float | None,
+    ) -> None:
+        self.cache = cache
+        self.name = name
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.in_flight: dict[Hashable, asyncio.Future[Any]] = {}
+        self.refreshing: set[Hashable] = set()
+        self._mutex = threading.Lock()
+        self._key_locks: dict[Hashable, _KeyLock] = {}
+        _fork.register(self)
+
+    @contextmanager
+    def _key_lock(self, key: Hashable) -> Iterator[None]:
+        with self._mutex:
+            key_lock = self._key_locks.get(key)
+            if key_lock is None:
+                key_lock = self._key_locks[key] = _KeyLock()
+            key_lock.users += 1
+        try:
+            with key_lock.lock:
+                yield
+        finally:
+            with self._mutex:
+                key_lock.users -= 1
+                if not key_lock.users:
+                    del self._key_locks[key]
+
+    def load(self, key: Hashable, call: Callable[[], Any], refresh: bool = False) -> Any:
+        """Return the backend's value for ``key``, or compute and store it.
+
+        With ``refresh`` set the backend is skipped, since its copy is at
+        least as old as the local one being refreshed.
+        """
+        with self._key_lock(key):
+            if not refresh:
+                # Another thread may have loaded the key while we waited.
+                value = self.cache.peek(key, _MISSING)
+                if value is not _MISSING:
+                    return value
+                value = self._from_backend(key)
+                if value is not _MISSING:
+                    return value
+            value = call()
+            self.store(key, value)
+            return value
+
+    async def load_async(self, key: Hashable, call: Callable[[], Any], refresh: bool) -> Any:
+        """Like :meth:`load`, for a ``call`` returning an awaitable."""
+        value = _MISSING if refresh else self._from_backend(key)
+        if value is _MISSING:
+            value = await call()
+            self.store(key, value)
+        return value
+
+    def store(self, key: Hashable, value: Any) -> None:
+        """Write ``value`` to the local cache and the shared backend."""
+        self.cache.set(key, value)
+        if self.backend is not None:
+            self.backend.set(stable_key(key, self.name), value, self.ttl_seconds)
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Drop ``key`` locally and from the shared backend."""
+        removed = self.cache.invalidate(key)
+        if self.backend is not None:
+            removed = self.backend.invalidate(stable_key(key, self.name)) or removed
+        return removed
+
+    def start_task(
+        self, key: Hashable, call: Callable[[], Any], refresh: bool = False
+    ) -> asyncio.Future[Any]:
+        """Start loading ``key`` as a task, or join the one already running."""
+        task = self.in_flight.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(self.load_async(key, call, refresh))
+            self.in_flight[key] = task
+            task.add_done_callback(functools.partial(self._finish_task, key))
+        return task
+
+    def refresh_in_thread(self, key: Hashable, call: Callable[[], Any]) -> None:
+        """Reload ``key`` on the shared refresh pool unless already underway."""
+        with self._mutex:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+        _refresh_executor().submit(self._refresh, key, call)
+
+    def _from_backend(self, key: Hashable) -> Any:
+        if self.backend is None:
+            return _MISSING
+        value = self.backend.get(stable_key(key, self.name), _MISSING)
+        if value is not _MISSING:
+            self.cache.set(key, value)
+        return value
+
+    def _refresh(self, key: Hashable, call: Callable[[], Any]) -> None:
+        try:
+            self.load(key, call, refresh=True)
+        except Exception:
+            logger.exception("Background refresh of %s failed", self.name)
+        finally:
+            with self._mutex:
+                self.refreshing.discard(key)
+
+    def _finish_task(self, key: Hashable, task: asyncio.Future[Any]) -> None:
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved when every waiter has gone away.
+            task.exception()
+
+    def _after_fork_in_child(self) -> None:
+        self._mutex = threading.Lock()
+        self._key_locks = {}
+        self.in_flight = {}
+        self.refreshing = set()
+
+
+def cached(
+    ttl_seconds: float | None = 300.0,
+    *,
+    max_entries: int | None = 1024,
+    max_bytes: int | None = None,
+    policy: EvictionPolicy | str = EvictionPolicy.LRU,
+    sweep_interval: float | None = None,
+    key: Callable[P, Hashable] | None = None,
+    stale_ttl: float = 0.0,
+    refresh_ahead: float | None = None,
+    backend: CacheBackend | None = None,
+) -> Callable[[Callable[P, R]], CachedFunction[P, R]]:
+    """In-memory cache decorator with TTL and bounded size.
+
+    Each decorated function gets its own :class:`~monorepo_core.cache.Cache`.
+    Coroutine functions cache their awaited result, and concurrent misses
+    for the same key are coalesced onto a single in-flight call.
+    The wrapper exposes ``cache_info()``, ``cache_clear()`` and
+    ``invalidate(*args, **kwargs)`` for inspection and manual eviction.
+
+    With ``stale_ttl`` set, an expired value is still returned for that many
+    seconds while a refresh runs in the background (a thread pool for sync
+    functions, a task for coroutine functions). ``refresh_ahead`` starts that
+    background refresh before expiry, once the given fraction of the TTL has
+    elapsed, so hot keys never go stale.
+
+    A ``backend`` such as :class:`~monorepo_core.backends.SharedMemoryBackend`
+    or :class:`~monorepo_core.backends.TieredCache` adds a second tier shared
+    between worker processes. It is consulted on local misses, with keys
+    namespaced by function and derived via
+    :func:`~monorepo_core.cache.stable_key`. Backend calls are synchronous, so
+    prefer local tiers for coroutine functions. ``cache_clear()`` only
+    empties the local tier.
+
+    Args:
+        ttl_seconds: Time-to-live for cached values in seconds, or None to
+            keep values until evicted.
+        max_entries: Maximum number of cached results, or None for no limit.
+        max_bytes: Maximum total size of cached results, or None for no limit.
+        policy: Eviction policy: ``"lru"``, ``"lfu"`` or ``"tinylfu"``.
+        sweep_interval: Seconds between expired-entry sweeps. Defaults to
+            ``ttl_seconds``.
+        key: Function computing the cache key from the call arguments.
+            Defaults to :func:`~monorepo_core.cache.make_key`, which hashes
+            arguments structurally.
+        stale_ttl: Grace window in seconds during which expired values are
+            served while being refreshed.
+        refresh_ahead: Fraction of ``ttl_seconds`` (between 0 and 1) after
+            which a hit triggers a background refresh.
+        backend: Shared cache tier consulted after the local cache.
+
+    Returns:
+        Decorated function.
+
+    Raises:
+        ValueError: If ``refresh_ahead`` is out of range or set without a TTL.
+    """
+    if refresh_ahead is not None:
+        if ttl_seconds is None:
+            raise ValueError("refresh_ahead requires ttl_seconds")
+        if not 0.0 < refresh_ahead < 1.0:
+            raise ValueError("refresh_ahead must be between 0 and 1")
+    # Hits with this much TTL left or less trigger a background refresh.
+    refresh_window = 0.0
+    if refresh_ahead is not None and ttl_seconds is not None:
+        refresh_window = ttl_seconds * (1.0 - refresh_ahead)
+
+    def decorator(func: Callable[P, R]) -> CachedFunction[P, R]:
+        cache = Cache(
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            ttl_seconds=ttl_seconds,
+            policy=policy,
+            sweep_interval=sweep_interval,
+            stale_seconds=stale_ttl,
+        )
+
+        calls = _CachedCalls(cache, f"{func.__module__}.{func.__qualname__}", backend, ttl_seconds)
+
+        def build_key(*args: P.args, **kwargs: P.kwargs) -> Hashable:
+            if key is not None:
+                return key(*args, **kwargs)
+            return make_key(args, kwargs)
+
+        @functools.wraps(func)
+        async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            cache_key = build_key(*args, **kwargs)
+            call = functools.partial(func, *args, **kwargs)
+            found = cache.lookup(cache_key)
+            if found is not None:
+                cached_value, remaining = found
+                if remaining <= refresh_window:
+                    calls.start_task(cache_key, call, refresh=True)
+                cached_result: R = cached_value
+                return cached_result
+
+            # Shielded so a cancelled caller does not cancel the shared task.
+            result: R = await asyncio.shield(calls.start_task(cache_key, call))
+            return result
+
+        @functools.wraps(func)
+        def sync_wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            cache_key = build_key(*args, **kwargs)
+            found = cache.lookup(cache_key)
+            if found is not None:
+                cached_value, remaining = found
+                if remaining <= refresh_window:
+                    calls.refresh_in_thread(cache_key, functools.partial(func, *args, **kwargs))
+                cached_result: R = cached_value
+                return cached_result
+
+            result: R = calls.load(cache_key, functools.partial(func, *args, **kwargs))
             return result
 
-        return wrapper
+        def invalidate(*args: P.args, **kwargs: P.kwargs) -> bool:
+            return calls.invalidate(build_key(*args, **kwargs))
+
+        wrapper = async_wrapper if asyncio.iscoroutinefunction(func) else sync_wrapper
+        cached_wrapper = cast("CachedFunction[P, R]", wrapper)
+        cached_wrapper.cache = cache
+        cached_wrapper.cache_info = cache.info
+        cached_wrapper.cache_clear = cache.clear
+        cached_wrapper.invalidate = invalidate
+        return cached_wrapper
 
     return decorator
 
 
-def timed(func: Callable[P, R]) -> Callable[P, R]:
-    """Decorator that logs the execution time of a function.
+@overload
+def timed(func: Callable[P, R], /) -> Callable[P, R]: ...
+
+
+@overload
+def timed(
+    *,
+    name: str | None = None,
+    registry: MetricsRegistry | None = None,
+    sampler: Sampler | None = None,
+    slow_threshold: float | None = None,
+    capture: ProfileCapture | None = None,
+    slow_log: SlowCallLog | None = None,
+) -> Callable[[Callable[P, R]], Callable[P, R]]: ...
+
+
+def timed(
+    func: Callable[P, R] | None = None,
+    /,
+    *,
+    name: str | None = None,
+    registry: MetricsRegistry | None = None,
+    sampler: Sampler | None = None,
+    slow_threshold: float | None = None,
+    capture: ProfileCapture | None = None,
+    slow_log: SlowCallLog | None = None,
+) -> Callable[P, R] | Callable[[Callable[P, R]], Callable[P, R]]:
+    """Decorator that records the execution time of a function.
+
+    Durations go into the ``function_duration_seconds`` histogram of the
+    metrics registry, labelled with the function name. Use an exporter from
+    :mod:`monorepo_core.metrics` to read them. Can be applied bare
+    (``@timed``) or with options (``@timed(name="db.query")``).
+
+    With a ``sampler`` only some calls are measured, which keeps the cost of
+    instrumenting hot paths bounded; see :mod:`monorepo_core.profiling`.
 
     Args:
         func: Function to decorate.
+        name: Value of the ``function`` label. Defaults to the qualified name.
+        registry: Registry to record into. Defaults to
+            :data:`~monorepo_core.metrics.default_registry`.
+        sampler: Chooses which calls to measure. Defaults to every call.
+        slow_threshold: Measured calls taking at least this many seconds are
+            added to ``slow_log`` with their call site.
+        capture: Profiler to run on the next measured call after a slow one;
+            its report is attached to the slow call if that one is slow too.
+            Requires ``slow_threshold``.
+        slow_log: Where slow calls are kept. Defaults to
+            :data:`~monorepo_core.profiling.default_slow_log`.
 
     Returns:
         Decorated function.
+
+    Raises:
+        ValueError: If ``capture`` is given without ``slow_threshold``.
     """
+    if capture is not None and slow_threshold is None:
+        raise ValueError("capture requires slow_threshold")
+
+    def decorator(func: Callable[P, R]) -> Callable[P, R]:
+        label = name or func.__qualname__
+        histogram = (registry or default_registry).histogram(
+            "function_duration_seconds", function=label
+        )
+        if sampler is None and slow_threshold is None:
+            return _timed_every_call(func, histogram)
+        probe = _Probe(
+            histogram,
+            label,
+            sampler=sampler,
+            slow_threshold=slow_threshold,
+            capture=capture,
+            slow_log=slow_log or default_slow_log,
+        )
+        return _timed_with_probe(func, probe)
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def _timed_every_call(func: Callable[P, R], histogram: Histogram) -> Callable[P, R]:
+    record = histogram.record_ns
 
     @functools.wraps(func)
     async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
-        start = time.perf_counter()
+        start = time.perf_counter_ns()
         try:
             result: R = await func(*args, **kwargs)  # type: ignore[misc]
             return result
         finally:
-            elapsed = time.perf_counter() - start
-            print(f"{func.__name__} executed in {elapsed:.4f}s")
+            record(time.perf_counter_ns() - start)
 
     @functools.wraps(func)
     def sync_wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
-        start = time.perf_counter()
+        start = time.perf_counter_ns()
         try:
             result: R = func(*args, **kwargs)
             return result
         finally:
-            elapsed = time.perf_counter() - start
-            print(f"{func.__name__} executed in {elapsed:.4f}s")
+            record(time.perf_counter_ns() - start)
+
+    if asyncio.iscoroutinefunction(func):
+        return async_wrapper  # type: ignore[return-value]
+    return sync_wrapper
+
+
+def _timed_with_probe(func: Callable[P, R], probe: _Probe) -> Callable[P, R]:
+    sample = probe.sample
+
+    @functools.wraps(func)
+    async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        if not sample():
+            unsampled: R = await func(*args, **kwargs)  # type: ignore[misc]
+            return unsampled
+        report: list[str] = []
+        start = time.perf_counter_ns()
+        try:
+            with probe.capture(report):
+                result: R = await func(*args, **kwargs)  # type: ignore[misc]
+            return result
+        finally:
+            probe.finish(time.perf_counter_ns() - start, report)
+
+    @functools.wraps(func)
+    def sync_wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        if not sample():
+            return func(*args, **kwargs)
+        report: list[str] = []
+        start = time.perf_counter_ns()
+        try:
+            with probe.capture(report):
+                result: R = func(*args, **kwargs)
+            return result
+        finally:
+            probe.finish(time.perf_counter_ns() - start, report)
 
     if asyncio.iscoroutinefunction(func):
         return async_wrapper  # type: ignore[return-value]
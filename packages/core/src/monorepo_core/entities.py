@@ -0,0 +1,204 @@
+"""Memory-lean entity declarations and collections.
+
+:func:`entity` declares a slotted dataclass compared by ID, so instances
+carry no per-instance ``__dict__``. :class:`EntityBatch` goes further for
+large homogeneous collections: it stores each field as a column, numeric
+fields in typed arrays, and only builds entity objects when rows are read.
+"""
+
+import dataclasses
+import inspect
+import sys
+from array import array
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any, Generic, TypeVar, cast, get_type_hints, overload
+
+T = TypeVar("T")
+
+# Machine types for fields annotated exactly as these builtins.
+_TYPECODES: dict[Any, str] = {int: "q", float: "d"}
+
+
+@overload
+def entity(cls: type[T], /) -> type[T]: ...
+
+
+@overload
+def entity(
+    cls: None = None, /, *, frozen: bool = False, id_field: str = "id"
+) -> Callable[[type[T]], type[T]]: ...
+
+
+def entity(
+    cls: type[T] | None = None,
+    /,
+    *,
+    frozen: bool = False,
+    id_field: str = "id",
+) -> type[T] | Callable[[type[T]], type[T]]:
+    """Declare an entity as a slotted dataclass compared by its ID.
+
+    Example:
+        >>> @entity
+        ... class User:
+        ...     id: int
+        ...     name: str
+
+    Args:
+        cls: Class to decorate.
+        frozen: Whether instances are immutable.
+        id_field: Field identifying the entity; equality and hashing use
+            only this field.
+
+    Returns:
+        The dataclass, or a decorator when called with options.
+    """
+
+    def wrap(cls: type[T]) -> type[T]:
+        declared = dataclasses.dataclass(slots=True, frozen=frozen, eq=False)(cls)
+        if id_field not in {
+            field.name for field in dataclasses.fields(cast("type[Any]", declared))
+        }:
+            raise ValueError(f"{cls.__name__} has no {id_field!r} field")
+
+        def __eq__(self: Any, other: object) -> bool:
+            if not isinstance(other, declared):
+                return NotImplemented
+            return bool(getattr(self, id_field) == getattr(other, id_field))
+
+        def __hash__(self: Any) -> int:
+            return hash(getattr(self, id_field))
+
+        declared.__eq__ = __eq__  # type: ignore[method-assign]
+        declared.__hash__ = __hash__  # type: ignore[method-assign]
+        return declared
+
+    return wrap if cls is None else wrap(cls)
+
+
+def _field_types(entity_type: type[Any]) -> dict[str, tuple[str, Any]]:
+    """Map constructor parameters to the attribute holding them and their type."""
+    if dataclasses.is_dataclass(entity_type):
+        hints = get_type_hints(entity_type)
+        return {
+            field.name: (field.name, hints.get(field.name))
+            for field in dataclasses.fields(entity_type)
+            if field.init
+        }
+    # Attributes kept in an instance __dict__ have no column and would be lost.
+    if entity_type.__dictoffset__:
+        raise TypeError(
+            f"{entity_type.__name__} instances have a __dict__; "
+            "declare __slots__ on every class in its hierarchy"
+        )
+    slots = [
+        name
+        for klass in reversed(entity_type.__mro__)
+        for name in getattr(klass, "__slots__", ())
+        if not name.startswith("__")
+    ]
+    if not slots:
+        raise TypeError(f"{entity_type.__name__} is neither a dataclass nor slotted")
+    parameters = inspect.signature(entity_type, eval_str=True).parameters
+    hints = get_type_hints(entity_type)
+    fields = {}
+    for slot in slots:
+        # A private slot such as BaseEntity._id is set from its public name.
+        name = slot if slot in parameters else slot.lstrip("_")
+        if name not in parameters:
+            raise TypeError(f"{entity_type.__name__} takes no parameter for slot {slot!r}")
+        annotation = parameters[name].annotation
+        kind = hints.get(slot, None if annotation is inspect.Parameter.empty else annotation)
+        fields[name] = (slot, kind)
+    for name, parameter in parameters.items():
+        if name not in fields and parameter.kind not in (
+            inspect.Parameter.VAR_POSITIONAL,
+            inspect.Parameter.VAR_KEYWORD,
+        ):
+            raise TypeError(f"{entity_type.__name__} has no slot for parameter {name!r}")
+    return fields
+
+
+class EntityBatch(Generic[T]):
+    """Columnar collection of entities of one dataclass or slotted type.
+
+    Each field is stored as one column: fields annotated ``int`` or
+    ``float`` in an :class:`array.array` of 8-byte machine values instead of
+    boxed objects, the others in a list. A typed column falls back to a list
+    when a value does not fit, such as ``None`` or an integer wider than 64
+    bits. Entities are built on access, so a batch of millions of rows holds
+    no entity objects; use :meth:`column` to process a field without
+    building any.
+
+    Args:
+        entity_type: Dataclass, or class with ``__slots__``, of the entities.
+            It is constructed from keyword arguments named after the fields;
+            a slot with a leading underscore, such as ``BaseEntity._id``, is
+            passed as the parameter without it.
+        entities: Initial entities.
+
+    Raises:
+        TypeError: If ``entity_type`` is not a dataclass, its instances have
+            a ``__dict__``, or a slot and a constructor parameter do not
+            match up.
+    """
+
+    def __init__(self, entity_type: type[T], entities: Iterable[T] = ()) -> None:
+        self.entity_type = entity_type
+        fields = _field_types(entity_type)
+        self._attributes = [attribute for attribute, _ in fields.values()]
+        self._columns: dict[str, array[Any] | list[Any]] = {
+            name: array(_TYPECODES[kind]) if kind in _TYPECODES else []
+            for name, (_, kind) in fields.items()
+        }
+        self._length = 0
+        self.extend(entities)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> T:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("EntityBatch index out of range")
+        return self.entity_type(**{name: column[index] for name, column in self._columns.items()})
+
+    def __iter__(self) -> Iterator[T]:
+        make = self.entity_type
+        names = list(self._columns)
+        for values in zip(*self._columns.values(), strict=True):
+            yield make(**dict(zip(names, values, strict=True)))
+
+    @property
+    def fields(self) -> tuple[str, ...]:
+        """Names of the stored fields, in declaration order."""
+        return tuple(self._columns)
+
+    def column(self, name: str) -> "array[Any] | list[Any]":
+        """Get the values of one field, as stored; do not modify the result."""
+        return self._columns[name]
+
+    def append(self, entity: T) -> None:
+        """Add an entity's field values to the batch."""
+        values = [getattr(entity, attribute) for attribute in self._attributes]
+        for (name, column), value in zip(self._columns.items(), values, strict=True):
+            try:
+                column.append(value)
+            except (TypeError, OverflowError):
+                self._columns[name] = [*column, value]
+        self._length += 1
+
+    def extend(self, entities: Iterable[T]) -> None:
+        """Add several entities."""
+        for item in entities:
+            self.append(item)
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns, excluding shared values."""
+        total = 0
+        for column in self._columns.values():
+            total += sys.getsizeof(column)
+            if isinstance(column, list):
+                total += sum(sys.getsizeof(value) for value in column)
+        return total
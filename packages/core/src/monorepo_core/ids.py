@@ -0,0 +1,264 @@
+"""ID engines behind :func:`~monorepo_core.utils.generate_id`.
+
+Every engine draws randomness from a shared buffer filled by one
+``os.urandom`` call per few thousand IDs instead of one per ID. The
+time-ordered engines (:class:`UlidEngine`, :class:`UuidV7Engine`,
+:class:`SnowflakeEngine`) start IDs with a millisecond timestamp, so new
+IDs land at the end of a B-tree index instead of at random pages, and IDs
+made by one engine are strictly increasing. Buffered randomness and
+per-engine sequences are discarded in children created with ``os.fork()``,
+so a child never repeats its parent's IDs.
+"""
+
+import base64
+import math
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from typing import Protocol
+
+from monorepo_core import _fork
+
+_REFILL_BYTES = 4096
+_ULID_RANDOM_BITS = 80
+_UUID_RANDOM_BITS = 74
+# Base32hex keeps byte order; ULIDs use Crockford's alphabet instead.
+_CROCKFORD = str.maketrans("0123456789ABCDEFGHIJKLMNOPQRSTUV", "0123456789ABCDEFGHJKMNPQRSTVWXYZ")
+_SNOWFLAKE_EPOCH_MS = 1_704_067_200_000  # 2024-01-01T00:00:00Z
+_WORKER_BITS = 10
+_SEQUENCE_BITS = 12
+
+
+class IdEngine(Protocol):
+    """Source of unique string IDs."""
+
+    def generate(self) -> str:
+        """Return a new ID."""
+        ...
+
+    def generate_many(self, n: int) -> list[str]:
+        """Return ``n`` new IDs."""
+        ...
+
+
+class _EntropyPool:
+    """Random bytes read from ``os.urandom`` in blocks."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._buffer = b""
+        self._offset = 0
+        _fork.register(self)
+
+    def take(self, n: int) -> bytes:
+        with self._lock:
+            end = self._offset + n
+            if end > len(self._buffer):
+                self._buffer = os.urandom(max(n, _REFILL_BYTES))
+                self._offset, end = 0, n
+            chunk = self._buffer[self._offset : end]
+            self._offset = end
+            return chunk
+
+    def bits(self, count: int) -> int:
+        return int.from_bytes(self.take((count + 7) // 8), "big") >> (-count % 8)
+
+    def _after_fork_in_child(self) -> None:
+        # The parent will hand out the same buffered bytes.
+        self._lock = threading.Lock()
+        self._buffer = b""
+        self._offset = 0
+
+
+_entropy = _EntropyPool()
+
+
+def _now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+class RandomIdEngine:
+    """Random IDs of ``length`` characters from ``0-9a-v``.
+
+    Each character carries 5 bits, so the default 12 characters hold 60
+    random bits: a collision becomes likely only after about a billion IDs.
+    Single IDs are handed out from a batch made ``batch_size`` at a time.
+    """
+
+    def __init__(self, length: int = 12, *, batch_size: int = 256) -> None:
+        if length < 1 or batch_size < 1:
+            raise ValueError("length and batch_size must be at least 1")
+        self.length = length
+        self.batch_size = batch_size
+        self._ready: list[str] = []
+        _fork.register(self)
+
+    def generate(self) -> str:
+        while True:
+            try:
+                # list.pop is atomic, so threads never get the same ID.
+                return self._ready.pop()
+            except IndexError:
+                self._ready = self.generate_many(self.batch_size)
+
+    def generate_many(self, n: int) -> list[str]:
+        # Base32 maps every 5 bytes to 8 characters, so one encode call
+        # covers the whole batch and is cut into IDs afterwards.
+        length = self.length
+        chars = n * length
+        text = base64.b32hexencode(_entropy.take(math.ceil(chars / 8) * 5)).decode().lower()
+        return [text[i : i + length] for i in range(0, chars, length)]
+
+    def _after_fork_in_child(self) -> None:
+        self._ready = []
+
+
+class _MonotonicEngine(ABC):
+    """Millisecond timestamp plus random bits, increasing within a process.
+
+    IDs made in the same millisecond increment the random part of the
+    previous one instead of drawing new bits, as in the ULID specification.
+    """
+
+    random_bits: int
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+        _fork.register(self)
+
+    def _next(self) -> tuple[int, int]:
+        now = _now_ms()
+        with self._lock:
+            if now > self._last_ms:
+                self._last_ms, self._last_random = now, _entropy.bits(self.random_bits)
+            else:
+                # Same millisecond, or the clock went back: stay ordered.
+                self._last_random += 1
+                if self._last_random >> self.random_bits:
+                    self._last_ms += 1
+                    self._last_random = _entropy.bits(self.random_bits)
+            return self._last_ms, self._last_random
+
+    @abstractmethod
+    def _format(self, ms: int, random: int) -> str:
+        """Render an ID from its millisecond timestamp and random part."""
+        ...
+
+    def generate(self) -> str:
+        return self._format(*self._next())
+
+    def generate_many(self, n: int) -> list[str]:
+        return [self._format(*self._next()) for _ in range(n)]
+
+    def _after_fork_in_child(self) -> None:
+        # Draw fresh random bits rather than continuing the parent's run.
+        self._lock = threading.Lock()
+        self._last_ms = -1
+
+
+class UlidEngine(_MonotonicEngine):
+    """ULIDs: 26 characters, 48-bit millisecond time and 80 random bits."""
+
+    random_bits = _ULID_RANDOM_BITS
+
+    def _format(self, ms: int, random: int) -> str:
+        # 130 bits of text: two zero bits, then the 128-bit value.
+        value = (ms << _ULID_RANDOM_BITS | random) << 6
+        return base64.b32hexencode(value.to_bytes(17, "big")).decode()[:26].translate(_CROCKFORD)
+
+
+class UuidV7Engine(_MonotonicEngine):
+    """RFC 9562 version 7 UUIDs in canonical form, with 74 random bits."""
+
+    random_bits = _UUID_RANDOM_BITS
+
+    def _format(self, ms: int, random: int) -> str:
+        rand_a, rand_b = random >> 62, random & ((1 << 62) - 1)
+        value = ms << 80 | 0x7 << 76 | rand_a << 64 | 0b10 << 62 | rand_b
+        return str(uuid.UUID(int=value))
+
+
+def _check_worker_id(worker_id: int) -> int:
+    if not 0 <= worker_id < 1 << _WORKER_BITS:
+        raise ValueError(f"worker_id must be between 0 and {(1 << _WORKER_BITS) - 1}")
+    return worker_id
+
+
+class SnowflakeEngine:
+    """64-bit IDs: 41-bit millisecond time, 10-bit worker, 12-bit sequence.
+
+    Up to 4096 IDs per millisecond per worker; beyond that the engine waits
+    for the next millisecond. IDs are unique across processes only if each
+    uses its own ``worker_id``. Without one a random worker is picked.
+
+    A forked child never keeps its parent's worker, which would repeat the
+    parent's sequences. It takes ``worker_id_after_fork()`` if given, or
+    else its PID modulo 1024 (moved off the parent's worker if equal). PIDs
+    of children forked in a row differ by less than 1024, but for strict
+    uniqueness across long-lived pools pass ``worker_id_after_fork``.
+
+    Args:
+        worker_id: Number between 0 and 1023 identifying this process.
+        epoch_ms: Start of the timestamp range, in Unix milliseconds.
+        worker_id_after_fork: Called in each forked child to get its worker
+            ID, e.g. from the slot number a process manager assigned.
+    """
+
+    def __init__(
+        self,
+        worker_id: int | None = None,
+        *,
+        epoch_ms: int = _SNOWFLAKE_EPOCH_MS,
+        worker_id_after_fork: Callable[[], int] | None = None,
+    ) -> None:
+        self.worker_id = _check_worker_id(
+            worker_id if worker_id is not None else _entropy.bits(_WORKER_BITS)
+        )
+        self.epoch_ms = epoch_ms
+        self.worker_id_after_fork = worker_id_after_fork
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+        _fork.register(self)
+
+    def next_int(self) -> int:
+        """Return a new ID as an integer."""
+        with self._lock:
+            now = _now_ms() - self.epoch_ms
+            if now > self._last_ms:
+                self._last_ms, self._sequence = now, 0
+            else:
+                self._sequence = (self._sequence + 1) & ((1 << _SEQUENCE_BITS) - 1)
+                if self._sequence == 0:
+                    while now <= self._last_ms:
+                        now = _now_ms() - self.epoch_ms
+                    self._last_ms = now
+            return (
+                self._last_ms << (_WORKER_BITS + _SEQUENCE_BITS)
+                | self.worker_id << _SEQUENCE_BITS
+                | self._sequence
+            )
+
+    def generate(self) -> str:
+        return str(self.next_int())
+
+    def generate_many(self, n: int) -> list[str]:
+        return [str(self.next_int()) for _ in range(n)]
+
+    def _after_fork_in_child(self) -> None:
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+        if self.worker_id_after_fork is not None:
+            self.worker_id = _check_worker_id(self.worker_id_after_fork())
+            return
+        # Children forked in a row get consecutive PIDs, hence distinct workers.
+        worker_id = os.getpid() & ((1 << _WORKER_BITS) - 1)
+        if worker_id == self.worker_id:
+            worker_id = (worker_id + 1) & ((1 << _WORKER_BITS) - 1)
+        self.worker_id = worker_id
@@ -0,0 +1,183 @@
+"""Startup and shutdown of interdependent services.
+
+A :class:`ServiceRegistry` initializes every registered
+:class:`~monorepo_core.base.BaseService` as soon as the services it depends
+on are up, so independent services start concurrently and cold start takes
+as long as the slowest dependency chain rather than the sum of all services.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import TypeVar
+
+from monorepo_core.base import BaseService
+
+S = TypeVar("S", bound=BaseService)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class _Registration:
+    service: BaseService
+    depends_on: tuple[str, ...]
+    startup_timeout: float | None
+
+
+class ServiceRegistry(BaseService):
+    """Initializes services in dependency order, concurrently where possible.
+
+    Each service starts once all of its dependencies have started, and
+    stops only after every service depending on it has stopped. If a
+    service fails or exceeds its startup timeout, services that depend on
+    it are not started, the ones already started are shut down again, and
+    the error is raised.
+
+    Args:
+        startup_timeout: Default seconds a service may take to initialize.
+        shutdown_timeout: Seconds a service may take to shut down.
+    """
+
+    def __init__(
+        self,
+        *,
+        startup_timeout: float | None = 30.0,
+        shutdown_timeout: float | None = 30.0,
+    ) -> None:
+        self.startup_timeout = startup_timeout
+        self.shutdown_timeout = shutdown_timeout
+        self._services: dict[str, _Registration] = {}
+        self._started: list[str] = []
+        self._timings: dict[str, float] = {}
+
+    def register(
+        self,
+        name: str,
+        service: S,
+        *,
+        depends_on: Iterable[str] = (),
+        startup_timeout: float | None = None,
+    ) -> S:
+        """Add a service, to be started after the services in ``depends_on``.
+
+        Args:
+            name: Unique name of the service.
+            service: The service.
+            depends_on: Names of services it needs; they may be registered
+                later.
+            startup_timeout: Seconds it may take to initialize. Defaults to
+                the registry's ``startup_timeout``.
+
+        Returns:
+            ``service``, for use in assignments.
+
+        Raises:
+            ValueError: If ``name`` is already registered.
+        """
+        if name in self._services:
+            raise ValueError(f"Service {name!r} is already registered")
+        timeout = startup_timeout if startup_timeout is not None else self.startup_timeout
+        self._services[name] = _Registration(service, tuple(depends_on), timeout)
+        return service
+
+    def get(self, name: str) -> BaseService:
+        """Get a registered service by name."""
+        return self._services[name].service
+
+    @property
+    def timings(self) -> dict[str, float]:
+        """Seconds each started service took to initialize."""
+        return dict(self._timings)
+
+    def startup_order(self) -> list[list[str]]:
+        """Group services into layers that depend only on earlier layers.
+
+        Raises:
+            ValueError: If a dependency is not registered or dependencies
+                form a cycle.
+        """
+        remaining: dict[str, set[str]] = {}
+        for name, registration in self._services.items():
+            for dependency in registration.depends_on:
+                if dependency not in self._services:
+                    raise ValueError(f"Service {name!r} depends on unknown {dependency!r}")
+            remaining[name] = set(registration.depends_on)
+        layers = []
+        while remaining:
+            layer = [name for name, dependencies in remaining.items() if not dependencies]
+            if not layer:
+                raise ValueError(f"Dependency cycle among services: {sorted(remaining)}")
+            for name in layer:
+                del remaining[name]
+            for dependencies in remaining.values():
+                dependencies.difference_update(layer)
+            layers.append(layer)
+        return layers
+
+    async def initialize(self) -> None:
+        """Initialize every service once its dependencies are initialized.
+
+        Raises:
+            ValueError: If the dependency graph is invalid.
+            TimeoutError: If a service exceeded its startup timeout.
+        """
+        order = [name for layer in self.startup_order() for name in layer]
+        tasks: dict[str, asyncio.Task[None]] = {}
+
+        async def start(name: str) -> None:
+            registration = self._services[name]
+            # Dependencies come first in ``order``, so their tasks exist.
+            for dependency in registration.depends_on:
+                await tasks[dependency]
+            started = time.perf_counter()
+            timeout = asyncio.timeout(registration.startup_timeout)
+            try:
+                async with timeout:
+                    await registration.service.initialize()
+            except TimeoutError as e:
+                if not timeout.expired():
+                    raise
+                raise TimeoutError(
+                    f"Service {name!r} did not start within {registration.startup_timeout}s"
+                ) from e
+            self._timings[name] = time.perf_counter() - started
+            self._started.append(name)
+
+        for name in order:
+            tasks[name] = asyncio.create_task(start(name))
+        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            await self.shutdown()
+            raise errors[0]
+
+    async def shutdown(self) -> None:
+        """Shut down started services, each after the services depending on it.
+
+        Errors and timeouts are logged rather than raised, so one failing
+        service does not keep the others running.
+        """
+        started = set(self._started)
+        dependents: dict[str, list[str]] = {name: [] for name in started}
+        for name in started:
+            for dependency in self._services[name].depends_on:
+                dependents[dependency].append(name)
+        tasks: dict[str, asyncio.Task[None]] = {}
+
+        async def stop(name: str) -> None:
+            for dependent in dependents[name]:
+                await tasks[dependent]
+            try:
+                async with asyncio.timeout(self.shutdown_timeout):
+                    await self._services[name].service.shutdown()
+            except Exception:
+                logger.exception("Shutting down service %r failed", name)
+
+        # Reverse start order puts dependents first, so their tasks exist.
+        for name in reversed(self._started):
+            tasks[name] = asyncio.create_task(stop(name))
+        self._started = []
+        await asyncio.gather(*tasks.values())
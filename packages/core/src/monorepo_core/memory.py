@@ -0,0 +1,374 @@
+"""In-memory :class:`~monorepo_core.base.BaseRepository` with secondary indexes.
+
+:class:`InMemoryRepository` keeps entities in a dict keyed by ID, plus hash
+indexes for equality lookups and sorted indexes for range queries and
+ordered paging. Filters are answered from the most selective index that
+applies, and :meth:`InMemoryRepository.snapshot` gives a consistent
+read-only view that later writes do not disturb.
+"""
+
+import bisect
+import itertools
+from collections.abc import AsyncIterator, Iterable, Iterator, Mapping
+from dataclasses import dataclass
+from typing import Any, Generic, TypeVar
+
+from monorepo_core.base import BaseRepository
+from monorepo_core.utils import chunked
+from monorepo_shared.errors import ConflictError
+from monorepo_shared.types import Paginated, PaginationParams
+
+T = TypeVar("T")
+ID = TypeVar("ID")
+
+# Sorted index entries are (value is None, value, id): None never compares
+# with other values, so missing values are kept together after all others.
+_Entry = tuple[bool, Any, Any]
+
+
+@dataclass(frozen=True)
+class Range:
+    """Filter condition matching values between ``low`` and ``high``.
+
+    A bound of ``None`` leaves that side open. Entities whose value is
+    ``None`` never match.
+    """
+
+    low: Any = None
+    high: Any = None
+    low_inclusive: bool = True
+    high_inclusive: bool = True
+
+    def __contains__(self, value: Any) -> bool:
+        if value is None:
+            return False
+        if self.low is not None and (value < self.low if self.low_inclusive else value <= self.low):
+            return False
+        return self.high is None or (
+            value <= self.high if self.high_inclusive else value < self.high
+        )
+
+
+def _entry(value: Any, id: Any) -> _Entry:
+    return (value is None, value, id)
+
+
+def _bucket_key(entry: _Entry) -> tuple[bool, Any]:
+    return entry[:2]
+
+
+class _Tables(Generic[T, ID]):
+    """Rows and indexes of a repository, shared with snapshots until written."""
+
+    __slots__ = ("hashed", "id_field", "rows", "sorted")
+
+    def __init__(
+        self,
+        id_field: str,
+        hashed: Iterable[str] = (),
+        sorted_: Iterable[str] = (),
+    ) -> None:
+        self.id_field = id_field
+        self.rows: dict[ID, T] = {}
+        self.hashed: dict[str, dict[Any, dict[ID, None]]] = {field: {} for field in hashed}
+        self.sorted: dict[str, list[_Entry]] = {field: [] for field in sorted_}
+
+    def copy(self) -> "_Tables[T, ID]":
+        tables: _Tables[T, ID] = _Tables(self.id_field)
+        tables.rows = self.rows.copy()
+        tables.hashed = {
+            field: {value: ids.copy() for value, ids in index.items()}
+            for field, index in self.hashed.items()
+        }
+        tables.sorted = {field: entries.copy() for field, entries in self.sorted.items()}
+        return tables
+
+    def add(self, id: ID, entity: T) -> None:
+        self.rows[id] = entity
+        for field, index in self.hashed.items():
+            index.setdefault(getattr(entity, field), {})[id] = None
+        for field, entries in self.sorted.items():
+            bisect.insort(entries, _entry(getattr(entity, field), id))
+
+    def remove(self, id: ID) -> T:
+        entity = self.rows.pop(id)
+        for field, index in self.hashed.items():
+            value = getattr(entity, field)
+            ids = index[value]
+            del ids[id]
+            if not ids:
+                del index[value]
+        for field, entries in self.sorted.items():
+            del entries[bisect.bisect_left(entries, _entry(getattr(entity, field), id))]
+        return entity
+
+    def _span(self, entries: list[_Entry], condition: Range) -> tuple[int, int]:
+        """Bounds of the slice of ``entries`` whose values are in ``condition``."""
+        if condition.low is None:
+            start = 0
+        else:
+            find = bisect.bisect_left if condition.low_inclusive else bisect.bisect_right
+            start = find(entries, (False, condition.low), key=_bucket_key)
+        if condition.high is None:
+            end = bisect.bisect_left(entries, (True,))
+        else:
+            find = bisect.bisect_right if condition.high_inclusive else bisect.bisect_left
+            end = find(entries, (False, condition.high), key=_bucket_key)
+        return start, max(start, end)
+
+    def find(self, conditions: Mapping[str, Any]) -> Iterator[T]:
+        """Entities matching every condition.
+
+        The condition whose index yields the fewest candidates drives the
+        scan, in that index's order; the others are checked per candidate.
+        Without a usable index every entity is checked, in insertion order.
+        """
+        driver: str | None = None
+        candidates: Iterable[ID] = self.rows
+        span: tuple[list[_Entry], int, int] | None = None
+        size = len(self.rows)
+        for field, condition in conditions.items():
+            if not isinstance(condition, Range) and field in self.hashed:
+                ids = self.hashed[field].get(condition, {})
+                if len(ids) < size:
+                    driver, candidates, span, size = field, ids, None, len(ids)
+            elif field in self.sorted:
+                entries = self.sorted[field]
+                if isinstance(condition, Range):
+                    start, end = self._span(entries, condition)
+                elif condition is None:
+                    # Range(None, None) is unbounded; None values sort last.
+                    start, end = bisect.bisect_left(entries, (True,)), len(entries)
+                else:
+                    start, end = self._span(entries, Range(condition, condition))
+                if end - start < size:
+                    driver, span, size = field, (entries, start, end), end - start
+        if span is not None:
+            entries, start, end = span
+            candidates = [entry[2] for entry in entries[start:end]]
+        residual = [
+            (field, condition) for field, condition in conditions.items() if field != driver
+        ]
+        rows = self.rows
+        for id in candidates:
+            entity = rows[id]
+            if all(_matches(getattr(entity, field), condition) for field, condition in residual):
+                yield entity
+
+    def page(self, params: PaginationParams, conditions: Mapping[str, Any]) -> Paginated[T]:
+        """Get a page of matching entities ordered by ``params.sort_by``, then ID."""
+        start, stop = params.offset, params.offset + params.page_size
+        descending = params.sort_order == "desc"
+        field = params.sort_by
+        entries = self.sorted.get(field) if field is not None else None
+        if not conditions and entries is not None:
+            # With an index the page is a slice, however deep it is.
+            if descending:
+                count = len(entries)
+                window = entries[max(count - stop, 0) : max(count - start, 0)][::-1]
+            else:
+                window = entries[start:stop]
+            items = [self.rows[entry[2]] for entry in window]
+            return Paginated.create(items=items, total=len(self.rows), params=params)
+
+        matches = list(self.find(conditions)) if conditions else list(self.rows.values())
+        if field is not None:
+            id_field = self.id_field
+            matches.sort(
+                key=lambda entity: _entry(getattr(entity, field), getattr(entity, id_field)),
+                reverse=descending,
+            )
+        elif descending:
+            matches.reverse()
+        return Paginated.create(items=matches[start:stop], total=len(matches), params=params)
+
+
+def _matches(value: Any, condition: Any) -> bool:
+    if isinstance(condition, Range):
+        return value in condition
+    return bool(value == condition)
+
+
+class RepositorySnapshot(Generic[T, ID]):
+    """Read-only view of an :class:`InMemoryRepository` at one point in time.
+
+    Taking a snapshot is constant time: the repository copies its tables on
+    the next write instead, so the snapshot never sees later changes.
+    """
+
+    def __init__(self, tables: _Tables[T, ID]) -> None:
+        self._tables = tables
+
+    def __len__(self) -> int:
+        return len(self._tables.rows)
+
+    def __contains__(self, id: object) -> bool:
+        return id in self._tables.rows
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._tables.rows.values())
+
+    def get(self, id: ID) -> T | None:
+        """Get an entity by ID."""
+        return self._tables.rows.get(id)
+
+    def find(self, **conditions: Any) -> list[T]:
+        """Get the entities matching every condition, see :meth:`InMemoryRepository.find`."""
+        return list(self._tables.find(conditions))
+
+    def paginate(self, params: PaginationParams, **conditions: Any) -> Paginated[T]:
+        """Get a page of matching entities, see :meth:`InMemoryRepository.paginate`."""
+        return self._tables.page(params, conditions)
+
+
+class InMemoryRepository(BaseRepository[T, ID]):
+    """Repository keeping entities in memory, with secondary indexes.
+
+    Entities are stored by the attribute named by :attr:`id_field`. Hash
+    indexes answer equality conditions in constant time; sorted indexes
+    answer equality and :class:`Range` conditions, and serve
+    ``PaginationParams.sort_by`` and cursor pages as slices. Every write
+    updates the indexes, so replace entities through :meth:`update` rather
+    than mutating them in place.
+
+    The repository is meant for one event loop: no method awaits, so each
+    call is atomic with respect to other tasks.
+
+    Args:
+        entities: Initial entities.
+        hash_indexes: Fields to index for equality lookups. Values must be
+            hashable.
+        sorted_indexes: Fields to index for range queries and ordering.
+            Values must be comparable with each other.
+    """
+
+    def __init__(
+        self,
+        entities: Iterable[T] = (),
+        *,
+        hash_indexes: Iterable[str] = (),
+        sorted_indexes: Iterable[str] = (),
+    ) -> None:
+        self._tables: _Tables[T, ID] = _Tables(self.id_field, hash_indexes, sorted_indexes)
+        self._shared = False
+        for entity in entities:
+            self._tables.add(self._id_of(entity), entity)
+
+    def __len__(self) -> int:
+        return len(self._tables.rows)
+
+    def _id_of(self, entity: T) -> ID:
+        id: ID = getattr(entity, self.id_field)
+        return id
+
+    def _writable(self) -> _Tables[T, ID]:
+        if self._shared:
+            self._tables = self._tables.copy()
+            self._shared = False
+        return self._tables
+
+    def snapshot(self) -> RepositorySnapshot[T, ID]:
+        """Get a consistent read-only view of the current entities."""
+        self._shared = True
+        return RepositorySnapshot(self._tables)
+
+    async def get(self, id: ID) -> T | None:
+        return self._tables.rows.get(id)
+
+    async def get_all(self) -> list[T]:
+        return list(self._tables.rows.values())
+
+    async def create(self, entity: T) -> T:
+        """Create a new entity.
+
+        Raises:
+            ConflictError: If an entity with the same ID exists.
+        """
+        id = self._id_of(entity)
+        if id in self._tables.rows:
+            raise ConflictError(type(entity).__name__, details={"id": id})
+        self._writable().add(id, entity)
+        return entity
+
+    async def update(self, id: ID, entity: T) -> T | None:
+        if id not in self._tables.rows:
+            return None
+        tables = self._writable()
+        tables.remove(id)
+        tables.add(id, entity)
+        return entity
+
+    async def delete(self, id: ID) -> bool:
+        if id not in self._tables.rows:
+            return False
+        self._writable().remove(id)
+        return True
+
+    async def exists(self, id: ID) -> bool:
+        return id in self._tables.rows
+
+    async def get_many(self, ids: Iterable[ID]) -> list[T | None]:
+        rows = self._tables.rows
+        return [rows.get(id) for id in ids]
+
+    async def get_page(self, offset: int, limit: int) -> list[T]:
+        return list(itertools.islice(self._tables.rows.values(), offset, offset + limit))
+
+    async def stream(self, chunk_size: int = 1000) -> AsyncIterator[list[T]]:
+        """Iterate over the entities in chunks, as they were when iteration began."""
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        # One pass over a snapshot: paging with get_page would rescan from
+        # the start for every chunk.
+        for chunk in chunked(self.snapshot(), chunk_size):
+            yield chunk
+
+    async def find(self, **conditions: Any) -> list[T]:
+        """Get the entities matching every condition.
+
+        Each keyword names a field and gives either a value the field must
+        equal or a :class:`Range`. The most selective indexed condition
+        drives the lookup and sets the order of the results; the remaining
+        conditions are checked per candidate.
+        """
+        return list(self._tables.find(conditions))
+
+    async def count(self, **conditions: Any) -> int:
+        """Count the entities matching every condition, as in :meth:`find`."""
+        if not conditions:
+            return len(self._tables.rows)
+        return sum(1 for _ in self._tables.find(conditions))
+
+    async def paginate(self, params: PaginationParams, **conditions: Any) -> Paginated[T]:
+        """Get a page of the entities matching ``conditions``.
+
+        Entities are ordered by ``params.sort_by`` then ID, or by insertion
+        without a sort field. With a sorted index on the sort field and no
+        conditions, a page costs the same however deep it is.
+        """
+        return self._tables.page(params, conditions)
+
+    async def get_after(
+        self,
+        after: tuple[Any, ...] | None,
+        limit: int,
+        *,
+        sort_by: str | None = None,
+        descending: bool = False,
+    ) -> list[T]:
+        field = sort_by or self.id_field
+        entries = self._tables.sorted.get(field)
+        if entries is None:
+            return await super().get_after(after, limit, sort_by=sort_by, descending=descending)
+        rows = self._tables.rows
+        if after is None:
+            window = entries[-limit:][::-1] if descending else entries[:limit]
+        else:
+            probe = _entry(after[0], after[-1])
+            if descending:
+                end = bisect.bisect_left(entries, probe)
+                window = entries[max(end - limit, 0) : end][::-1]
+            else:
+                start = bisect.bisect_right(entries, probe)
+                window = entries[start : start + limit]
+        return [rows[entry[2]] for entry in window]
@@ -0,0 +1,519 @@
+"""In-process metrics registry with latency histograms and exporters."""
+
+import logging
+import socket
+import threading
+import weakref
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from typing import Generic, Protocol, TypeVar
+
+from monorepo_core import _fork
+
+# Histogram buckets keep 7 significant bits (128 sub-buckets per power of
+# two), bounding the relative error of reported percentiles below 1%.
+_SUB_BITS = 7
+_SUB_COUNT = 1 << _SUB_BITS
+_NS_PER_SECOND = 1_000_000_000
+
+Labels = tuple[tuple[str, str], ...]
+S = TypeVar("S")
+
+
+def _bucket_index(value: int) -> int:
+    if value < _SUB_COUNT:
+        return value
+    shift = value.bit_length() - _SUB_BITS - 1
+    return ((shift + 1) << _SUB_BITS) + (value >> shift) - _SUB_COUNT
+
+
+def _bucket_value(index: int) -> int:
+    """Midpoint of the values mapped to bucket ``index``."""
+    if index < _SUB_COUNT:
+        return index
+    shift = (index >> _SUB_BITS) - 1
+    lower = (_SUB_COUNT + (index & (_SUB_COUNT - 1))) << shift
+    return lower + (1 << shift) // 2
+
+
+class _CounterShard:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0
+
+
+class _HistogramShard:
+    __slots__ = ("count", "counts", "max", "total")
+
+    def __init__(self) -> None:
+        self.counts: dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+
+class _ThreadExit:
+    """Thread-local token whose collection signals that its thread exited."""
+
+    __slots__ = ("__weakref__",)
+
+
+class _ThreadSharded(ABC, Generic[S]):
+    """Gives each thread its own shard so recording never takes a lock.
+
+    When a thread exits, its shard is folded into a base shard, so the number
+    of shards tracks live threads rather than every thread ever seen.
+    """
+
+    def __init__(self, name: str, labels: Labels) -> None:
+        self.name = name
+        self.labels = labels
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: list[S] = []
+        self._retired: list[S] = []
+        self._base = self._new_shard()
+
+    @abstractmethod
+    def _new_shard(self) -> S:
+        """Return an empty shard."""
+        ...
+
+    @abstractmethod
+    def _merge(self, base: S, shard: S) -> S:
+        """Return a new shard holding the data of ``base`` and ``shard``."""
+        ...
+
+    def _all_shards(self) -> list[S]:
+        with self._lock:
+            self._fold_retired()
+            return [self._base, *self._shards]
+
+    def _register(self, shard: S) -> None:
+        self._local.shard = shard
+        # Runs when the thread-local dict is dropped at thread exit. It only
+        # appends, so it never waits on a lock that a dead thread may hold.
+        token = _ThreadExit()
+        self._local.token = token
+        weakref.finalize(token, self._retired.append, shard).atexit = False
+        with self._lock:
+            self._fold_retired()
+            self._shards.append(shard)
+
+    def _fold_retired(self) -> None:
+        # Called with the lock held. The base shard is replaced rather than
+        # updated so that snapshots taken outside the lock stay consistent.
+        retired = self._retired
+        while retired:
+            shard = retired.pop()
+            for i, live in enumerate(self._shards):
+                if live is shard:
+                    del self._shards[i]
+                    self._base = self._merge(self._base, shard)
+                    break
+
+    def reset(self) -> None:
+        """Discard all recorded data."""
+        with self._lock:
+            self._local = threading.local()
+            self._shards = []
+            self._retired = []
+            self._base = self._new_shard()
+
+
+class Counter(_ThreadSharded[_CounterShard]):
+    """Monotonic counter."""
+
+    def inc(self, amount: int = 1) -> None:
+        """Increase the counter by ``amount``."""
+        try:
+            shard: _CounterShard = self._local.shard
+        except AttributeError:
+            shard = _CounterShard()
+            self._register(shard)
+        shard.value += amount
+
+    def _new_shard(self) -> _CounterShard:
+        return _CounterShard()
+
+    def _merge(self, base: _CounterShard, shard: _CounterShard) -> _CounterShard:
+        merged = _CounterShard()
+        merged.value = base.value + shard.value
+        return merged
+
+    def snapshot(self) -> "CounterSnapshot":
+        """Return the current total."""
+        total = sum(shard.value for shard in self._all_shards())
+        return CounterSnapshot(self.name, self.labels, total)
+
+
+class Gauge:
+    """Value that goes up and down, such as a queue depth.
+
+    Only the latest value is kept, so setting it is a plain assignment.
+    """
+
+    def __init__(self, name: str, labels: Labels) -> None:
+        self.name = name
+        self.labels = labels
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        """Replace the current value."""
+        self.value = value
+
+    def snapshot(self) -> "GaugeSnapshot":
+        """Return the current value."""
+        return GaugeSnapshot(self.name, self.labels, self.value)
+
+    def reset(self) -> None:
+        """Set the value back to zero."""
+        self.value = 0.0
+
+
+class Histogram(_ThreadSharded[_HistogramShard]):
+    """Log-linear (HDR-style) histogram of durations.
+
+    Values are stored in nanoseconds in buckets whose width grows with their
+    magnitude, so percentiles stay within 1% of the true value while memory
+    is bounded by the range of values seen rather than their number.
+    """
+
+    def record(self, seconds: float) -> None:
+        """Record a duration in seconds."""
+        self.record_ns(int(seconds * _NS_PER_SECOND))
+
+    def record_ns(self, value: int) -> None:
+        """Record a duration in nanoseconds."""
+        try:
+            shard: _HistogramShard = self._local.shard
+        except AttributeError:
+            shard = _HistogramShard()
+            self._register(shard)
+        # Inlined _bucket_index: this is the hot path of every timed call.
+        if value < _SUB_COUNT:
+            index = max(value, 0)
+        else:
+            shift = value.bit_length() - _SUB_BITS - 1
+            index = ((shift + 1) << _SUB_BITS) + (value >> shift) - _SUB_COUNT
+        counts = shard.counts
+        counts[index] = counts.get(index, 0) + 1
+        shard.count += 1
+        shard.total += value
+        if value > shard.max:  # noqa: PLR1730 - cheaper than calling max()
+            shard.max = value
+
+    def _new_shard(self) -> _HistogramShard:
+        return _HistogramShard()
+
+    def _merge(self, base: _HistogramShard, shard: _HistogramShard) -> _HistogramShard:
+        merged = _HistogramShard()
+        merged.counts = dict(base.counts)
+        for index, n in shard.counts.items():
+            merged.counts[index] = merged.counts.get(index, 0) + n
+        merged.count = base.count + shard.count
+        merged.total = base.total + shard.total
+        merged.max = max(base.max, shard.max)
+        return merged
+
+    def snapshot(self) -> "HistogramSnapshot":
+        """Merge every thread's data into a snapshot."""
+        buckets: dict[int, int] = {}
+        count = total = maximum = 0
+        for shard in self._all_shards():
+            for index, n in dict(shard.counts).items():
+                buckets[index] = buckets.get(index, 0) + n
+            count += shard.count
+            total += shard.total
+            maximum = max(maximum, shard.max)
+        return HistogramSnapshot(
+            self.name, self.labels, count, total, maximum, tuple(sorted(buckets.items()))
+        )
+
+
+@dataclass(frozen=True)
+class CounterSnapshot:
+    """Point-in-time value of a counter."""
+
+    name: str
+    labels: Labels
+    value: int
+
+
+@dataclass(frozen=True)
+class GaugeSnapshot:
+    """Point-in-time value of a gauge."""
+
+    name: str
+    labels: Labels
+    value: float
+
+
+@dataclass(frozen=True)
+class HistogramSnapshot:
+    """Point-in-time view of a histogram. Durations are in seconds."""
+
+    name: str
+    labels: Labels
+    count: int
+    sum_ns: int
+    max_ns: int
+    buckets: tuple[tuple[int, int], ...] = field(repr=False)
+
+    @property
+    def sum(self) -> float:
+        return self.sum_ns / _NS_PER_SECOND
+
+    @property
+    def max(self) -> float:
+        return self.max_ns / _NS_PER_SECOND
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Return the ``q``-th percentile (0-100) in seconds."""
+        if not self.count:
+            return 0.0
+        rank = max(1, round(q / 100 * self.count))
+        seen = 0
+        for index, n in self.buckets:
+            seen += n
+            if seen >= rank:
+                return min(_bucket_value(index), self.max_ns) / _NS_PER_SECOND
+        return self.max
+
+    @property
+    def p50(self) -> float:
+        return self.percentile(50)
+
+    @property
+    def p95(self) -> float:
+        return self.percentile(95)
+
+    @property
+    def p99(self) -> float:
+        return self.percentile(99)
+
+
+MetricSnapshot = CounterSnapshot | GaugeSnapshot | HistogramSnapshot
+M = TypeVar("M", Counter, Gauge, Histogram)
+
+
+class MetricsExporter(Protocol):
+    """Destination for metric snapshots."""
+
+    def export(self, snapshots: Sequence[MetricSnapshot]) -> None: ...
+
+
+class MetricsRegistry:
+    """Collection of named, labelled metrics.
+
+    Metrics are created on first use and identified by name plus labels, so
+    hot paths should look their metric up once and keep the reference.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: dict[tuple[str, Labels], Counter | Gauge | Histogram] = {}
+        _fork.register(self)
+
+    def counter(self, name: str, **labels: str) -> Counter:
+        """Get or create a counter."""
+        return self._get_or_create(Counter, name, labels)
+
+    def gauge(self, name: str, **labels: str) -> Gauge:
+        """Get or create a gauge."""
+        return self._get_or_create(Gauge, name, labels)
+
+    def histogram(self, name: str, **labels: str) -> Histogram:
+        """Get or create a histogram."""
+        return self._get_or_create(Histogram, name, labels)
+
+    def _get_or_create(self, kind: type[M], name: str, labels: dict[str, str]) -> M:
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(key, kind(*key))
+        if not isinstance(metric, kind):
+            raise ValueError(f"Metric {name!r} is already registered as a {type(metric).__name__}")
+        return metric
+
+    def collect(self) -> list[MetricSnapshot]:
+        """Snapshot every metric."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return [metric.snapshot() for metric in metrics]
+
+    def export(self, *exporters: MetricsExporter) -> None:
+        """Send a snapshot of every metric to each exporter."""
+        snapshots = self.collect()
+        for exporter in exporters:
+            exporter.export(snapshots)
+
+    def reset(self) -> None:
+        """Discard all recorded data, keeping the metrics registered."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+    def _after_fork_in_child(self) -> None:
+        # Children report their own activity, not a copy of the parent's.
+        self._lock = threading.Lock()
+        for metric in self._metrics.values():
+            if isinstance(metric, _ThreadSharded):
+                metric._lock = threading.Lock()
+            metric.reset()
+
+
+default_registry = MetricsRegistry()
+
+
+def _format_labels(labels: Iterable[tuple[str, str]]) -> str:
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+    return ",".join(f'{key}="{escape(value)}"' for key, value in labels)
+
+
+def render_prometheus(snapshots: Sequence[MetricSnapshot]) -> str:
+    """Render snapshots in the Prometheus text exposition format.
+
+    Histograms are exposed as summaries with 0.5, 0.95 and 0.99 quantiles.
+    Counters get a ``_total`` suffix, in their ``# TYPE`` line as well, since
+    that line must name the samples it describes.
+    """
+    lines: list[str] = []
+    declared: set[str] = set()
+    for snapshot in sorted(snapshots, key=lambda snapshot: snapshot.name):
+        if isinstance(snapshot, CounterSnapshot):
+            name = snapshot.name if snapshot.name.endswith("_total") else f"{snapshot.name}_total"
+            if name not in declared:
+                lines.append(f"# TYPE {name} counter")
+                declared.add(name)
+            lines.append(f"{name}{{{_format_labels(snapshot.labels)}}} {snapshot.value}")
+            continue
+        if isinstance(snapshot, GaugeSnapshot):
+            if snapshot.name not in declared:
+                lines.append(f"# TYPE {snapshot.name} gauge")
+                declared.add(snapshot.name)
+            lines.append(f"{snapshot.name}{{{_format_labels(snapshot.labels)}}} {snapshot.value:g}")
+            continue
+        if snapshot.name not in declared:
+            lines.append(f"# TYPE {snapshot.name} summary")
+            declared.add(snapshot.name)
+        for q in (0.5, 0.95, 0.99):
+            labels = _format_labels((*snapshot.labels, ("quantile", str(q))))
+            lines.append(f"{snapshot.name}{{{labels}}} {snapshot.percentile(q * 100):.9f}")
+        labels = _format_labels(snapshot.labels)
+        lines.append(f"{snapshot.name}_sum{{{labels}}} {snapshot.sum:.9f}")
+        lines.append(f"{snapshot.name}_count{{{labels}}} {snapshot.count}")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+class PrometheusExporter:
+    """Keeps the latest export rendered for a Prometheus scrape endpoint."""
+
+    def __init__(self) -> None:
+        self.text = ""
+
+    def export(self, snapshots: Sequence[MetricSnapshot]) -> None:
+        self.text = render_prometheus(snapshots)
+
+
+class LoggingExporter:
+    """Logs one line per metric."""
+
+    def __init__(self, logger: logging.Logger | None = None, level: int = logging.INFO) -> None:
+        self.logger = logger or logging.getLogger("monorepo_core.metrics")
+        self.level = level
+
+    def export(self, snapshots: Sequence[MetricSnapshot]) -> None:
+        for snapshot in snapshots:
+            labels = _format_labels(snapshot.labels)
+            if isinstance(snapshot, CounterSnapshot):
+                self.logger.log(self.level, "%s{%s} %d", snapshot.name, labels, snapshot.value)
+            elif isinstance(snapshot, GaugeSnapshot):
+                self.logger.log(self.level, "%s{%s} %g", snapshot.name, labels, snapshot.value)
+            else:
+                self.logger.log(
+                    self.level,
+                    "%s{%s} count=%d p50=%.6fs p95=%.6fs p99=%.6fs max=%.6fs",
+                    snapshot.name,
+                    labels,
+                    snapshot.count,
+                    snapshot.p50,
+                    snapshot.p95,
+                    snapshot.p99,
+                    snapshot.max,
+                )
+
+
+class StatsDExporter:
+    """Sends metrics to a StatsD daemon over UDP.
+
+    Counters and histogram counts are sent as deltas since the previous
+    export. Gauges, histogram percentiles and maxima are sent as gauges,
+    the latter in milliseconds. Label values are appended to the metric name.
+
+    Args:
+        host: StatsD host.
+        port: StatsD UDP port.
+        prefix: Prefix for every metric name.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8125, prefix: str = "") -> None:
+        self.address = (host, port)
+        self.prefix = prefix
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._last: dict[tuple[str, Labels], int] = {}
+
+    def close(self) -> None:
+        """Close the UDP socket."""
+        self._sock.close()
+
+    def _metric_name(self, snapshot: MetricSnapshot) -> str:
+        parts = [self.prefix + snapshot.name] if self.prefix else [snapshot.name]
+        parts.extend(value.replace(".", "_").replace(":", "_") for _, value in snapshot.labels)
+        return ".".join(parts)
+
+    def _delta(self, snapshot: MetricSnapshot, total: int) -> int:
+        key = (snapshot.name, snapshot.labels)
+        delta = total - self._last.get(key, 0)
+        self._last[key] = total
+        return delta
+
+    def export(self, snapshots: Sequence[MetricSnapshot]) -> None:
+        lines: list[str] = []
+        for snapshot in snapshots:
+            name = self._metric_name(snapshot)
+            if isinstance(snapshot, CounterSnapshot):
+                lines.append(f"{name}:{self._delta(snapshot, snapshot.value)}|c")
+                continue
+            if isinstance(snapshot, GaugeSnapshot):
+                lines.append(f"{name}:{snapshot.value:g}|g")
+                continue
+            lines.append(f"{name}.count:{self._delta(snapshot, snapshot.count)}|c")
+            for label, value in (
+                ("p50", snapshot.p50),
+                ("p95", snapshot.p95),
+                ("p99", snapshot.p99),
+                ("max", snapshot.max),
+            ):
+                lines.append(f"{name}.{label}:{value * 1000:.3f}|g")
+        # Batch lines into datagrams that stay under a typical MTU.
+        batch: list[str] = []
+        size = 0
+        for line in lines:
+            if batch and size + len(line) + 1 > 1400:
+                self._sock.sendto("\n".join(batch).encode(), self.address)
+                batch, size = [], 0
+            batch.append(line)
+            size += len(line) + 1
+        if batch:
+            self._sock.sendto("\n".join(batch).encode(), self.address)
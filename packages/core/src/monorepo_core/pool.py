@@ -0,0 +1,332 @@
+"""Generic async connection pool.
+
+:class:`ConnectionPool` keeps between ``min_size`` and ``max_size``
+connections made by any async factory, reuses the most recently returned
+one first so warm connections stay warm, closes connections left idle too
+long, and checks a connection's health before reusing it after a pause.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+from monorepo_core import _fork
+from monorepo_core.base import BaseService
+from monorepo_shared.errors import PoolExhaustedError
+
+C = TypeVar("C")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PoolStats:
+    """Snapshot of connection pool statistics."""
+
+    name: str
+    size: int
+    idle: int
+    in_use: int
+    waiting: int
+    max_size: int
+    created: int
+    closed: int
+    acquired: int
+    timeouts: int
+    failed_health_checks: int
+
+    @property
+    def utilization(self) -> float:
+        """Fraction of ``max_size`` connections currently in use."""
+        return self.in_use / self.max_size
+
+
+class ConnectionPool(BaseService, Generic[C]):
+    """Pool of connections made by ``factory``.
+
+    :meth:`initialize` opens ``min_size`` connections concurrently and
+    starts a maintenance task closing connections idle for longer than
+    ``idle_timeout`` (never going below ``min_size``) and reopening
+    connections up to ``min_size``. :meth:`shutdown` closes idle
+    connections at once and the others as they are returned.
+
+    Connections are handed out most recently returned first. One idle for
+    at least ``health_check_after`` seconds is passed to ``health_check``
+    first and replaced if the check fails. When all ``max_size``
+    connections are in use, callers queue in FIFO order for up to
+    ``acquire_timeout`` seconds.
+
+    The pool belongs to the event loop it is used from.
+
+    Args:
+        factory: Coroutine function opening a connection.
+        close: Coroutine function closing a connection.
+        health_check: Coroutine function returning whether a connection is
+            usable; exceptions count as a failed check.
+        min_size: Connections kept open even when idle.
+        max_size: Most connections open at once.
+        idle_timeout: Seconds before an idle connection above ``min_size``
+            is closed, or ``None`` to keep them.
+        health_check_after: Idle seconds after which a connection is checked
+            before reuse.
+        acquire_timeout: Seconds to wait for a connection, or ``None`` to
+            wait indefinitely.
+        discard_on: Exceptions raised while a connection is held that mean
+            it is broken and must not be reused.
+        name: Label for statistics and errors.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Awaitable[C]],
+        *,
+        close: Callable[[C], Awaitable[object]] | None = None,
+        health_check: Callable[[C], Awaitable[bool]] | None = None,
+        min_size: int = 1,
+        max_size: int = 10,
+        idle_timeout: float | None = 300.0,
+        health_check_after: float = 30.0,
+        acquire_timeout: float | None = 30.0,
+        discard_on: tuple[type[BaseException], ...] = (ConnectionError,),
+        name: str = "default",
+    ) -> None:
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError("sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+        if idle_timeout is not None and idle_timeout <= 0:
+            raise ValueError("idle_timeout must be positive")
+        self.factory = factory
+        self._close = close
+        self.health_check = health_check
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.acquire_timeout = acquire_timeout
+        self.discard_on = discard_on
+        self.name = name
+        # Idle connections with the time they were returned, oldest first.
+        self._idle: deque[tuple[C, float]] = deque()
+        self._waiters: deque[asyncio.Future[C | None]] = deque()
+        self._size = 0  # open connections, including those being opened
+        self._in_use = 0
+        self._closed = False
+        self._maintainer: asyncio.Task[None] | None = None
+        self._created = 0
+        self._closed_count = 0
+        self._acquired = 0
+        self._timeouts = 0
+        self._failed_checks = 0
+        _fork.register(self)
+
+    async def initialize(self) -> None:
+        """Open ``min_size`` connections and start pool maintenance."""
+        self._closed = False
+        errors = await self._fill()
+        if errors:
+            raise errors[0]
+        if self._maintainer is None:
+            self._maintainer = asyncio.create_task(self._maintain())
+
+    async def shutdown(self) -> None:
+        """Close idle connections and reject waiting and future callers."""
+        self._closed = True
+        if self._maintainer is not None:
+            self._maintainer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._maintainer
+            self._maintainer = None
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(PoolExhaustedError(self.name, details={"closed": True}))
+        idle = [conn for conn, _ in self._idle]
+        self._idle.clear()
+        await asyncio.gather(*(self._discard(conn) for conn in idle))
+
+    def stats(self) -> PoolStats:
+        """Return a snapshot of the pool statistics."""
+        return PoolStats(
+            name=self.name,
+            size=self._size,
+            idle=len(self._idle),
+            in_use=self._in_use,
+            waiting=len(self._waiters),
+            max_size=self.max_size,
+            created=self._created,
+            closed=self._closed_count,
+            acquired=self._acquired,
+            timeouts=self._timeouts,
+            failed_health_checks=self._failed_checks,
+        )
+
+    @contextlib.asynccontextmanager
+    async def acquire(self) -> AsyncIterator[C]:
+        """Hold a connection for the duration of an ``async with`` block.
+
+        Raises:
+            PoolExhaustedError: If no connection became available within
+                ``acquire_timeout`` or the pool is shut down.
+        """
+        conn = await self._checkout()
+        try:
+            yield conn
+        except BaseException as e:
+            await self._checkin(conn, broken=isinstance(e, self.discard_on))
+            raise
+        await self._checkin(conn, broken=False)
+
+    async def _checkout(self) -> C:
+        if self._closed:
+            raise PoolExhaustedError(self.name, details={"closed": True})
+        timeout = asyncio.timeout(self.acquire_timeout)
+        try:
+            async with timeout:
+                conn = await self._get()
+        except TimeoutError:
+            if not timeout.expired():
+                raise  # from the factory or health check, not the wait
+            self._timeouts += 1
+            raise PoolExhaustedError(self.name, self.acquire_timeout) from None
+        self._in_use += 1
+        self._acquired += 1
+        return conn
+
+    async def _get(self) -> C:
+        while True:
+            if self._idle:
+                conn, returned_at = self._idle.pop()
+                check = self.health_check
+                if check is None or time.monotonic() - returned_at < self.health_check_after:
+                    return conn
+                try:
+                    healthy = await self._healthy(conn, check)
+                except BaseException:
+                    self._idle.appendleft((conn, returned_at))  # cancelled mid-check
+                    raise
+                if healthy:
+                    return conn
+                await self._discard(conn)
+            elif self._size < self.max_size:
+                return await self._open()
+            else:
+                conn_or_slot = await self._wait()
+                if conn_or_slot is not None:
+                    return conn_or_slot
+                # A connection was discarded, so there is room to open one.
+
+    async def _wait(self) -> C | None:
+        waiter: asyncio.Future[C | None] = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                # Handed a connection just as the wait was cancelled: pass it on.
+                handed = waiter.result()
+                if handed is None:
+                    self._wake_one(None)
+                else:
+                    self._hand_off(handed)
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    async def _healthy(self, conn: C, check: Callable[[C], Awaitable[bool]]) -> bool:
+        try:
+            healthy = await check(conn)
+        except Exception:
+            healthy = False
+        if not healthy:
+            self._failed_checks += 1
+        return healthy
+
+    async def _open(self) -> C:
+        self._size += 1
+        try:
+            conn = await self.factory()
+        except BaseException:
+            self._size -= 1
+            self._wake_one(None)
+            raise
+        self._created += 1
+        return conn
+
+    async def _discard(self, conn: C) -> None:
+        self._size -= 1
+        self._closed_count += 1
+        if self._close is not None:
+            try:
+                await self._close(conn)
+            except Exception:
+                logger.warning("Closing a connection of pool %s failed", self.name, exc_info=True)
+
+    async def _checkin(self, conn: C, *, broken: bool) -> None:
+        self._in_use -= 1
+        if broken or self._closed:
+            await self._discard(conn)
+            self._wake_one(None)
+        else:
+            self._hand_off(conn)
+        await self._reap(time.monotonic())
+
+    def _hand_off(self, conn: C) -> None:
+        """Give ``conn`` to the longest-waiting caller, or make it idle."""
+        if not self._wake_one(conn):
+            self._idle.append((conn, time.monotonic()))
+
+    def _wake_one(self, result: C | None) -> bool:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(result)
+                return True
+        return False
+
+    async def _reap(self, now: float) -> None:
+        """Close the oldest idle connections past ``idle_timeout``."""
+        if self.idle_timeout is None:
+            return
+        while (
+            self._idle
+            and self._size > self.min_size
+            and now - self._idle[0][1] >= self.idle_timeout
+        ):
+            conn, _ = self._idle.popleft()
+            await self._discard(conn)
+
+    async def _fill(self) -> list[BaseException]:
+        """Open connections up to ``min_size``, returning the errors raised."""
+        missing = self.min_size - self._size
+        if missing <= 0:
+            return []
+        opened = await asyncio.gather(
+            *(self._open() for _ in range(missing)), return_exceptions=True
+        )
+        errors = []
+        for conn in opened:
+            if isinstance(conn, BaseException):
+                errors.append(conn)
+            else:
+                self._hand_off(conn)
+        return errors
+
+    async def _maintain(self) -> None:
+        interval = self.idle_timeout / 2 if self.idle_timeout is not None else 30.0
+        while True:
+            await asyncio.sleep(interval)
+            await self._reap(time.monotonic())
+            for error in await self._fill():
+                logger.warning("Opening a connection for pool %s failed: %r", self.name, error)
+
+    def _after_fork_in_child(self) -> None:
+        # Connections and waiters belong to the parent's sockets and loop.
+        self._idle = deque()
+        self._waiters = deque()
+        self._size = 0
+        self._in_use = 0
+        self._maintainer = None
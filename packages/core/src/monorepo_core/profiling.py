@@ -0,0 +1,332 @@
+"""Sampling and slow-call capture for ``timed``.
+
+Samplers decide which calls get measured, so instrumentation can stay on in
+production at a bounded cost. Sampled calls slower than a threshold are kept
+in a :class:`SlowCallLog`, optionally with a ``cProfile`` or ``tracemalloc``
+report of a later slow call.
+"""
+
+import cProfile
+import functools
+import heapq
+import io
+import itertools
+import math
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import Protocol, TextIO
+
+from monorepo_core import _fork
+from monorepo_core.metrics import Histogram
+
+_NS_PER_SECOND = 1_000_000_000
+_REPORT_LINES = 20
+# Profiling a call slows it down, so a function is captured at most this often.
+_CAPTURE_COOLDOWN_SECONDS = 60.0
+
+
+class Sampler(Protocol):
+    """Decides which calls are measured."""
+
+    def sample(self) -> bool:
+        """Return whether the upcoming call should be measured."""
+        ...
+
+    def observe(self, elapsed_ns: int) -> None:
+        """Receive the duration of a measured call."""
+        ...
+
+
+class EveryNthSampler:
+    """Measures every ``n``-th call."""
+
+    def __init__(self, n: int) -> None:
+        if n < 1:
+            raise ValueError("n must be at least 1")
+        self.n = n
+        self._calls = itertools.count()
+
+    def sample(self) -> bool:
+        # next() on itertools.count is atomic, so threads never share a slot.
+        return next(self._calls) % self.n == 0
+
+    def observe(self, elapsed_ns: int) -> None:
+        pass
+
+
+class ProbabilisticSampler:
+    """Measures each call independently with probability ``rate``."""
+
+    def __init__(self, rate: float) -> None:
+        if not 0.0 < rate <= 1.0:
+            raise ValueError("rate must be in (0, 1]")
+        self.rate = rate
+        self._random = random.random
+
+    def sample(self) -> bool:
+        return self._random() < self.rate
+
+    def observe(self, elapsed_ns: int) -> None:
+        pass
+
+
+class AdaptiveSampler:
+    """Adjusts the sampling rate to keep instrumentation within a budget.
+
+    The cost of measuring one call is calibrated once; the sampler then
+    tracks the average duration of the calls it measures and samples just
+    often enough that measuring costs at most ``overhead_budget`` of the
+    function's own run time. Cheap functions are sampled rarely, slow ones
+    on every call.
+    """
+
+    def __init__(
+        self,
+        overhead_budget: float = 0.01,
+        *,
+        min_rate: float = 0.0001,
+        smoothing: float = 0.05,
+        cost_ns: int | None = None,
+    ) -> None:
+        if not 0.0 < overhead_budget <= 1.0:
+            raise ValueError("overhead_budget must be in (0, 1]")
+        if not 0.0 < min_rate <= 1.0:
+            raise ValueError("min_rate must be in (0, 1]")
+        self.overhead_budget = overhead_budget
+        self.min_rate = min_rate
+        self.smoothing = smoothing
+        self.cost_ns = cost_ns if cost_ns is not None else _measurement_cost_ns()
+        self._mean_ns = 0.0
+        self._interval = 1
+        self._skip = 0
+
+    @property
+    def rate(self) -> float:
+        """Current fraction of calls being measured."""
+        return 1.0 / self._interval
+
+    def sample(self) -> bool:
+        # A countdown keeps unsampled calls to a compare and a decrement.
+        # Concurrent threads may race on it, which only blurs the rate.
+        if self._skip > 0:
+            self._skip -= 1
+            return False
+        self._skip = self._interval - 1
+        return True
+
+    def observe(self, elapsed_ns: int) -> None:
+        if self._mean_ns:
+            self._mean_ns += self.smoothing * (elapsed_ns - self._mean_ns)
+        else:
+            self._mean_ns = float(elapsed_ns)
+        rate = self.overhead_budget * self._mean_ns / self.cost_ns
+        rate = min(max(rate, self.min_rate), 1.0)
+        self._interval = math.ceil(1.0 / rate)
+
+
+@functools.cache
+def _measurement_cost_ns() -> int:
+    """Time the clock reads and histogram update done per measured call."""
+    histogram = Histogram("calibration", ())
+    clock = time.perf_counter_ns
+    rounds = 2000
+    start = clock()
+    for _ in range(rounds):
+        histogram.record_ns(clock() - clock())
+    return max((clock() - start) // rounds, 1)
+
+
+class ProfileCapture(StrEnum):
+    """Profiler run on a slow call."""
+
+    CPROFILE = "cprofile"
+    TRACEMALLOC = "tracemalloc"
+
+
+@dataclass(frozen=True, slots=True)
+class SlowCall:
+    """A measured call that exceeded its slow threshold."""
+
+    function: str
+    duration: float
+    call_site: str
+    timestamp: float
+    profile: str | None = None
+
+
+class SlowCallLog:
+    """Keeps the ``capacity`` slowest calls reported to it."""
+
+    def __init__(self, capacity: int = 100) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._heap: list[tuple[float, int, SlowCall]] = []
+        self._order = itertools.count()
+        _fork.register(self)
+
+    def add(self, call: SlowCall) -> None:
+        """Record a slow call, dropping the fastest one when full."""
+        item = (call.duration, next(self._order), call)
+        with self._lock:
+            if len(self._heap) < self.capacity:
+                heapq.heappush(self._heap, item)
+            elif item > self._heap[0]:
+                heapq.heapreplace(self._heap, item)
+
+    def slowest(self, n: int = 10) -> list[SlowCall]:
+        """Return up to ``n`` calls, slowest first."""
+        with self._lock:
+            items = heapq.nlargest(n, self._heap)
+        return [call for _, _, call in items]
+
+    def dump(self, n: int = 10, file: TextIO | None = None) -> str:
+        """Format the ``n`` slowest calls, writing the report to ``file`` if given."""
+        lines = []
+        for rank, call in enumerate(self.slowest(n), 1):
+            lines.append(
+                f"{rank}. {call.function} {call.duration * 1000:.3f}ms at {call.call_site}"
+            )
+            if call.profile:
+                lines.extend(f"    {line}" for line in call.profile.splitlines())
+        report = "\n".join(lines) + "\n" if lines else ""
+        if file is not None:
+            file.write(report)
+        return report
+
+    def clear(self) -> None:
+        """Forget all recorded calls."""
+        with self._lock:
+            self._heap.clear()
+
+    def _after_fork_in_child(self) -> None:
+        self._lock = threading.Lock()
+        self._heap = []
+
+
+default_slow_log = SlowCallLog()
+
+# Only one profiler can be active per interpreter, so captures are serialised
+# and skipped rather than queued when another is running.
+_capture_lock = threading.Lock()
+
+
+@contextmanager
+def _cprofile(report: list[str]) -> Iterator[None]:
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # another profiler (or debugger) owns the hook
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(_REPORT_LINES)
+        report.append(stream.getvalue().strip())
+
+
+@contextmanager
+def _tracemalloc(report: list[str]) -> Iterator[None]:
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    try:
+        yield
+    finally:
+        after = tracemalloc.take_snapshot()
+        if started:
+            tracemalloc.stop()
+        stats = after.compare_to(before, "lineno")[:_REPORT_LINES]
+        report.append("\n".join(str(stat) for stat in stats))
+
+
+_CAPTURES: dict[ProfileCapture, Callable[[list[str]], AbstractContextManager[None]]] = {
+    ProfileCapture.CPROFILE: _cprofile,
+    ProfileCapture.TRACEMALLOC: _tracemalloc,
+}
+_NO_CAPTURE: AbstractContextManager[None] = nullcontext()
+
+
+class _Probe:
+    """Per-function measurement state used by ``timed``.
+
+    A sampled call slower than the threshold is logged and, when a capture is
+    configured, arms the profiler for the next sampled call, since a call
+    can only be known to be slow once it is over.
+    """
+
+    def __init__(
+        self,
+        histogram: Histogram,
+        function: str,
+        *,
+        sampler: Sampler | None,
+        slow_threshold: float | None,
+        capture: ProfileCapture | None,
+        slow_log: SlowCallLog,
+    ) -> None:
+        self.histogram = histogram
+        self.function = function
+        self.sampler = sampler
+        self.sample: Callable[[], bool] = sampler.sample if sampler else lambda: True
+        self.threshold_ns = (
+            int(slow_threshold * _NS_PER_SECOND) if slow_threshold is not None else None
+        )
+        self.capture_factory = _CAPTURES[capture] if capture else None
+        self.slow_log = slow_log
+        self.armed = False
+        self._next_capture = 0.0
+
+    def capture(self, report: list[str]) -> AbstractContextManager[None]:
+        """Profile the upcoming call into ``report`` if armed."""
+        factory = self.capture_factory
+        if not self.armed or factory is None or not _capture_lock.acquire(blocking=False):
+            return _NO_CAPTURE
+        self.armed = False
+        self._next_capture = time.monotonic() + _CAPTURE_COOLDOWN_SECONDS
+        return self._captured(factory, report)
+
+    @staticmethod
+    @contextmanager
+    def _captured(
+        factory: Callable[[list[str]], AbstractContextManager[None]], report: list[str]
+    ) -> Iterator[None]:
+        try:
+            with factory(report):
+                yield
+        finally:
+            _capture_lock.release()
+
+    def finish(self, elapsed_ns: int, report: list[str]) -> None:
+        """Record a measured call; called directly from the wrapper."""
+        self.histogram.record_ns(elapsed_ns)
+        if self.sampler is not None:
+            self.sampler.observe(elapsed_ns)
+        if self.threshold_ns is None or elapsed_ns < self.threshold_ns:
+            return
+        caller = sys._getframe(2)  # finish <- wrapper <- call site
+        self.slow_log.add(
+            SlowCall(
+                self.function,
+                elapsed_ns / _NS_PER_SECOND,
+                f"{caller.f_code.co_filename}:{caller.f_lineno}",
+                time.time(),
+                report[0] if report else None,
+            )
+        )
+        if self.capture_factory and not report and time.monotonic() >= self._next_capture:
+            self.armed = True
@@ -0,0 +1,330 @@
+"""Rate limiters for :func:`~monorepo_core.decorators.rate_limit`.
+
+Every limiter answers :meth:`RateLimiter.acquire` in constant time: it takes
+``cost`` units for ``key`` and returns ``0.0``, or takes nothing and returns
+how many seconds to wait before the units would be available. Keys give each
+tenant, user or endpoint its own quota within one limiter.
+"""
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Hashable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Protocol, runtime_checkable
+
+from monorepo_core import _fork
+from monorepo_core.backends import _import_fcntl
+
+_MAX_PROBES = 8
+# Shared bucket file: header (magic, slot count), then slots of (key digest, TAT).
+_SEGMENT_HEADER = struct.Struct("<8sQ")
+_SEGMENT_MAGIC = b"MRLIM001"
+_SLOT = struct.Struct("<Qd")
+
+
+@runtime_checkable
+class RateLimiter(Protocol):
+    """Engine deciding whether a call may proceed now."""
+
+    def acquire(self, key: Hashable = None, cost: float = 1.0) -> float:
+        """Take ``cost`` units for ``key`` if available.
+
+        Returns:
+            ``0.0`` if the units were taken, otherwise the seconds until
+            they would be; nothing is taken in that case. ``math.inf`` if
+            ``cost`` exceeds what the limiter can ever grant at once.
+        """
+        ...
+
+
+class _KeyedLimiter:
+    """Per-key state table shared by the in-process limiters.
+
+    Idle keys are dropped once the table grows past ``max_keys``, so
+    per-tenant limits do not accumulate state for every key ever seen.
+    """
+
+    def __init__(self, max_keys: int, clock: Callable[[], float]) -> None:
+        if max_keys < 1:
+            raise ValueError("max_keys must be at least 1")
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        _fork.register(self)
+
+    def _after_fork_in_child(self) -> None:
+        self._lock = threading.Lock()
+
+
+class TokenBucket(_KeyedLimiter):
+    """Token bucket refilled at ``rate`` tokens per second, holding ``burst``.
+
+    Implemented as the generic cell rate algorithm: each key keeps only the
+    time at which its bucket would be full again, so a check is one dict
+    lookup and a little arithmetic.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float | None = None,
+        *,
+        max_keys: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__(max_keys, clock)
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        if self.burst <= 0:
+            raise ValueError("burst must be positive")
+        self._interval = 1.0 / rate
+        self._tolerance = self.burst * self._interval
+        self._tats: dict[Hashable, float] = {}
+
+    def acquire(self, key: Hashable = None, cost: float = 1.0) -> float:
+        if cost > self.burst:
+            return math.inf
+        now = self._clock()
+        with self._lock:
+            tat = self._tats.get(key, now)
+            # Measured from now: with a large clock value, (now + x) - now
+            # can exceed x by a rounding error that never sleeps away.
+            backlog = tat - now if tat > now else 0.0
+            backlog += cost * self._interval
+            wait = backlog - self._tolerance
+            if wait > 0:
+                return wait
+            if len(self._tats) >= self.max_keys and key not in self._tats:
+                self._purge(now)
+            self._tats[key] = now + backlog
+            return 0.0
+
+    def _purge(self, now: float) -> None:
+        # A key whose bucket has refilled carries no state worth keeping.
+        self._tats = {key: tat for key, tat in self._tats.items() if tat > now}
+        while len(self._tats) >= self.max_keys:
+            del self._tats[next(iter(self._tats))]
+
+
+class SlidingWindowCounter(_KeyedLimiter):
+    """Approximate sliding window of ``limit`` units per ``window`` seconds.
+
+    Each key keeps counts for the current and previous fixed windows and
+    weights the previous count by how much of it still overlaps the sliding
+    window: constant memory per key, within a few percent of exact.
+    """
+
+    def __init__(
+        self,
+        limit: float,
+        window: float,
+        *,
+        max_keys: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__(max_keys, clock)
+        if limit <= 0 or window <= 0:
+            raise ValueError("limit and window must be positive")
+        self.limit = limit
+        self.window = window
+        # key -> [window index, previous count, current count]
+        self._counts: dict[Hashable, list[float]] = {}
+
+    def acquire(self, key: Hashable = None, cost: float = 1.0) -> float:
+        if cost > self.limit:
+            return math.inf
+        now = self._clock()
+        index = math.floor(now / self.window)
+        elapsed = now / self.window - index
+        with self._lock:
+            state = self._counts.get(key)
+            if state is None:
+                if len(self._counts) >= self.max_keys:
+                    self._purge(index)
+                state = self._counts[key] = [index, 0.0, 0.0]
+            elif state[0] != index:
+                state[1] = state[2] if state[0] == index - 1 else 0.0
+                state[2] = 0.0
+                state[0] = index
+            _, previous, current = state
+            if previous * (1.0 - elapsed) + current + cost <= self.limit:
+                state[2] = current + cost
+                return 0.0
+        room = self.limit - current - cost
+        if room >= 0 and previous > 0:
+            # Wait until enough of the previous window has slid out.
+            return max((1.0 - room / previous - elapsed) * self.window, 0.0)
+        return (1.0 - elapsed) * self.window
+
+    def _purge(self, index: int) -> None:
+        self._counts = {key: state for key, state in self._counts.items() if state[0] >= index - 1}
+        while len(self._counts) >= self.max_keys:
+            del self._counts[next(iter(self._counts))]
+
+
+class SlidingWindowLog(_KeyedLimiter):
+    """Exact sliding window of ``limit`` calls per ``window`` seconds.
+
+    Each key keeps the timestamps of its calls within the window. Checks are
+    amortised constant time, but memory grows with ``limit`` per key; prefer
+    :class:`SlidingWindowCounter` for large limits.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        window: float,
+        *,
+        max_keys: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__(max_keys, clock)
+        if limit < 1 or window <= 0:
+            raise ValueError("limit must be at least 1 and window positive")
+        self.limit = limit
+        self.window = window
+        self._logs: dict[Hashable, deque[float]] = {}
+
+    def acquire(self, key: Hashable = None, cost: float = 1.0) -> float:
+        units = math.ceil(cost)
+        if units > self.limit:
+            return math.inf
+        now = self._clock()
+        horizon = now - self.window
+        with self._lock:
+            log = self._logs.get(key)
+            if log is None:
+                if len(self._logs) >= self.max_keys:
+                    self._purge(horizon)
+                log = self._logs[key] = deque()
+            while log and log[0] <= horizon:
+                log.popleft()
+            excess = len(log) + units - self.limit
+            if excess > 0:
+                return log[excess - 1] - horizon
+            log.extend([now] * units)
+            return 0.0
+
+    def _purge(self, horizon: float) -> None:
+        self._logs = {key: log for key, log in self._logs.items() if log and log[-1] > horizon}
+        while len(self._logs) >= self.max_keys:
+            del self._logs[next(iter(self._logs))]
+
+
+class SharedTokenBucket:
+    """Token bucket whose state is shared by every process on the host.
+
+    Works like :class:`TokenBucket`, but each key's state lives in a slot of
+    a memory-mapped file, addressed by a hash of the key with linear probing
+    over a short window; when the window is full the slot of the key that
+    has been idle longest is reused. Access is serialized with a thread lock
+    plus a POSIX record lock on the file, as in
+    :class:`~monorepo_core.backends.SharedMemoryBackend`. Times are wall
+    clock, so every process sees the same buckets. Requires POSIX file
+    locking; elsewhere the constructor raises ``ImportError``.
+
+    Args:
+        path: File backing the buckets. Created if missing.
+        rate: Tokens added per second.
+        burst: Bucket capacity. Defaults to ``rate`` (at least one token).
+        slots: Number of keys that can be tracked at once.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        rate: float,
+        burst: float | None = None,
+        *,
+        slots: int = 4096,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if slots < 1:
+            raise ValueError("slots must be at least 1")
+        self.path = Path(path)
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self.slots = slots
+        self._interval = 1.0 / rate
+        self._tolerance = self.burst * self._interval
+        size = _SEGMENT_HEADER.size + slots * _SLOT.size
+
+        self._fcntl = _import_fcntl("SharedTokenBucket")
+        self._lock = threading.Lock()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked():
+            if os.fstat(self._fd).st_size != size:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, _SEGMENT_HEADER.pack(_SEGMENT_MAGIC, slots), 0)
+            magic, stored_slots = _SEGMENT_HEADER.unpack(
+                os.pread(self._fd, _SEGMENT_HEADER.size, 0)
+            )
+            if (magic, stored_slots) != (_SEGMENT_MAGIC, slots):
+                raise ValueError(f"{self.path} holds an incompatible rate limit segment")
+        self._map = mmap.mmap(self._fd, size)
+        _fork.register(self)
+
+    def close(self) -> None:
+        """Unmap the buckets and close their file."""
+        self._map.close()
+        os.close(self._fd)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        # Record locks are per process, so the thread lock guards within one.
+        with self._lock:
+            fcntl = self._fcntl
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def _after_fork_in_child(self) -> None:
+        # The mapping stays shared with the parent; only the thread lock is reset.
+        self._lock = threading.Lock()
+
+    def _slot(self, digest: int) -> int:
+        """Offset of the slot for ``digest``, claiming one if needed."""
+        start = digest % self.slots
+        victim, victim_tat = 0, math.inf
+        for i in range(min(_MAX_PROBES, self.slots)):
+            offset = _SEGMENT_HEADER.size + ((start + i) % self.slots) * _SLOT.size
+            slot_digest, tat = _SLOT.unpack_from(self._map, offset)
+            if slot_digest in (digest, 0):
+                return offset
+            if tat < victim_tat:
+                victim, victim_tat = offset, tat
+        return victim
+
+    def acquire(self, key: Hashable = None, cost: float = 1.0) -> float:
+        if cost > self.burst:
+            return math.inf
+        digest = (
+            int.from_bytes(hashlib.blake2b(repr(key).encode(), digest_size=8).digest(), "little")
+            or 1
+        )
+        now = time.time()
+        with self._locked():
+            offset = self._slot(digest)
+            slot_digest, tat = _SLOT.unpack_from(self._map, offset)
+            if slot_digest != digest:
+                tat = now
+            # Measured from now, as in TokenBucket.acquire.
+            backlog: float = max(tat - now, 0.0) + cost * self._interval
+            wait = backlog - self._tolerance
+            if wait > 0:
+                return wait
+            _SLOT.pack_into(self._map, offset, digest, now + backlog)
+            return 0.0
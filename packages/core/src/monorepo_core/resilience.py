@@ -0,0 +1,442 @@
+"""Building blocks that keep retries from overloading failing dependencies.
+
+:func:`~monorepo_core.decorators.retry` combines them: jittered, capped
+backoff spreads retries out, a :class:`RetryBudget` bounds retries to a share
+of overall traffic, and a :class:`CircuitBreaker` stops calling a dependency
+that keeps failing until it has had time to recover.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from enum import StrEnum
+from typing import TypeVar
+
+from monorepo_core import _fork
+from monorepo_shared.errors import CircuitOpenError
+
+T = TypeVar("T")
+
+
+class Jitter(StrEnum):
+    """How retry delays are randomised."""
+
+    NONE = "none"
+    FULL = "full"
+    DECORRELATED = "decorrelated"
+
+
+def backoff_delay(
+    attempt: int,
+    previous: float,
+    *,
+    delay: float,
+    backoff: float,
+    max_delay: float | None = None,
+    jitter: Jitter = Jitter.FULL,
+) -> float:
+    """Compute the delay before retry number ``attempt``.
+
+    Args:
+        attempt: Number of failed attempts so far, starting at 1.
+        previous: Delay used before the previous retry (``delay`` initially).
+        delay: Base delay in seconds.
+        backoff: Growth factor between retries.
+        max_delay: Upper bound on any single delay.
+        jitter: ``NONE`` gives ``delay * backoff ** (attempt - 1)``; ``FULL``
+            picks uniformly between zero and that value; ``DECORRELATED``
+            picks between ``delay`` and ``previous * backoff``, so delays grow
+            without callers staying in step.
+
+    Returns:
+        Delay in seconds.
+    """
+    if jitter is Jitter.DECORRELATED:
+        value = random.uniform(delay, max(delay, previous * backoff))
+    else:
+        value = delay * backoff ** (attempt - 1)
+    if max_delay is not None:
+        value = min(value, max_delay)
+    if jitter is Jitter.FULL:
+        value = random.uniform(0.0, value)
+    return value
+
+
+class RetryBudget:
+    """Token bucket limiting retries to a fraction of calls.
+
+    Every call deposits ``ratio`` tokens and every retry withdraws one, so
+    across all functions sharing a budget at most ``ratio`` retries are made
+    per call. ``min_per_second`` tokens are added over time as well, letting
+    low-traffic callers still retry. The balance never exceeds ``max_tokens``.
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.1,
+        *,
+        min_per_second: float = 1.0,
+        max_tokens: float = 100.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if ratio < 0:
+            raise ValueError("ratio must not be negative")
+        if max_tokens < 1:
+            raise ValueError("max_tokens must be at least 1")
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._clock = clock
+        self._tokens = max_tokens
+        self._updated = clock()
+        self._lock = threading.Lock()
+        _fork.register(self)
+
+    @property
+    def tokens(self) -> float:
+        """Current balance."""
+        with self._lock:
+            self._refill(0.0)
+            return self._tokens
+
+    def deposit(self) -> None:
+        """Account for one call."""
+        with self._lock:
+            self._refill(self.ratio)
+
+    def try_spend(self) -> bool:
+        """Withdraw a token for a retry, returning whether one was available."""
+        with self._lock:
+            self._refill(0.0)
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+    def _refill(self, amount: float) -> None:
+        now = self._clock()
+        amount += (now - self._updated) * self.min_per_second
+        self._updated = now
+        self._tokens = min(self._tokens + amount, self.max_tokens)
+
+    def _after_fork_in_child(self) -> None:
+        self._lock = threading.Lock()
+
+
+class CircuitState(StrEnum):
+    """State of a circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops calls to a dependency after repeated failures.
+
+    The circuit opens after ``failure_threshold`` consecutive failures and
+    rejects calls for ``recovery_timeout`` seconds. It then lets up to
+    ``half_open_max_calls`` trial calls through: a success closes it again,
+    a failure reopens it.
+    """
+
+    def __init__(
+        self,
+        name: str = "default",
+        *,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        if half_open_max_calls < 1:
+            raise ValueError("half_open_max_calls must be at least 1")
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+        _fork.register(self)
+
+    @property
+    def state(self) -> CircuitState:
+        """Current state, moving from open to half-open once the timeout passed."""
+        with self._lock:
+            self._check_recovery()
+            return self._state
+
+    def allow(self) -> bool:
+        """Return whether a call may proceed, reserving a trial if half-open."""
+        with self._lock:
+            self._check_recovery()
+            if self._state is CircuitState.CLOSED:
+                return True
+            if self._state is CircuitState.HALF_OPEN and self._trials < self.half_open_max_calls:
+                self._trials += 1
+                return True
+            return False
+
+    def check(self) -> None:
+        """Like :meth:`allow`, but raise instead of returning ``False``.
+
+        Raises:
+            CircuitOpenError: If the circuit rejects the call.
+        """
+        if not self.allow():
+            remaining = self._opened_at + self.recovery_timeout - self._clock()
+            raise CircuitOpenError(self.name, retry_after=max(remaining, 0.0))
+
+    def record_success(self) -> None:
+        """Report a successful call."""
+        with self._lock:
+            self._state = CircuitState.CLOSED
+            self._failures = 0
+            self._trials = 0
+
+    def record_failure(self) -> None:
+        """Report a failed call."""
+        with self._lock:
+            self._failures += 1
+            if self._state is CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = CircuitState.OPEN
+                self._opened_at = self._clock()
+                self._trials = 0
+
+    def release(self) -> None:
+        """Give back a trial reserved by :meth:`allow` without reporting an outcome.
+
+        Use this when a call ends in a way that says nothing about the
+        dependency, such as cancellation, so the half-open trial is not lost.
+        """
+        with self._lock:
+            if self._state is CircuitState.HALF_OPEN and self._trials:
+                self._trials -= 1
+
+    def reset(self) -> None:
+        """Close the circuit and forget past failures."""
+        self.record_success()
+
+    def _check_recovery(self) -> None:
+        if (
+            self._state is CircuitState.OPEN
+            and self._clock() - self._opened_at >= self.recovery_timeout
+        ):
+            self._state = CircuitState.HALF_OPEN
+            self._trials = 0
+
+    def _after_fork_in_child(self) -> None:
+        self._lock = threading.Lock()
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def circuit_breaker(
+    dependency: str,
+    *,
+    failure_threshold: int = 5,
+    recovery_timeout: float = 30.0,
+    half_open_max_calls: int = 1,
+) -> CircuitBreaker:
+    """Get the process-wide circuit breaker for a dependency.
+
+    Every function calling the same dependency should share one breaker, so
+    the breaker is created on first use and returned as-is afterwards; the
+    settings only apply on creation.
+
+    Args:
+        dependency: Name of the dependency, e.g. ``"payments-api"``.
+        failure_threshold: Consecutive failures that open the circuit.
+        recovery_timeout: Seconds the circuit stays open.
+        half_open_max_calls: Trial calls allowed while half-open.
+
+    Returns:
+        The breaker for ``dependency``.
+    """
+    breaker = _breakers.get(dependency)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(dependency)
+            if breaker is None:
+                breaker = _breakers[dependency] = CircuitBreaker(
+                    dependency,
+                    failure_threshold=failure_threshold,
+                    recovery_timeout=recovery_timeout,
+                    half_open_max_calls=half_open_max_calls,
+                )
+    return breaker
+
+
+class _RetryPolicy:
+    """Decides, per failed attempt, whether and when ``retry`` tries again."""
+
+    def __init__(
+        self,
+        *,
+        max_attempts: int,
+        delay: float,
+        backoff: float,
+        exceptions: tuple[type[Exception], ...],
+        max_delay: float | None,
+        jitter: Jitter,
+        deadline: float | None,
+        budget: RetryBudget | None,
+        breaker: CircuitBreaker | None,
+    ) -> None:
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.max_attempts = max_attempts
+        self.delay = delay
+        self.backoff = backoff
+        self.exceptions = exceptions
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.deadline = deadline
+        self.budget = budget
+        self.breaker = breaker
+
+    def start(self) -> float:
+        """Begin a call, returning its start time."""
+        if self.budget is not None:
+            self.budget.deposit()
+        return time.monotonic()
+
+    def before_attempt(self, last_error: BaseException | None) -> None:
+        """Raise :class:`CircuitOpenError` if the breaker rejects the attempt."""
+        if self.breaker is None:
+            return
+        try:
+            self.breaker.check()
+        except CircuitOpenError as e:
+            raise e from last_error
+
+    def succeeded(self) -> None:
+        if self.breaker is not None:
+            self.breaker.record_success()
+
+    def failed(
+        self, error: BaseException, attempt: int, previous: float, started: float
+    ) -> float | None:
+        """Record failed attempt number ``attempt``, which raised ``error``.
+
+        Errors outside ``exceptions``, cancellation included, are not
+        retried and say nothing about the dependency: the breaker trial the
+        attempt reserved is released rather than counted as a failure.
+
+        Returns:
+            Seconds to wait before the next attempt, or ``None`` to give up
+            because ``error`` is not retryable or attempts, the deadline or
+            the retry budget ran out.
+        """
+        if not isinstance(error, self.exceptions):
+            if self.breaker is not None:
+                self.breaker.release()
+            return None
+        if self.breaker is not None:
+            self.breaker.record_failure()
+        if attempt >= self.max_attempts:
+            return None
+        wait = backoff_delay(
+            attempt,
+            previous,
+            delay=self.delay,
+            backoff=self.backoff,
+            max_delay=self.max_delay,
+            jitter=self.jitter,
+        )
+        if self.deadline is not None and time.monotonic() - started + wait >= self.deadline:
+            return None
+        if self.budget is not None and not self.budget.try_spend():
+            return None
+        return wait
+
+
+class _Hedger:
+    """Races hedged copies of an async call, keeping the first success.
+
+    Without a fixed ``delay``, a hedge is launched once the call has run for
+    longer than the recent p95 latency of successful calls; until enough
+    latencies are known no hedges are sent.
+    """
+
+    _WINDOW = 256
+    _MIN_SAMPLES = 20
+    _RECOMPUTE_EVERY = 32
+
+    def __init__(
+        self,
+        hedges: int,
+        delay: float | None,
+        exceptions: tuple[type[Exception], ...],
+    ) -> None:
+        if hedges < 0:
+            raise ValueError("hedges must not be negative")
+        self.hedges = hedges
+        self.delay = delay
+        self.exceptions = exceptions
+        self._latencies: deque[float] = deque(maxlen=self._WINDOW)
+        self._observed = 0
+        self._p95: float | None = None
+
+    def hedge_delay(self) -> float | None:
+        """Seconds to wait before launching the next hedge, if any."""
+        return self.delay if self.delay is not None else self._p95
+
+    def observe(self, seconds: float) -> None:
+        self._latencies.append(seconds)
+        self._observed += 1
+        if self._observed >= self._MIN_SAMPLES and (
+            self._p95 is None or self._observed % self._RECOMPUTE_EVERY == 0
+        ):
+            ordered = sorted(self._latencies)
+            self._p95 = ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        """Run ``call``, hedging it, and return the first successful result.
+
+        Retryable failures of one copy are ignored while others are still
+        running; once all copies have failed the last error is raised.
+        Other exceptions are raised immediately. Copies still running when
+        this returns are cancelled.
+        """
+
+        async def attempt() -> T:
+            start = time.perf_counter()
+            result = await call()
+            self.observe(time.perf_counter() - start)
+            return result
+
+        pending = {asyncio.ensure_future(attempt())}
+        launched = 1
+        errors: list[BaseException] = []
+        try:
+            while pending:
+                timeout = self.hedge_delay() if launched <= self.hedges else None
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+                    if not isinstance(error, self.exceptions):
+                        raise error
+                    errors.append(error)
+                if not done:
+                    pending.add(asyncio.ensure_future(attempt()))
+                    launched += 1
+            raise errors[-1]
+        finally:
+            for task in pending:
+                task.cancel()
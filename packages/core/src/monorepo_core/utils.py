@@ -1,64 +1,411 @@
 """Core utility functions."""
 
-import re
-import uuid
-from typing import Any
+import asyncio
+import functools
+import itertools
+import string
+import unicodedata
+from collections.abc import (
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+    Mapping,
+    Sequence,
+)
+from enum import StrEnum
+from typing import Any, Literal, TypeVar, cast, overload
 
+from monorepo_core.ids import IdEngine, RandomIdEngine
 
-def generate_id(prefix: str = "") -> str:
+T = TypeVar("T")
+
+_default_id_engine = RandomIdEngine()
+
+
+def generate_id(prefix: str = "", *, engine: IdEngine | None = None) -> str:
     """Generate a unique identifier.
 
     Args:
         prefix: Optional prefix for the ID.
+        engine: ID engine to use. Defaults to 12 random characters; pass a
+            :class:`~monorepo_core.ids.UlidEngine` or similar for IDs that
+            sort by creation time.
 
     Returns:
         A unique identifier string.
     """
-    unique_id = uuid.uuid4().hex[:12]
+    unique_id = (engine or _default_id_engine).generate()
     return f"{prefix}{unique_id}" if prefix else unique_id
 
 
-def slugify(text: str) -> str:
+def generate_ids(n: int, prefix: str = "", *, engine: IdEngine | None = None) -> list[str]:
+    """Generate ``n`` unique identifiers at once.
+
+    Cheaper per ID than calling :func:`generate_id` in a loop.
+
+    Args:
+        n: Number of IDs.
+        prefix: Optional prefix for every ID.
+        engine: ID engine to use, as for :func:`generate_id`.
+
+    Returns:
+        The identifiers.
+    """
+    ids = (engine or _default_id_engine).generate_many(n)
+    return [prefix + unique_id for unique_id in ids] if prefix else ids
+
+
+def slugify(
+    text: str,
+    *,
+    max_length: int | None = None,
+    transliterate: bool = False,
+    separator: str = "-",
+) -> str:
     """Convert text to URL-friendly slug.
 
+    Letters are lowercased, runs of whitespace and hyphens become
+    ``separator``, and everything else but ASCII letters and digits is
+    dropped. Results are memoized, so repeated titles are free.
+
     Args:
         text: Text to convert.
+        max_length: Maximum slug length. Longer slugs are cut at the last
+            word boundary that fits, or mid-word if the first word is longer.
+        transliterate: Whether to map accented and other Latin letters to
+            ASCII first ("Café" becomes "cafe" rather than "caf").
+        separator: String placed between words.
 
     Returns:
         URL-friendly slug.
     """
-    # Convert to lowercase and replace spaces with hyphens
-    slug = text.lower().strip()
-    slug = re.sub(r"\s+", "-", slug)
-    # Remove non-alphanumeric characters (except hyphens)
-    slug = re.sub(r"[^a-z0-9-]", "", slug)
-    # Remove consecutive hyphens
-    slug = re.sub(r"-+", "-", slug)
-    # Remove leading/trailing hyphens
-    return slug.strip("-")
-
-
-def deep_merge(base: dict[str, Any], override: dict[str, Any]) -> dict[str, Any]:
+    if max_length is not None and max_length < 1:
+        raise ValueError("max_length must be at least 1")
+    return _slugify(text, max_length, transliterate, separator)
+
+
+def slugify_many(
+    texts: Iterable[str],
+    *,
+    max_length: int | None = None,
+    transliterate: bool = False,
+    separator: str = "-",
+) -> list[str]:
+    """Slugify many texts at once, as :func:`slugify` would one by one."""
+    if max_length is not None and max_length < 1:
+        raise ValueError("max_length must be at least 1")
+    convert = _slugify
+    return [convert(text, max_length, transliterate, separator) for text in texts]
+
+
+# Everything but ASCII letters and digits is dropped, except whitespace and
+# hyphens, which become word breaks. Whitespace is what str.isspace() and
+# regex \s accept, including the separators \x1c-\x1f.
+_SLUG_TABLE: dict[int, str | None] = {
+    code: None for code in range(128) if not (chr(code).isascii() and chr(code).isalnum())
+}
+_SLUG_TABLE.update({code: " " for code in range(128) if chr(code).isspace()})
+_SLUG_TABLE[ord("-")] = " "
+_SLUG_TABLE.update({ord(c): c.lower() for c in string.ascii_uppercase})
+# Latin letters that do not decompose into an ASCII base letter and a mark.
+_TRANSLITERATIONS = str.maketrans(
+    {
+        "ß": "ss",
+        "ẞ": "SS",
+        "æ": "ae",
+        "Æ": "AE",
+        "œ": "oe",
+        "Œ": "OE",
+        "ø": "o",
+        "Ø": "O",
+        "đ": "d",
+        "Đ": "D",
+        "ð": "d",
+        "Ð": "D",
+        "ł": "l",
+        "Ł": "L",
+        "þ": "th",
+        "Þ": "TH",
+        "\u0131": "i",  # dotless i
+    }
+)
+
+
+@functools.lru_cache(maxsize=4096)
+def _slugify(text: str, max_length: int | None, transliterate: bool, separator: str) -> str:
+    if text.isascii():
+        words = text.translate(_SLUG_TABLE).split()
+    else:
+        if transliterate:
+            text = unicodedata.normalize("NFKD", text.translate(_TRANSLITERATIONS))
+        else:
+            text = text.lower()  # a few letters, such as "K" (Kelvin), lower to ASCII
+        # Unicode whitespace must still split words once non-ASCII is dropped.
+        text = " ".join(text.split()).encode("ascii", "ignore").decode()
+        words = text.translate(_SLUG_TABLE).split()
+    slug = separator.join(words)
+    if max_length is not None and len(slug) > max_length:
+        cut = slug.rfind(separator, 0, max_length + 1)
+        slug = slug[:cut] if cut > 0 else slug[:max_length].rstrip(separator)
+    return slug
+
+
+class ListStrategy(StrEnum):
+    """How :func:`deep_merge` combines two lists under the same key."""
+
+    REPLACE = "replace"
+    APPEND = "append"
+    UNIQUE = "unique"
+    BY_KEY = "by-key"
+
+
+class ConflictStrategy(StrEnum):
+    """Which value :func:`deep_merge` keeps when two values differ."""
+
+    OVERRIDE = "override"
+    KEEP = "keep"
+    ERROR = "error"
+
+
+ConflictResolver = Callable[[tuple[Any, ...], Any, Any], Any]
+
+
+def deep_merge(
+    base: dict[str, Any],
+    override: Mapping[str, Any],
+    *,
+    lists: ListStrategy | str = ListStrategy.REPLACE,
+    list_key: str | None = None,
+    conflicts: ConflictStrategy | str | ConflictResolver = ConflictStrategy.OVERRIDE,
+    in_place: bool = False,
+) -> dict[str, Any]:
     """Deep merge two dictionaries.
 
+    Nested dictionaries are merged key by key; any other value in
+    ``override`` replaces the one in ``base`` unless a strategy says
+    otherwise. Only dictionaries along changed paths are copied: unchanged
+    subtrees of ``base`` and values taken from ``override`` are shared with
+    the result, so copy the result before mutating it in place. Inputs are
+    not modified unless ``in_place`` is set.
+
     Args:
         base: Base dictionary.
         override: Dictionary to merge on top.
+        lists: How to combine two lists: ``REPLACE`` with the override list,
+            ``APPEND`` it, append only ``UNIQUE`` items not already present,
+            or merge dictionary items with equal ``list_key`` values
+            (``BY_KEY``) and append the rest.
+        list_key: Item key matched by ``ListStrategy.BY_KEY``.
+        conflicts: Which value to keep when both dictionaries hold different
+            non-mergeable values under a key: the ``OVERRIDE`` one, the one
+            to ``KEEP``, or raise a ``ValueError`` (``ERROR``). May also be
+            a function of the key path, base value and override value
+            returning the value to keep.
+        in_place: Whether to merge into ``base`` itself instead of a copy.
 
     Returns:
-        Merged dictionary.
+        Merged dictionary; ``base`` when merging in place.
+
+    Raises:
+        ValueError: On a conflict with ``ConflictStrategy.ERROR``, or when
+            ``BY_KEY`` is used without ``list_key``.
     """
-    result = base.copy()
+    return deep_merge_many(
+        base, override, lists=lists, list_key=list_key, conflicts=conflicts, in_place=in_place
+    )
 
-    for key, value in override.items():
-        if key in result and isinstance(result[key], dict) and isinstance(value, dict):
-            result[key] = deep_merge(result[key], value)
-        else:
-            result[key] = value
 
+def deep_merge_many(
+    *layers: Mapping[str, Any],
+    lists: ListStrategy | str = ListStrategy.REPLACE,
+    list_key: str | None = None,
+    conflicts: ConflictStrategy | str | ConflictResolver = ConflictStrategy.OVERRIDE,
+    in_place: bool = False,
+) -> dict[str, Any]:
+    """Deep merge dictionaries, each on top of the previous ones.
+
+    Equivalent to folding :func:`deep_merge` over ``layers``, but each
+    nested dictionary is copied at most once however many layers change it.
+    With ``in_place``, the first layer, which must then be a ``dict``, is
+    merged into. See :func:`deep_merge` for the other arguments.
+    """
+    strategy = ListStrategy(lists)
+    if strategy is ListStrategy.BY_KEY and list_key is None:
+        raise ValueError("list_key is required to merge lists by key")
+    resolve = conflicts if callable(conflicts) else _CONFLICT_RESOLVERS[ConflictStrategy(conflicts)]
+    if not layers:
+        return {}
+    first = layers[0]
+    if in_place:
+        if not isinstance(first, dict):
+            raise TypeError("in_place needs the first layer to be a dict")
+        result = first
+    else:
+        result = dict(first)
+    merger = _Merger(strategy, list_key, resolve, in_place)
+    merger.owned.add(id(result))
+    for index, layer in enumerate(layers[1:], start=2):
+        merger.merge(result, layer, last=index == len(layers))
     return result
 
 
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _expand(path: Any) -> tuple[Any, ...]:
+    """Turn a linked ``(parent, key)`` path into a tuple of keys."""
+    keys = []
+    while path is not None:
+        path, key = path
+        keys.append(key)
+    return tuple(reversed(keys))
+
+
+def _override(_path: tuple[Any, ...], _old: Any, new: Any) -> Any:
+    return new
+
+
+def _keep(_path: tuple[Any, ...], old: Any, _new: Any) -> Any:
+    return old
+
+
+def _error(path: tuple[Any, ...], old: Any, new: Any) -> Any:
+    raise ValueError(f"Conflicting values at {'.'.join(map(str, path))!r}: {old!r} != {new!r}")
+
+
+_MISSING: Any = object()
+_CONFLICT_RESOLVERS: dict[ConflictStrategy, ConflictResolver] = {
+    ConflictStrategy.OVERRIDE: _override,
+    ConflictStrategy.KEEP: _keep,
+    ConflictStrategy.ERROR: _error,
+}
+
+
+class _Merger:
+    """Iterative merge state shared by every layer of one merge.
+
+    Containers may only be mutated if they belong to the result: copies
+    made by the merge (``owned``) or, in place, containers reached from the
+    first layer. Containers inserted from a later layer are ``borrowed`` and
+    copied before a further layer changes them.
+    """
+
+    def __init__(
+        self,
+        lists: ListStrategy,
+        list_key: str | None,
+        resolve: ConflictResolver,
+        in_place: bool,
+    ) -> None:
+        self.lists = lists
+        self.list_key = list_key
+        self.resolve = resolve
+        self.in_place = in_place
+        self.owned: set[int] = set()
+        self.borrowed: set[int] = set()
+
+    def _writable(self, value: Any, inherited: bool) -> tuple[Any, bool]:
+        """Return ``value`` or an owned copy, and whether it is in ``base``."""
+        if id(value) in self.owned:
+            return value, False
+        if inherited and id(value) not in self.borrowed:
+            return value, True
+        copy = value.copy()
+        self.owned.add(id(copy))
+        return copy, False
+
+    def _share(self, value: Any) -> Any:
+        if isinstance(value, dict | list):
+            self.borrowed.add(id(value))
+        return value
+
+    def merge(self, result: dict[str, Any], layer: Mapping[str, Any], *, last: bool) -> None:
+        """Merge ``layer`` into ``result``; after the ``last`` layer nothing is borrowed."""
+        share = self._share if not last else _identity
+        owned, borrowed = self.owned, self.borrowed
+        resolve = self.resolve
+        overriding = resolve is _override
+        merge_lists = self.lists is not ListStrategy.REPLACE
+        # (target, source, path, whether target's children belong to base);
+        # paths are linked (parent, key) pairs, only expanded for conflicts.
+        stack: list[tuple[dict[Any, Any], Mapping[Any, Any], Any, bool]] = [
+            (result, layer, None, self.in_place)
+        ]
+        while stack:
+            target, source, path, inherited = stack.pop()
+            for key, new in source.items():
+                old = target.get(key, _MISSING)
+                if old is _MISSING:
+                    target[key] = share(new)
+                elif isinstance(old, dict) and isinstance(new, dict):
+                    # Inlined _writable: this branch is the hot path.
+                    if inherited and id(old) not in borrowed:
+                        stack.append((old, new, (path, key), True))
+                    elif id(old) in owned:
+                        stack.append((old, new, (path, key), False))
+                    else:
+                        target[key] = child = old.copy()
+                        if not last:
+                            owned.add(id(child))
+                        stack.append((child, new, (path, key), False))
+                elif merge_lists and isinstance(old, list) and isinstance(new, list):
+                    merged, merged_inherited = self._writable(old, inherited)
+                    target[key] = merged
+                    self._merge_lists(merged, new, (path, key), merged_inherited, stack)
+                elif overriding:
+                    target[key] = share(new)
+                elif old is not new and old != new:
+                    target[key] = share(resolve(_expand((path, key)), old, new))
+
+    def _merge_lists(
+        self,
+        target: list[Any],
+        source: list[Any],
+        path: Any,
+        inherited: bool,
+        stack: list[tuple[dict[Any, Any], Mapping[Any, Any], Any, bool]],
+    ) -> None:
+        if self.lists is ListStrategy.APPEND:
+            target.extend(self._share(item) for item in source)
+        elif self.lists is ListStrategy.UNIQUE:
+            seen, unhashable = set(), []
+            for item in target:
+                try:
+                    seen.add(item)
+                except TypeError:
+                    unhashable.append(item)
+            for item in source:
+                try:
+                    if item in seen:
+                        continue
+                    seen.add(item)
+                except TypeError:
+                    if item in unhashable:
+                        continue
+                    unhashable.append(item)
+                target.append(self._share(item))
+        else:
+            key = self.list_key
+            positions = {
+                item[key]: index
+                for index, item in enumerate(target)
+                if isinstance(item, dict) and key in item
+            }
+            for item in source:
+                index = positions.get(item[key]) if isinstance(item, dict) and key in item else None
+                if index is None:
+                    if isinstance(item, dict) and key in item:
+                        positions[item[key]] = len(target)
+                    target.append(self._share(item))
+                    continue
+                child, child_inherited = self._writable(target[index], inherited)
+                target[index] = child
+                stack.append((child, item, (path, index), child_inherited))
+
+
 def chunk_list(items: list[Any], chunk_size: int) -> list[list[Any]]:
     """Split a list into chunks of specified size.
 
@@ -68,14 +415,153 @@ def chunk_list(items: list[Any], chunk_size: int) -> list[list[Any]]:
 
     Returns:
         List of chunks.
+
+    See Also:
+        :func:`chunked`, which makes one chunk at a time from any iterable.
     """
     return [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
 
 
+@overload
+def chunked(
+    items: Iterable[T], size: int, *, views: Literal[False] = False
+) -> Iterator[list[T]]: ...
+
+
+@overload
+def chunked(items: Sequence[T], size: int, *, views: Literal[True]) -> Iterator[Sequence[T]]: ...
+
+
+def chunked(
+    items: Iterable[T], size: int, *, views: bool = False
+) -> Iterator[list[T]] | Iterator[Sequence[T]]:
+    """Lazily split an iterable into lists of ``size`` items.
+
+    Only one chunk is held at a time, so generators and database cursors
+    can be processed in bounded memory. The last chunk may be shorter.
+
+    Args:
+        items: Items to split.
+        size: Items per chunk.
+        views: Slice a sequence instead of copying its items: buffers such
+            as ``bytes`` or ``array`` yield zero-copy ``memoryview`` slices,
+            other sequences whatever their slicing returns.
+
+    Returns:
+        Iterator over the chunks.
+
+    Raises:
+        ValueError: If ``size`` is less than 1.
+    """
+    if size < 1:
+        raise ValueError("size must be at least 1")
+    if views:
+        return _sliced(cast("Sequence[T]", items), size)
+    return _batches(iter(items), size)
+
+
+def _batches(iterator: Iterator[T], size: int) -> Iterator[list[T]]:
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def _sliced(items: Sequence[T], size: int) -> Iterator[Sequence[T]]:
+    try:
+        sequence: Sequence[Any] = memoryview(items)  # type: ignore[arg-type]
+    except TypeError:
+        sequence = items
+    for start in range(0, len(sequence), size):
+        yield sequence[start : start + size]
+
+
+def achunked(
+    items: AsyncIterable[T], size: int, *, max_wait: float | None = None
+) -> AsyncIterator[list[T]]:
+    """Split an async iterable into lists of up to ``size`` items.
+
+    With ``max_wait``, a chunk is also emitted once its first item has
+    waited that many seconds, so a slow stream still makes progress: chunks
+    are full under load and small but timely when items trickle in.
+
+    Args:
+        items: Items to split.
+        size: Most items per chunk.
+        max_wait: Seconds a chunk may wait to fill up, or ``None`` to wait
+            for ``size`` items or the end of the stream.
+
+    Returns:
+        Async iterator over the chunks.
+
+    Raises:
+        ValueError: If ``size`` is less than 1 or ``max_wait`` is negative.
+    """
+    if size < 1:
+        raise ValueError("size must be at least 1")
+    if max_wait is not None and max_wait < 0:
+        raise ValueError("max_wait must not be negative")
+    if max_wait is None:
+        return _achunked_by_size(aiter(items), size)
+    return _achunked_by_time(aiter(items), size, max_wait)
+
+
+async def _achunked_by_size(iterator: AsyncIterator[T], size: int) -> AsyncIterator[list[T]]:
+    chunk: list[T] = []
+    async for item in iterator:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def _achunked_by_time(
+    iterator: AsyncIterator[T], size: int, max_wait: float
+) -> AsyncIterator[list[T]]:
+    loop = asyncio.get_running_loop()
+    chunk: list[T] = []
+    deadline = 0.0
+    # A read still pending at the deadline carries over to the next chunk:
+    # cancelling it would close an async generator mid-item.
+    pending: asyncio.Future[T] | None = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(anext(iterator))
+            if not chunk:
+                await asyncio.wait((pending,))
+            elif (remaining := deadline - loop.time()) > 0:
+                await asyncio.wait((pending,), timeout=remaining)
+            if not pending.done():
+                yield chunk
+                chunk = []
+                continue
+            read, pending = pending, None
+            try:
+                item = read.result()
+            except StopAsyncIteration:
+                break
+            if not chunk:
+                deadline = loop.time() + max_wait
+            chunk.append(item)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
 def flatten_dict(
-    d: dict[str, Any],
+    d: Mapping[str, Any],
     parent_key: str = "",
     separator: str = ".",
+    *,
+    lists: bool = False,
+    max_depth: int | None = None,
+    keep_empty: bool = False,
 ) -> dict[str, Any]:
     """Flatten a nested dictionary.
 
@@ -83,17 +569,132 @@ def flatten_dict(
         d: Dictionary to flatten.
         parent_key: Key prefix for nested items.
         separator: Separator between keys.
+        lists: Whether to flatten lists too, using item indexes as keys.
+        max_depth: Nesting levels to flatten; deeper containers are kept
+            as values. ``None`` flattens everything.
+        keep_empty: Whether to keep empty containers that would be
+            flattened as values, so that :func:`unflatten_dict` restores
+            them. By default they have no leaves and are left out.
 
     Returns:
         Flattened dictionary.
     """
-    items: list[tuple[str, Any]] = []
+    return dict(
+        iter_flattened(
+            d, parent_key, separator, lists=lists, max_depth=max_depth, keep_empty=keep_empty
+        )
+    )
+
+
+def iter_flattened(
+    d: Mapping[str, Any],
+    parent_key: str = "",
+    separator: str = ".",
+    *,
+    lists: bool = False,
+    max_depth: int | None = None,
+    keep_empty: bool = False,
+) -> Iterator[tuple[str, Any]]:
+    """Lazily yield the ``(key, value)`` pairs of :func:`flatten_dict`.
+
+    Pairs come in depth-first order without building the flattened
+    dictionary, for streaming very large documents into an index or file.
+    See :func:`flatten_dict` for the arguments.
+
+    Raises:
+        ValueError: If ``max_depth`` is negative.
+    """
+    if max_depth is not None and max_depth < 0:
+        raise ValueError("max_depth must not be negative")
+    return _flatten(
+        d, parent_key, separator, lists=lists, max_depth=max_depth, keep_empty=keep_empty
+    )
 
-    for key, value in d.items():
-        new_key = f"{parent_key}{separator}{key}" if parent_key else key
-        if isinstance(value, dict):
-            items.extend(flatten_dict(value, new_key, separator).items())
+
+def _flatten(
+    d: Mapping[str, Any],
+    parent_key: str,
+    separator: str,
+    *,
+    lists: bool,
+    max_depth: int | None,
+    keep_empty: bool,
+) -> Iterator[tuple[str, Any]]:
+    containers: type | tuple[type, ...] = (dict, list) if lists else dict
+    # One (prefix, items) entry per container being walked; the prefix
+    # already ends with the separator.
+    stack: list[tuple[str, Iterator[tuple[Any, Any]]]] = [
+        (f"{parent_key}{separator}" if parent_key else "", iter(d.items()))
+    ]
+    while stack:
+        prefix, items = stack[-1]
+        for key, value in items:
+            path = f"{prefix}{key}"
+            if isinstance(value, containers) and (max_depth is None or len(stack) <= max_depth):
+                if not value:
+                    if keep_empty:
+                        yield path, value
+                    continue
+                children = (
+                    value.items()
+                    if isinstance(value, dict)
+                    else enumerate(cast("list[Any]", value))
+                )
+                stack.append((path + separator, iter(children)))
+                break
+            yield path, value
         else:
-            items.append((new_key, value))
+            stack.pop()
+
 
-    return dict(items)
+def unflatten_dict(
+    d: Mapping[str, Any],
+    separator: str = ".",
+    *,
+    lists: bool = False,
+) -> dict[str, Any]:
+    """Rebuild a nested dictionary from a flattened one.
+
+    Inverse of :func:`flatten_dict` for keys that do not contain
+    ``separator`` themselves; flatten with ``keep_empty=True`` to get empty
+    containers back too.
+
+    Args:
+        d: Flattened dictionary.
+        separator: Separator between keys.
+        lists: Whether to turn nested dictionaries whose keys are exactly
+            ``"0"`` to ``"n-1"`` into lists, as flattened with ``lists=True``.
+
+    Returns:
+        Nested dictionary.
+
+    Raises:
+        ValueError: If a key extends another key's value, such as ``"a"``
+            and ``"a.b"``.
+    """
+    result: dict[str, Any] = {}
+    # Dictionaries made here, parents first, with where they are stored.
+    created: list[tuple[dict[str, Any], str, dict[str, Any]]] = []
+    made = {id(result)}
+    for flat_key, value in d.items():
+        *parents, leaf = flat_key.split(separator)
+        node = result
+        for part in parents:
+            child = node.get(part, _MISSING)
+            if child is _MISSING:
+                node[part] = child = {}
+                created.append((node, part, child))
+                made.add(id(child))
+            elif id(child) not in made:
+                raise ValueError(f"Key {flat_key!r} extends the value at {part!r}")
+            node = child
+        if leaf in node:
+            raise ValueError(f"Key {flat_key!r} conflicts with another key")
+        node[leaf] = value
+    if lists:
+        # Children come after their parents, so are converted first.
+        for parent, key, node in reversed(created):
+            indexes = [str(i) for i in range(len(node))]
+            if all(index in node for index in indexes):
+                parent[key] = [node[index] for index in indexes]
+    return result
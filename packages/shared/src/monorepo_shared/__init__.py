@@ -13,11 +13,18 @@ from monorepo_shared.errors import (
     AuthenticationError,
     AuthorizationError,
     BaseError,
+    BulkheadFullError,
+    CircuitOpenError,
     ConflictError,
     NotFoundError,
+    PoolExhaustedError,
+    RateLimitError,
     ValidationError,
 )
 from monorepo_shared.types import (
+    Cursor,
+    CursorPaginated,
+    CursorParams,
     Failure,
     Paginated,
     PaginationParams,
@@ -30,13 +37,20 @@ __all__ = [
     "AuthenticationError",
     "AuthorizationError",
     "BaseError",
+    "BulkheadFullError",
+    "CircuitOpenError",
     "ConflictError",
+    "Cursor",
+    "CursorPaginated",
+    "CursorParams",
     "Environment",
     "Failure",
     "LogLevel",
     "NotFoundError",
     "Paginated",
     "PaginationParams",
+    "PoolExhaustedError",
+    "RateLimitError",
     "Result",
     "Success",
     "ValidationError",
@@ -118,3 +118,67 @@ class ConflictError(BaseError):
             code="CONFLICT",
             details={"resource": resource, **(details or {})},
         )
+
+
+class CircuitOpenError(BaseError):
+    """Error raised when a circuit breaker rejects a call to a failing dependency."""
+
+    def __init__(
+        self,
+        dependency: str,
+        retry_after: float | None = None,
+        details: dict[str, Any] | None = None,
+    ) -> None:
+        super().__init__(
+            message=f"Circuit for '{dependency}' is open",
+            code="CIRCUIT_OPEN",
+            details={"dependency": dependency, "retry_after": retry_after, **(details or {})},
+        )
+
+
+class BulkheadFullError(BaseError):
+    """Error raised when a concurrency limit sheds a call instead of queueing it."""
+
+    def __init__(
+        self,
+        bulkhead: str,
+        reason: str = "queue full",
+        details: dict[str, Any] | None = None,
+    ) -> None:
+        super().__init__(
+            message=f"Bulkhead '{bulkhead}' rejected the call: {reason}",
+            code="BULKHEAD_FULL",
+            details={"bulkhead": bulkhead, "reason": reason, **(details or {})},
+        )
+
+
+class RateLimitError(BaseError):
+    """Error raised when a call exceeds its rate limit."""
+
+    def __init__(
+        self,
+        retry_after: float,
+        key: str | None = None,
+        details: dict[str, Any] | None = None,
+    ) -> None:
+        super().__init__(
+            message=f"Rate limit exceeded, retry after {retry_after:.3f}s",
+            code="RATE_LIMITED",
+            details={"retry_after": retry_after, "key": key, **(details or {})},
+        )
+
+
+class PoolExhaustedError(BaseError):
+    """Error raised when no pooled connection became available in time."""
+
+    def __init__(
+        self,
+        pool: str,
+        timeout: float | None = None,
+        details: dict[str, Any] | None = None,
+    ) -> None:
+        super().__init__(
+            message=f"No connection available from pool '{pool}'",
+            code="POOL_EXHAUSTED",
+            details={"pool": pool, "timeout": timeout, **(details or {})},
+        )
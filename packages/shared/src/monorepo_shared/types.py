@@ -1,10 +1,21 @@
 """Common type definitions for the monorepo."""
 
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import uuid
+from collections.abc import Callable, Sequence
 from dataclasses import dataclass
-from typing import Generic, TypeVar
+from datetime import date, datetime, time
+from decimal import Decimal, InvalidOperation
+from typing import Any, Generic, TypeVar
 
 from pydantic import BaseModel, Field
 
+from monorepo_shared.errors import ValidationError
+
 T = TypeVar("T")
 E = TypeVar("E", bound=Exception)
 
@@ -92,3 +103,171 @@ class Paginated(BaseModel, Generic[T]):
     def has_previous(self) -> bool:
         """Check if there is a previous page."""
         return self.page > 1
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """Position in a keyset-paginated listing.
+
+    Holds the sort key values of the last item returned, so the next page
+    is fetched with ``WHERE (sort_key, id) > (...)`` instead of an OFFSET
+    scan, keeping deep pages as fast as the first. The sort it was issued
+    for is recorded so a cursor cannot be reused with a different order.
+    Values may be JSON values or ``datetime``, ``date``, ``time``,
+    ``Decimal`` and ``UUID`` objects, which decode to the same type.
+    """
+
+    values: tuple[Any, ...]
+    sort_by: str | None = None
+    sort_order: str = "asc"
+
+    def encode(self, secret: str | bytes | None = None) -> str:
+        """Encode as an opaque URL-safe token, signed if ``secret`` is given.
+
+        Raises:
+            ValidationError: If a value has a type that cannot be encoded.
+        """
+        payload = json.dumps(
+            [list(self.values), self.sort_by, self.sort_order],
+            separators=(",", ":"),
+            default=_encode_value,
+        ).encode()
+        token = _b64encode(payload)
+        if secret is not None:
+            token += "." + _b64encode(_sign(payload, secret))
+        return token
+
+    @classmethod
+    def decode(cls, token: str, secret: str | bytes | None = None) -> "Cursor":
+        """Decode a token produced by :meth:`encode`.
+
+        Raises:
+            ValidationError: If the token is malformed or its signature does
+                not match ``secret``.
+        """
+        encoded, _, signature = token.partition(".")
+        try:
+            payload = _b64decode(encoded)
+            if secret is not None and not hmac.compare_digest(
+                _b64decode(signature), _sign(payload, secret)
+            ):
+                raise ValueError("bad signature")
+            values, sort_by, sort_order = json.loads(payload, object_hook=_decode_value)
+            return cls(tuple(values), sort_by, sort_order)
+        except (ValueError, TypeError, InvalidOperation, binascii.Error) as e:
+            raise ValidationError("Invalid cursor", field="cursor") from e
+
+
+# Cursor values JSON cannot represent, encoded as {"$<tag>": "<text>"}.
+# datetime comes before its base class date.
+_VALUE_TYPES: dict[str, tuple[type, Callable[[str], Any]]] = {
+    "datetime": (datetime, datetime.fromisoformat),
+    "date": (date, date.fromisoformat),
+    "time": (time, time.fromisoformat),
+    "decimal": (Decimal, Decimal),
+    "uuid": (uuid.UUID, uuid.UUID),
+}
+
+
+def _encode_value(value: Any) -> dict[str, str]:
+    for tag, (kind, _) in _VALUE_TYPES.items():
+        if isinstance(value, kind):
+            text = value.isoformat() if isinstance(value, date | time) else str(value)
+            return {f"${tag}": text}
+    raise ValidationError(f"Cannot encode {type(value).__name__} in a cursor", field="cursor")
+
+
+def _decode_value(obj: dict[str, Any]) -> Any:
+    if len(obj) == 1:
+        [(key, text)] = obj.items()
+        if key.startswith("$") and key[1:] in _VALUE_TYPES and isinstance(text, str):
+            return _VALUE_TYPES[key[1:]][1](text)
+    return obj
+
+
+def _sign(payload: bytes, secret: str | bytes) -> bytes:
+    key = secret.encode() if isinstance(secret, str) else secret
+    return hmac.new(key, payload, hashlib.sha256).digest()[:16]
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class CursorParams(BaseModel):
+    """Parameters for cursor (keyset) pagination."""
+
+    cursor: str | None = Field(default=None, description="Cursor from the previous page")
+    page_size: int = Field(default=20, ge=1, le=100, description="Number of items per page")
+    sort_by: str | None = Field(default=None, description="Field to sort by")
+    sort_order: str = Field(default="asc", pattern="^(asc|desc)$", description="Sort order")
+
+    def decode_cursor(self, secret: str | bytes | None = None) -> Cursor | None:
+        """Decode :attr:`cursor`, checking it was issued for the same sort.
+
+        Raises:
+            ValidationError: If the cursor is invalid or was issued for a
+                different sort.
+        """
+        if self.cursor is None:
+            return None
+        cursor = Cursor.decode(self.cursor, secret)
+        if (cursor.sort_by, cursor.sort_order) != (self.sort_by, self.sort_order):
+            raise ValidationError("Cursor does not match the requested sort", field="cursor")
+        return cursor
+
+
+class CursorPaginated(BaseModel, Generic[T]):
+    """Cursor-paginated response wrapper."""
+
+    items: list[T]
+    next_cursor: str | None = Field(description="Cursor for the next page, if any")
+    page_size: int = Field(description="Items per page")
+    total: int | None = Field(default=None, description="Total number of items, if known")
+    total_is_estimate: bool = Field(default=False, description="Whether total is approximate")
+
+    @classmethod
+    def create(
+        cls,
+        items: Sequence[T],
+        params: CursorParams,
+        key: Callable[[T], tuple[Any, ...]],
+        *,
+        secret: str | bytes | None = None,
+        total: int | None = None,
+        total_is_estimate: bool = False,
+    ) -> "CursorPaginated[T]":
+        """Create a page from items fetched after the cursor.
+
+        Fetch ``page_size + 1`` items: the extra item is not returned and
+        only signals that a next page exists.
+
+        Args:
+            items: Items following the cursor, in sort order.
+            params: Pagination parameters of the request.
+            key: Returns the sort key values of an item, e.g. ``(name, id)``.
+            secret: Key used to sign the next cursor.
+            total: Total number of items, if known.
+            total_is_estimate: Whether ``total`` is approximate.
+        """
+        page = list(items[: params.page_size])
+        next_cursor = None
+        if len(items) > params.page_size:
+            cursor = Cursor(key(page[-1]), params.sort_by, params.sort_order)
+            next_cursor = cursor.encode(secret)
+        return cls(
+            items=page,
+            next_cursor=next_cursor,
+            page_size=params.page_size,
+            total=total,
+            total_is_estimate=total_is_estimate,
+        )
+
+    @property
+    def has_next(self) -> bool:
+        """Check if there is a next page."""
+        return self.next_cursor is not None
@@ -1,6 +1,109 @@
 """Unit tests for monorepo-core package."""
 
-from monorepo_core.utils import chunk_list, deep_merge, flatten_dict, generate_id, slugify
+import asyncio
+import fnmatch
+import io
+import math
+import multiprocessing
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from array import array
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator, Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from monorepo_core.backends import RedisBackend, SharedMemoryBackend, SQLiteBackend, TieredCache
+from monorepo_core.base import BaseEntity, BaseRepository, BaseService
+from monorepo_core.batching import BatchLoader
+from monorepo_core.bulkhead import AIMDLimit, Bulkhead, GradientLimit
+from monorepo_core.cache import Cache, EvictionPolicy, fingerprint, make_key, stable_key
+from monorepo_core.caching import CachedRepository
+from monorepo_core.decorators import batched, cached, limit_concurrency, rate_limit, retry, timed
+from monorepo_core.entities import EntityBatch, entity
+from monorepo_core.ids import (
+    IdEngine,
+    RandomIdEngine,
+    SnowflakeEngine,
+    UlidEngine,
+    UuidV7Engine,
+)
+from monorepo_core.lifecycle import ServiceRegistry
+from monorepo_core.memory import InMemoryRepository, Range
+from monorepo_core.metrics import (
+    LoggingExporter,
+    MetricsRegistry,
+    PrometheusExporter,
+    StatsDExporter,
+)
+from monorepo_core.pool import ConnectionPool
+from monorepo_core.profiling import (
+    AdaptiveSampler,
+    EveryNthSampler,
+    ProbabilisticSampler,
+    ProfileCapture,
+    SlowCall,
+    SlowCallLog,
+)
+from monorepo_core.ratelimit import (
+    RateLimiter,
+    SharedTokenBucket,
+    SlidingWindowCounter,
+    SlidingWindowLog,
+    TokenBucket,
+)
+from monorepo_core.resilience import (
+    CircuitBreaker,
+    CircuitState,
+    Jitter,
+    RetryBudget,
+    backoff_delay,
+    circuit_breaker,
+)
+from monorepo_core.utils import (
+    ConflictStrategy,
+    ListStrategy,
+    achunked,
+    chunk_list,
+    chunked,
+    deep_merge,
+    deep_merge_many,
+    flatten_dict,
+    generate_id,
+    generate_ids,
+    iter_flattened,
+    slugify,
+    slugify_many,
+    unflatten_dict,
+)
+from monorepo_shared import ConflictError, CursorParams, PaginationParams
+from monorepo_shared.errors import (
+    BulkheadFullError,
+    CircuitOpenError,
+    PoolExhaustedError,
+    RateLimitError,
+)
+
+
+class FakeClock:
+    """Manually advanced monotonic clock for time-dependent tests."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
 
 
 class TestGenerateId:
@@ -28,6 +131,87 @@ class TestGenerateId:
         result = generate_id(prefix)
         assert len(result) == len(prefix) + 12
 
+    def test_generates_ids_in_bulk(self) -> None:
+        """Should generate many distinct prefixed IDs at once."""
+        ids = generate_ids(10_000, "ord_")
+        assert len(set(ids)) == 10_000
+        assert all(len(i) == 16 and i.startswith("ord_") for i in ids)
+
+    @pytest.mark.parametrize("engine", [UlidEngine, UuidV7Engine, SnowflakeEngine])
+    def test_time_ordered_engines_sort_by_creation(self, engine: Callable[[], IdEngine]) -> None:
+        """Should generate strictly increasing IDs."""
+        ids = generate_ids(5000, engine=engine())
+        key: Callable[[str], Any] = int if engine is SnowflakeEngine else str
+        assert sorted(ids, key=key) == ids
+        assert len(set(ids)) == 5000
+
+    def test_time_ordered_formats(self) -> None:
+        """Should produce standard ULIDs and version 7 UUIDs."""
+        ulid = generate_id(engine=UlidEngine())
+        assert len(ulid) == 26
+        assert set(ulid) <= set("0123456789ABCDEFGHJKMNPQRSTVWXYZ")
+        parsed = uuid.UUID(generate_id(engine=UuidV7Engine()))
+        assert parsed.version == 7
+        assert parsed.variant == uuid.RFC_4122
+        assert abs((parsed.int >> 80) - time.time() * 1000) < 5000
+        assert SnowflakeEngine(worker_id=5).next_int() >> 12 & 0x3FF == 5
+
+    def test_forked_child_does_not_repeat_ids(self) -> None:
+        """Should discard buffered randomness and sequences in a forked child."""
+        engines: list[IdEngine] = [RandomIdEngine(), UlidEngine()]
+        for engine in engines:
+            engine.generate()
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read)
+            os.write(write, " ".join(e.generate() for e in engines).encode())
+            os._exit(0)
+        os.close(write)
+        with os.fdopen(read) as pipe:
+            child_ids = pipe.read().split()
+        os.waitpid(pid, 0)
+        assert child_ids[0] != engines[0].generate()
+        assert child_ids[1][10:] != engines[1].generate()[10:]
+
+    @staticmethod
+    def _in_child(report: Callable[[], str]) -> str:
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read)
+            os.write(write, report().encode())
+            os._exit(0)
+        os.close(write)
+        with os.fdopen(read) as pipe:
+            output = pipe.read()
+        os.waitpid(pid, 0)
+        return output
+
+    def test_forked_snowflake_children_get_their_own_workers(self) -> None:
+        """Should give each child a distinct worker and a fresh sequence."""
+        engine = SnowflakeEngine(worker_id=os.getpid() & 0x3FF)
+        parent_ids = engine.generate_many(100)
+
+        def report() -> str:
+            fresh = engine._last_ms == -1 and engine._sequence == 0
+            return " ".join([str(engine.worker_id), str(fresh), *engine.generate_many(100)])
+
+        children = [self._in_child(report).split() for _ in range(3)]
+        parent_ids += engine.generate_many(100)
+        workers = {int(child[0]) for child in children}
+        assert len(workers) == 3
+        assert engine.worker_id not in workers
+        assert all(child[1] == "True" for child in children)
+        ids = parent_ids + [id for child in children for id in child[2:]]
+        assert len(set(ids)) == len(ids) == 500
+
+    def test_forked_snowflake_child_uses_worker_callback(self) -> None:
+        """Should ask worker_id_after_fork for the child's worker."""
+        engine = SnowflakeEngine(worker_id=1, worker_id_after_fork=lambda: 42)
+        assert self._in_child(lambda: str(engine.worker_id)) == "42"
+        assert engine.worker_id == 1
+
 
 class TestSlugify:
     """Tests for slugify function."""
@@ -56,6 +240,54 @@ class TestSlugify:
         """Should remove leading and trailing hyphens."""
         assert slugify("  hello world  ") == "hello-world"
 
+    def test_collapses_hyphens_and_whitespace(self) -> None:
+        """Should treat hyphens and any whitespace as one word break."""
+        assert slugify("--a - b\tc\u00a0d\n--") == "a-b-c-d"
+        assert slugify("a\x1cb\x1dc\x1ed\x1fe\x0bf\x0cg") == "a-b-c-d-e-f-g"
+        assert slugify("é\x1cb\x1fc") == "b-c"
+
+    def test_matches_regex_implementation(self) -> None:
+        """Should give the output of the regex-based slugify for every character."""
+
+        def reference(text: str) -> str:
+            slug = re.sub(r"\s+", "-", text.lower().strip())
+            slug = re.sub(r"-+", "-", re.sub(r"[^a-z0-9-]", "", slug))
+            return slug.strip("-")
+
+        for code in range(0x3000):
+            text = f"A{chr(code)}b {chr(code)}"
+            assert slugify(text) == reference(text), hex(code)
+
+    def test_drops_underscores_and_non_ascii_by_default(self) -> None:
+        """Should keep the original output for underscores and non-ASCII."""
+        assert slugify("foo_bar") == "foobar"
+        assert slugify("Café Ünïcode") == "caf-ncode"
+
+    def test_transliterates_unicode(self) -> None:
+        """Should map accented and special Latin letters to ASCII."""
+        assert slugify("Café Ünïcode", transliterate=True) == "cafe-unicode"
+        assert slugify("Straße Œuvre", transliterate=True) == "strasse-oeuvre"
+
+    def test_truncates_at_word_boundary(self) -> None:
+        """Should cut long slugs at the last word that fits."""
+        assert slugify("The quick brown fox", max_length=15) == "the-quick-brown"
+        assert slugify("The quick brown fox", max_length=14) == "the-quick"
+        assert slugify("Supercalifragilistic", max_length=5) == "super"
+
+    def test_rejects_invalid_max_length(self) -> None:
+        """Should reject a max_length below 1."""
+        with pytest.raises(ValueError):
+            slugify("hello", max_length=0)
+
+    def test_custom_separator(self) -> None:
+        """Should join words with the given separator."""
+        assert slugify("Hello World", separator="_") == "hello_world"
+
+    def test_slugify_many(self) -> None:
+        """Should slugify each text like slugify does."""
+        texts = ["Hello World", "Café", "Hello World"]
+        assert slugify_many(texts) == [slugify(text) for text in texts]
+
 
 class TestDeepMerge:
     """Tests for deep_merge function."""
@@ -82,6 +314,90 @@ class TestDeepMerge:
         assert base == {"a": 1}
         assert override == {"b": 2}
 
+    def test_copies_only_changed_paths(self) -> None:
+        """Should share unchanged subtrees and leave nested inputs intact."""
+        base = {"a": {"x": 1}, "b": {"y": 2}}
+        result = deep_merge(base, {"a": {"z": 3}})
+        assert result == {"a": {"x": 1, "z": 3}, "b": {"y": 2}}
+        assert result["b"] is base["b"]
+        assert base["a"] == {"x": 1}
+
+    def test_merges_in_place(self) -> None:
+        """Should merge into the base dictionary when asked."""
+        base = {"a": {"x": 1}}
+        nested = base["a"]
+        assert deep_merge(base, {"a": {"y": 2}}, in_place=True) is base
+        assert nested == {"x": 1, "y": 2}
+
+    def test_handles_deep_nesting(self) -> None:
+        """Should merge dictionaries nested deeper than the recursion limit."""
+        base: dict[str, Any] = {}
+        node = base
+        for _ in range(5000):
+            node["n"] = {}
+            node = node["n"]
+        node["leaf"] = 1
+        result = deep_merge(base, base)
+        for _ in range(5000):
+            result = result["n"]
+        assert result == {"leaf": 1}
+
+    @pytest.mark.parametrize(
+        ("strategy", "expected"),
+        [
+            (ListStrategy.REPLACE, [2, 3]),
+            (ListStrategy.APPEND, [1, 2, 2, 3]),
+            (ListStrategy.UNIQUE, [1, 2, 3]),
+        ],
+    )
+    def test_list_strategies(self, strategy: ListStrategy, expected: list[int]) -> None:
+        """Should combine lists as the strategy says."""
+        base = {"tags": [1, 2]}
+        assert deep_merge(base, {"tags": [2, 3]}, lists=strategy) == {"tags": expected}
+        assert base == {"tags": [1, 2]}
+
+    def test_merges_lists_by_key(self) -> None:
+        """Should merge list items with the same key and append the rest."""
+        base = {"users": [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]}
+        override = {"users": [{"id": 2, "role": "admin"}, {"id": 3, "name": "c"}]}
+        result = deep_merge(base, override, lists="by-key", list_key="id")
+        assert result["users"] == [
+            {"id": 1, "name": "a"},
+            {"id": 2, "name": "b", "role": "admin"},
+            {"id": 3, "name": "c"},
+        ]
+        assert base["users"][1] == {"id": 2, "name": "b"}
+
+    def test_by_key_requires_list_key(self) -> None:
+        """Should reject merging by key without a key."""
+        with pytest.raises(ValueError):
+            deep_merge({}, {}, lists=ListStrategy.BY_KEY)
+
+    def test_conflict_strategies(self) -> None:
+        """Should keep, override or reject conflicting values."""
+        base, override = {"a": 1, "b": {"c": 1}}, {"a": 2, "b": {"c": 1}}
+        assert deep_merge(base, override, conflicts=ConflictStrategy.KEEP)["a"] == 1
+        with pytest.raises(ValueError, match="'a'"):
+            deep_merge(base, override, conflicts="error")
+        assert deep_merge({"b": {"c": 1}}, override, conflicts="error") == override
+
+    def test_conflict_resolver(self) -> None:
+        """Should call a resolver with the key path and both values."""
+        result = deep_merge(
+            {"a": {"n": 1}},
+            {"a": {"n": 2}},
+            conflicts=lambda path, old, new: (path, old + new),
+        )
+        assert result == {"a": {"n": (("a", "n"), 3)}}
+
+    def test_merge_many(self) -> None:
+        """Should merge layers in order without modifying any of them."""
+        layers = [{"a": {"x": 1}}, {"a": {"y": 2}}, {"a": {"x": 3}, "b": {"z": 1}}, {"b": {"w": 2}}]
+        result = deep_merge_many(*layers)
+        assert result == {"a": {"x": 3, "y": 2}, "b": {"z": 1, "w": 2}}
+        assert layers[2] == {"a": {"x": 3}, "b": {"z": 1}}
+        assert deep_merge_many() == {}
+
 
 class TestChunkList:
     """Tests for chunk_list function."""
@@ -104,6 +420,64 @@ class TestChunkList:
         assert result == []
 
 
+class TestChunked:
+    """Tests for chunked and achunked."""
+
+    def test_chunks_generators_lazily(self) -> None:
+        """Should consume only as many items as the chunks taken."""
+        consumed = []
+
+        def numbers() -> Iterator[int]:
+            for n in range(10):
+                consumed.append(n)
+                yield n
+
+        chunks = chunked(numbers(), 3)
+        assert next(chunks) == [0, 1, 2]
+        assert consumed == [0, 1, 2]
+        assert list(chunks) == [[3, 4, 5], [6, 7, 8], [9]]
+
+    def test_slices_buffers_without_copying(self) -> None:
+        """Should yield memoryview slices of buffers."""
+        data = bytearray(b"abcdefg")
+        views = list(chunked(data, 3, views=True))
+        assert [bytes(view) for view in views] == [b"abc", b"def", b"g"]
+        data[0] = ord("z")
+        assert bytes(views[0]) == b"zbc"
+
+    def test_slices_sequences(self) -> None:
+        """Should slice sequences that are not buffers."""
+        assert list(chunked(range(5), 2, views=True)) == [range(2), range(2, 4), range(4, 5)]
+
+    def test_rejects_invalid_size(self) -> None:
+        """Should reject sizes below 1 when called."""
+        with pytest.raises(ValueError):
+            chunked([1], 0)
+
+    async def test_chunks_async_iterables(self) -> None:
+        """Should group async items by size."""
+
+        async def numbers() -> AsyncIterator[int]:
+            for n in range(5):
+                yield n
+
+        assert [chunk async for chunk in achunked(numbers(), 2)] == [[0, 1], [2, 3], [4]]
+        with pytest.raises(ValueError):
+            achunked(numbers(), 0)
+
+    async def test_emits_partial_chunk_after_max_wait(self) -> None:
+        """Should emit a short chunk when the stream stalls past max_wait."""
+
+        async def numbers() -> AsyncIterator[int]:
+            for n in range(4):
+                yield n
+                if n == 1:
+                    await asyncio.sleep(0.1)
+
+        chunks = [chunk async for chunk in achunked(numbers(), 10, max_wait=0.02)]
+        assert chunks == [[0, 1], [2, 3]]
+
+
 class TestFlattenDict:
     """Tests for flatten_dict function."""
 
@@ -124,3 +498,2076 @@ class TestFlattenDict:
         nested = {"a": {"b": 1}}
         result = flatten_dict(nested, separator="/")
         assert result == {"a/b": 1}
+
+    def test_flattens_lists_by_index(self) -> None:
+        """Should use list indexes as keys when flattening lists."""
+        nested = {"a": [{"b": 1}, [2, 3]], "c": []}
+        assert flatten_dict(nested, lists=True) == {"a.0.b": 1, "a.1.0": 2, "a.1.1": 3}
+        assert flatten_dict(nested) == nested
+
+    def test_drops_empty_containers_unless_kept(self) -> None:
+        """Should leave out empty dictionaries unless keep_empty is set."""
+        nested = {"a": {}, "b": {"c": {}, "d": 1}, "e": []}
+        assert flatten_dict(nested) == {"b.d": 1, "e": []}
+        assert flatten_dict(nested, keep_empty=True) == {"a": {}, "b.c": {}, "b.d": 1, "e": []}
+        assert flatten_dict(nested, lists=True, keep_empty=True)["e"] == []
+
+    def test_limits_depth(self) -> None:
+        """Should keep containers below max_depth as values."""
+        nested = {"a": {"b": {"c": 1}}, "d": 2}
+        assert flatten_dict(nested, max_depth=1) == {"a.b": {"c": 1}, "d": 2}
+        assert flatten_dict(nested, max_depth=0) == nested
+
+    def test_handles_deep_nesting(self) -> None:
+        """Should flatten dictionaries nested deeper than the recursion limit."""
+        nested: dict[str, Any] = {}
+        node = nested
+        for _ in range(5000):
+            node["n"] = {}
+            node = node["n"]
+        node["leaf"] = 1
+        assert flatten_dict(nested) == {".".join(["n"] * 5000 + ["leaf"]): 1}
+
+    def test_iterates_lazily_in_order(self) -> None:
+        """Should yield pairs depth first in insertion order."""
+        pairs = iter_flattened({"a": {"b": 1, "c": {"d": 2}}, "e": 3}, "root")
+        assert next(pairs) == ("root.a.b", 1)
+        assert list(pairs) == [("root.a.c.d", 2), ("root.e", 3)]
+
+    def test_unflatten_round_trip(self) -> None:
+        """Should restore what flatten_dict flattened."""
+        nested = {"a": {"b": [1, {"c": 2}], "e": {}}, "f": "g"}
+        flat = flatten_dict(nested, lists=True, keep_empty=True)
+        assert unflatten_dict(flat, lists=True) == nested
+        assert unflatten_dict({"x/y": 1}, separator="/") == {"x": {"y": 1}}
+
+    def test_unflatten_rejects_conflicting_keys(self) -> None:
+        """Should reject a key nested under another key's value."""
+        with pytest.raises(ValueError):
+            unflatten_dict({"a": 1, "a.b": 2})
+        with pytest.raises(ValueError):
+            unflatten_dict({"a.b": 2, "a": 1})
+
+
+def _drain_shared_bucket(path: Path) -> None:
+    bucket = SharedTokenBucket(path, rate=1, burst=5, slots=16)
+    while bucket.acquire("tenant") == 0.0:
+        pass
+    bucket.close()
+
+
+class TestCache:
+    """Tests for the Cache engine."""
+
+    def test_lru_evicts_least_recently_used(self) -> None:
+        """Should evict the least recently used entry when full."""
+        cache = Cache(max_entries=2, policy=EvictionPolicy.LRU)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert "a" in cache
+        assert "b" not in cache
+        assert cache.info().evictions == 1
+
+    def test_lfu_evicts_least_frequently_used(self) -> None:
+        """Should evict the least frequently used entry when full."""
+        cache = Cache(max_entries=2, policy="lfu")
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("b")
+        cache.get("a")
+        cache.get("a")
+        cache.set("c", 3)
+        assert "a" in cache
+        assert "b" not in cache
+
+    def test_tinylfu_rejects_cold_candidates(self) -> None:
+        """Should keep hot entries instead of admitting one-off keys."""
+        cache = Cache(max_entries=2, policy="tinylfu")
+        cache.set("a", 1)
+        cache.set("b", 2)
+        for _ in range(5):
+            cache.get("a")
+            cache.get("b")
+        assert cache.set("cold", 3) is False
+        assert "a" in cache
+        assert "b" in cache
+        assert cache.info().rejections == 1
+
+    def test_respects_max_bytes(self) -> None:
+        """Should evict entries to stay within the byte budget."""
+        cache = Cache(max_bytes=10, sizeof=len)
+        cache.set("a", "xxxx")
+        cache.set("b", "xxxx")
+        cache.set("c", "xxxx")
+        assert len(cache) == 2
+        assert cache.info().nbytes == 8
+        assert cache.set("big", "x" * 11) is False
+
+    def test_expires_entries_lazily(self) -> None:
+        """Should treat entries past their TTL as misses."""
+        clock = FakeClock()
+        cache = Cache(ttl_seconds=10, clock=clock)
+        cache.set("a", 1)
+        clock.advance(11)
+        assert cache.get("a") is None
+        assert cache.info().expirations == 1
+
+    def test_sweeps_expired_entries_on_write(self) -> None:
+        """Should drop all expired entries once the sweep interval passes."""
+        clock = FakeClock()
+        cache = Cache(ttl_seconds=10, sweep_interval=5, clock=clock)
+        for i in range(100):
+            cache.set(i, i)
+        clock.advance(11)
+        cache.set("fresh", 1)
+        assert len(cache) == 1
+
+    def test_is_thread_safe(self) -> None:
+        """Should stay within its bounds under concurrent writers."""
+        cache = Cache(max_entries=512, policy="lfu")
+        assert len(cache._shards) == 2
+        errors: list[Exception] = []
+
+        def worker(offset: int) -> None:
+            try:
+                for i in range(2000):
+                    cache.set((offset, i % 700), i)
+                    cache.get((offset, (i * 7) % 700))
+                    if i % 50 == 0:
+                        cache.invalidate((offset, i % 700))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        assert len(cache) <= 512
+
+    @pytest.mark.parametrize("clear_on_fork", [True, False])
+    def test_resets_locks_after_fork(self, clear_on_fork: bool) -> None:
+        """Should give forked children usable locks and optionally an empty cache."""
+        cache = Cache(max_entries=10, clear_on_fork=clear_on_fork)
+        cache.set("a", 1)
+        # Simulate another thread holding the lock at fork time.
+        cache._shards[0].lock.acquire()
+        try:
+            pid = os.fork()
+            if pid == 0:
+                inherited = "a" in cache
+                ok = inherited is not clear_on_fork and cache.set("b", 2) and cache.get("b") == 2
+                os._exit(0 if ok else 1)
+        finally:
+            cache._shards[0].lock.release()
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+
+
+class TestMakeKey:
+    """Tests for cache key building."""
+
+    def test_keys_single_scalar_by_type(self) -> None:
+        """Should not confuse lone scalars that compare equal across types."""
+        assert make_key(("abc",), {}) == make_key(("abc",), {})
+        keys = [make_key((value,), {}) for value in (1, 1.0, True)]
+        assert len(set(keys)) == 3
+        assert len({stable_key(key) for key in keys}) == 3
+        assert stable_key(make_key((1,), {})) != stable_key(make_key((int, 1), {}))
+
+    def test_cached_separates_equal_scalars_of_different_types(self) -> None:
+        """Should cache f(1), f(1.0) and f(True) separately."""
+
+        @cached()
+        def describe(value: object) -> str:
+            return type(value).__name__
+
+        assert [describe(1), describe(1.0), describe(True)] == ["int", "float", "bool"]
+
+    def test_ignores_keyword_order(self) -> None:
+        """Should build equal keys for reordered keyword arguments."""
+        assert make_key((1,), {"a": 1, "b": 2}) == make_key((1,), {"b": 2, "a": 1})
+
+    def test_distinguishes_positional_and_keyword(self) -> None:
+        """Should not confuse positional and keyword arguments."""
+        assert make_key(("a", 1), {}) != make_key((), {"a": 1})
+
+    def test_fingerprints_unhashable_arguments(self) -> None:
+        """Should key dicts and lists by content."""
+        key1 = make_key(({"a": [1, 2]},), {})
+        key2 = make_key(({"a": [1, 2]},), {})
+        assert key1 == key2
+        assert hash(key1) == hash(key2)
+        assert key1 != make_key(({"a": [2, 1]},), {})
+
+    def test_fingerprints_objects_by_fields(self) -> None:
+        """Should key unhashable objects by their attributes and type."""
+
+        @dataclass
+        class Point:
+            x: int
+            y: int
+
+        assert fingerprint(Point(1, 2)) == fingerprint(Point(1, 2))
+        assert fingerprint(Point(1, 2)) != fingerprint({"x": 1, "y": 2})
+
+    def test_does_not_collide_on_equal_repr(self) -> None:
+        """Should keep distinct objects with identical reprs apart."""
+
+        class Opaque:
+            def __repr__(self) -> str:
+                return "same"
+
+        assert make_key((Opaque(),), {}) != make_key((Opaque(),), {})
+
+
+class FakeRedis:
+    """In-process stand-in for the subset of the Redis client used by RedisBackend."""
+
+    def __init__(self) -> None:
+        self.data: dict[str, tuple[bytes, float]] = {}
+
+    def get(self, name: str) -> bytes | None:
+        value, expires_at = self.data.get(name, (None, 0.0))
+        return value if expires_at > time.time() else None
+
+    def set(self, name: str, value: bytes, px: int | None = None) -> bool:
+        expires_at = time.time() + px / 1000 if px is not None else float("inf")
+        self.data[name] = (value, expires_at)
+        return True
+
+    def delete(self, *names: str) -> int:
+        return sum(self.data.pop(name, None) is not None for name in names)
+
+    def scan_iter(self, match: str | None = None) -> Iterator[str]:
+        return iter([key for key in self.data if match is None or fnmatch.fnmatch(key, match)])
+
+
+def _write_shared_entry(path: Path) -> None:
+    backend = SharedMemoryBackend(path, slots=64, slot_size=256)
+    backend.set("from-child", {"pid": "child"})
+    backend.close()
+
+
+class TestBackends:
+    """Tests for cache backends."""
+
+    def test_stable_key_is_deterministic(self) -> None:
+        """Should derive the same key for equal cache keys."""
+        key1 = stable_key(make_key(({"b": 1, "a": {2, 3}},), {"x": 1}), "ns")
+        key2 = stable_key(make_key(({"a": {3, 2}, "b": 1},), {"x": 1}), "ns")
+        assert key1 == key2
+        assert key1.startswith("ns:")
+
+    def test_shared_memory_round_trip(self, tmp_path: Path) -> None:
+        """Should store, expire and invalidate entries."""
+        backend = SharedMemoryBackend(tmp_path / "segment", slots=16, slot_size=128)
+        assert backend.set("a", [1, 2, 3]) is True
+        assert backend.get("a") == [1, 2, 3]
+        assert backend.set("too-big", "x" * 200) is False
+        backend.set("short", 1, ttl_seconds=-1)
+        assert backend.get("short", "missing") == "missing"
+        assert backend.invalidate("a") is True
+        assert backend.get("a") is None
+        backend.close()
+
+    def test_shared_memory_requires_fcntl(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Should fail with a clear error only when used without fcntl."""
+        monkeypatch.setitem(sys.modules, "fcntl", None)
+        with pytest.raises(ImportError, match="POSIX"):
+            SharedMemoryBackend(tmp_path / "segment")
+
+    def test_shared_memory_is_shared_across_processes(self, tmp_path: Path) -> None:
+        """Should expose entries written by another process."""
+        path = tmp_path / "segment"
+        backend = SharedMemoryBackend(path, slots=64, slot_size=256)
+        process = multiprocessing.get_context("fork").Process(
+            target=_write_shared_entry, args=(path,)
+        )
+        process.start()
+        process.join(timeout=10)
+        assert backend.get("from-child") == {"pid": "child"}
+        backend.close()
+
+    def test_shared_memory_evicts_when_full(self, tmp_path: Path) -> None:
+        """Should keep accepting writes once every slot is taken."""
+        backend = SharedMemoryBackend(tmp_path / "segment", slots=4, slot_size=64)
+        for i in range(20):
+            assert backend.set(f"key-{i}", i) is True
+        assert backend.get("key-19") == 19
+        assert backend.evictions > 0
+        backend.close()
+
+    def test_sqlite_survives_reopen(self, tmp_path: Path) -> None:
+        """Should persist entries across backend instances."""
+        path = tmp_path / "cache.db"
+        backend = SQLiteBackend(path)
+        backend.set("a", {"value": 1})
+        backend.set("expired", 1, ttl_seconds=-1)
+        backend.close()
+
+        reopened = SQLiteBackend(path)
+        assert reopened.get("a") == {"value": 1}
+        assert reopened.get("expired") is None
+        assert reopened.invalidate("a") is True
+        reopened.close()
+
+    def test_redis_backend_with_local_stand_in(self) -> None:
+        """Should round-trip values through a Redis-compatible client."""
+        client = FakeRedis()
+        backend = RedisBackend(client, ttl_seconds=60, prefix="test:")
+        backend.set("a", (1, 2))
+        assert backend.get("a") == (1, 2)
+        assert list(client.data) == ["test:a"]
+        backend.clear()
+        assert backend.get("a") is None
+
+    def test_tiered_cache_promotes_hits(self, tmp_path: Path) -> None:
+        """Should copy values found in a lower tier into the tiers above."""
+        local = Cache(max_entries=10)
+        disk = SQLiteBackend(tmp_path / "cache.db")
+        tiers = TieredCache([local, disk])
+        disk.set("a", 1)
+        assert tiers.get("a") == 1
+        assert local.get("a") == 1
+        tiers.invalidate("a")
+        assert disk.get("a") is None
+        disk.close()
+
+    def test_cached_shares_results_through_backend(self) -> None:
+        """Should reuse results computed by another worker's copy of a function."""
+        backend = RedisBackend(FakeRedis())
+        calls: list[int] = []
+
+        def make_worker() -> Callable[[int], int]:
+            @cached(backend=backend)
+            def square(x: int) -> int:
+                calls.append(x)
+                return x * x
+
+            return square
+
+        worker1, worker2 = make_worker(), make_worker()
+        assert worker1(4) == 16
+        assert worker2(4) == 16
+        assert calls == [4]
+        assert worker2.invalidate(4) is True
+        assert worker1.cache_info().currsize == 1
+
+
+class TestCached:
+    """Tests for the cached decorator."""
+
+    def test_caches_results(self) -> None:
+        """Should call the function once per distinct argument."""
+        calls: list[int] = []
+
+        @cached()
+        def square(x: int) -> int:
+            calls.append(x)
+            return x * x
+
+        assert square(3) == 9
+        assert square(3) == 9
+        assert calls == [3]
+        assert square.cache_info().hits == 1
+
+    def test_bounds_entries(self) -> None:
+        """Should not grow past max_entries."""
+
+        @cached(max_entries=10)
+        def identity(x: int) -> int:
+            return x
+
+        for i in range(1000):
+            identity(i)
+        assert identity.cache_info().currsize == 10
+
+    def test_invalidate_and_clear(self) -> None:
+        """Should support per-key invalidation and full clearing."""
+        calls: list[int] = []
+
+        @cached()
+        def double(x: int) -> int:
+            calls.append(x)
+            return x * 2
+
+        double(1)
+        double(2)
+        assert double.invalidate(1) is True
+        double(1)
+        double(2)
+        assert calls == [1, 2, 1]
+        double.cache_clear()
+        assert double.cache_info().currsize == 0
+
+    def test_uses_custom_key_function(self) -> None:
+        """Should key the cache with the user-supplied function."""
+        calls: list[str] = []
+
+        @cached(key=lambda user, request_id: user)
+        def load(user: str, request_id: int) -> str:
+            calls.append(user)
+            return user.upper()
+
+        assert load("ann", 1) == "ANN"
+        assert load("ann", 2) == "ANN"
+        assert calls == ["ann"]
+        assert load.invalidate("ann", 0) is True
+
+    def test_caches_unhashable_arguments(self) -> None:
+        """Should cache calls whose arguments are dicts."""
+        calls: list[dict[str, int]] = []
+
+        @cached()
+        def total(values: dict[str, int]) -> int:
+            calls.append(values)
+            return sum(values.values())
+
+        assert total({"a": 1, "b": 2}) == 3
+        assert total({"b": 2, "a": 1}) == 3
+        assert len(calls) == 1
+
+    async def test_caches_awaited_results(self) -> None:
+        """Should cache the awaited value of a coroutine function."""
+        calls: list[int] = []
+
+        @cached()
+        async def fetch(x: int) -> int:
+            calls.append(x)
+            return x + 1
+
+        assert await fetch(1) == 2
+        assert await fetch(1) == 2
+        assert calls == [1]
+
+    async def test_coalesces_concurrent_misses(self) -> None:
+        """Should run one call for many concurrent misses on the same key."""
+        calls: list[int] = []
+
+        @cached()
+        async def fetch(x: int) -> int:
+            calls.append(x)
+            await asyncio.sleep(0.01)
+            return x * 10
+
+        results = await asyncio.gather(*(fetch(5) for _ in range(50)))
+        assert results == [50] * 50
+        assert calls == [5]
+
+    async def test_does_not_cache_async_failures(self) -> None:
+        """Should propagate errors to every waiter without caching them."""
+        attempts: list[int] = []
+
+        @cached()
+        async def flaky(x: int) -> int:
+            attempts.append(x)
+            await asyncio.sleep(0)
+            if len(attempts) == 1:
+                raise ValueError("boom")
+            return x
+
+        outcomes = await asyncio.gather(flaky(1), flaky(1), return_exceptions=True)
+        assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+        assert await flaky(1) == 1
+        assert attempts == [1, 1]
+
+    def test_serves_stale_while_refreshing(self) -> None:
+        """Should return the expired value and refresh it in the background."""
+        calls: list[int] = []
+
+        @cached(ttl_seconds=0.05, stale_ttl=10)
+        def version() -> int:
+            calls.append(1)
+            return len(calls)
+
+        assert version() == 1
+        time.sleep(0.06)
+        assert version() == 1
+        for _ in range(100):
+            if make_key((), {}) in version.cache:
+                break
+            time.sleep(0.01)
+        assert version() == 2
+        assert version.cache_info().stale_hits == 1
+
+    def test_does_not_serve_past_stale_window(self) -> None:
+        """Should recompute synchronously once the grace window has passed."""
+        calls: list[int] = []
+
+        @cached(ttl_seconds=0.01, stale_ttl=0.01)
+        def version() -> int:
+            calls.append(1)
+            return len(calls)
+
+        assert version() == 1
+        time.sleep(0.03)
+        assert version() == 2
+
+    async def test_refreshes_ahead_of_expiry(self) -> None:
+        """Should refresh hot async keys before they expire."""
+        calls: list[int] = []
+
+        @cached(ttl_seconds=0.2, refresh_ahead=0.5)
+        async def version() -> int:
+            calls.append(1)
+            return len(calls)
+
+        assert await version() == 1
+        await asyncio.sleep(0.12)
+        assert await version() == 1
+        await asyncio.sleep(0.01)
+        assert await version() == 2
+
+    def test_rejects_invalid_refresh_ahead(self) -> None:
+        """Should reject refresh_ahead outside (0, 1)."""
+        with pytest.raises(ValueError):
+            cached(refresh_ahead=1.5)
+
+    def test_computes_once_for_concurrent_threads(self) -> None:
+        """Should let one thread compute a key while the others wait for it."""
+        calls: list[int] = []
+        barrier = threading.Barrier(8)
+
+        @cached()
+        def slow(x: int) -> int:
+            calls.append(x)
+            time.sleep(0.05)
+            return x
+
+        def worker() -> None:
+            barrier.wait()
+            assert slow(1) == 1
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert calls == [1]
+
+    def test_functions_do_not_share_cache(self) -> None:
+        """Should keep a separate cache per decorated function."""
+        decorator = cached()
+
+        @decorator
+        def one(x: int) -> int:
+            return 1
+
+        @decorator
+        def two(x: int) -> int:
+            return 2
+
+        assert one(0) == 1
+        assert two(0) == 2
+
+
+class TestMetrics:
+    """Tests for the metrics registry and exporters."""
+
+    def test_histogram_percentiles_are_accurate(self) -> None:
+        """Should report percentiles within the bucket precision."""
+        histogram = MetricsRegistry().histogram("latency")
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000)
+        snapshot = histogram.snapshot()
+        assert snapshot.count == 1000
+        assert snapshot.p50 == pytest.approx(0.5, rel=0.01)
+        assert snapshot.p99 == pytest.approx(0.99, rel=0.01)
+        assert snapshot.max == pytest.approx(1.0)
+
+    def test_merges_threads(self) -> None:
+        """Should combine values recorded from several threads."""
+        registry = MetricsRegistry()
+        counter = registry.counter("events")
+
+        def worker() -> None:
+            for _ in range(1000):
+                counter.inc()
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert counter.snapshot().value == 4000
+
+    def test_folds_shards_of_exited_threads(self) -> None:
+        """Should keep totals but drop per-thread shards as threads churn."""
+        registry = MetricsRegistry()
+        counter = registry.counter("events")
+        histogram = registry.histogram("latency")
+
+        def worker() -> None:
+            counter.inc()
+            histogram.record(0.001)
+
+        for _ in range(50):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+        assert counter.snapshot().value == 50
+        assert histogram.snapshot().count == 50
+        assert len(counter._shards) <= 1
+        assert len(histogram._shards) <= 1
+
+    def test_rejects_conflicting_kinds(self) -> None:
+        """Should not register a counter and histogram under one name."""
+        registry = MetricsRegistry()
+        registry.counter("x")
+        with pytest.raises(ValueError):
+            registry.histogram("x")
+
+    def test_renders_prometheus_text(self) -> None:
+        """Should expose histograms as summaries and counters as totals."""
+        registry = MetricsRegistry()
+        registry.histogram("duration_seconds", function="f").record(0.25)
+        registry.counter("calls", function="f").inc(3)
+        registry.counter("errors_total").inc()
+        exporter = PrometheusExporter()
+        registry.export(exporter)
+        p50 = f"{registry.histogram('duration_seconds', function='f').snapshot().p50:.9f}"
+        assert exporter.text == (
+            "# TYPE calls_total counter\n"
+            'calls_total{function="f"} 3\n'
+            "# TYPE duration_seconds summary\n"
+            f'duration_seconds{{function="f",quantile="0.5"}} {p50}\n'
+            f'duration_seconds{{function="f",quantile="0.95"}} {p50}\n'
+            f'duration_seconds{{function="f",quantile="0.99"}} {p50}\n'
+            'duration_seconds_sum{function="f"} 0.250000000\n'
+            'duration_seconds_count{function="f"} 1\n'
+            "# TYPE errors_total counter\n"
+            "errors_total{} 1\n"
+        )
+
+    def test_logs_snapshots(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Should log one line per metric."""
+        registry = MetricsRegistry()
+        registry.histogram("duration_seconds", function="f").record(0.1)
+        with caplog.at_level("INFO", logger="monorepo_core.metrics"):
+            registry.export(LoggingExporter())
+        assert 'duration_seconds{function="f"} count=1' in caplog.text
+
+    def test_sends_statsd_datagrams(self) -> None:
+        """Should send counter deltas and percentile gauges over UDP."""
+        listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        listener.bind(("127.0.0.1", 0))
+        listener.settimeout(5)
+        registry = MetricsRegistry()
+        registry.histogram("duration", function="f").record(0.002)
+        exporter = StatsDExporter(port=listener.getsockname()[1], prefix="app.")
+        registry.export(exporter)
+        registry.export(exporter)
+        first = listener.recv(4096).decode().splitlines()
+        second = listener.recv(4096).decode().splitlines()
+        exporter.close()
+        listener.close()
+        assert "app.duration.f.count:1|c" in first
+        assert "app.duration.f.p50:2.000|g" in first
+        assert "app.duration.f.count:0|c" in second
+
+
+class TestTimed:
+    """Tests for the timed decorator."""
+
+    def test_records_sync_calls(self) -> None:
+        """Should record one duration per call without printing."""
+        registry = MetricsRegistry()
+
+        @timed(registry=registry)
+        def work() -> int:
+            return 1
+
+        assert work() == 1
+        assert work() == 1
+        snapshot = registry.histogram(
+            "function_duration_seconds", function=work.__qualname__
+        ).snapshot()
+        assert snapshot.count == 2
+
+    async def test_records_async_calls_with_custom_name(self) -> None:
+        """Should record coroutine durations under the given name."""
+        registry = MetricsRegistry()
+
+        @timed(name="fetch", registry=registry)
+        async def fetch() -> int:
+            await asyncio.sleep(0.01)
+            return 1
+
+        assert await fetch() == 1
+        snapshot = registry.histogram("function_duration_seconds", function="fetch").snapshot()
+        assert snapshot.count == 1
+        assert snapshot.max >= 0.01
+
+    def test_supports_bare_decorator(self, capsys: pytest.CaptureFixture[str]) -> None:
+        """Should work as a bare decorator and keep stdout quiet."""
+
+        @timed
+        def work() -> int:
+            return 2
+
+        assert work() == 2
+        assert capsys.readouterr().out == ""
+
+
+class TestSampling:
+    """Tests for timed sampling and slow-call capture."""
+
+    @staticmethod
+    def _count(registry: MetricsRegistry, name: str) -> int:
+        return registry.histogram("function_duration_seconds", function=name).snapshot().count
+
+    def test_every_nth(self) -> None:
+        """Should measure one call in n."""
+        registry = MetricsRegistry()
+        work = timed(name="work", registry=registry, sampler=EveryNthSampler(10))(lambda: 1)
+        for _ in range(100):
+            assert work() == 1
+        assert self._count(registry, "work") == 10
+
+    def test_probabilistic(self) -> None:
+        """Should measure roughly the requested fraction of calls."""
+        registry = MetricsRegistry()
+        work = timed(name="work", registry=registry, sampler=ProbabilisticSampler(0.1))(lambda: 1)
+        for _ in range(10_000):
+            work()
+        assert 700 < self._count(registry, "work") < 1300
+
+    def test_rejects_invalid_rates(self) -> None:
+        """Should validate sampler arguments."""
+        with pytest.raises(ValueError):
+            EveryNthSampler(0)
+        with pytest.raises(ValueError):
+            ProbabilisticSampler(0.0)
+        with pytest.raises(ValueError):
+            AdaptiveSampler(overhead_budget=2.0)
+
+    def test_adaptive_rate_follows_call_cost(self) -> None:
+        """Should sample cheap calls rarely and expensive calls always."""
+        sampler = AdaptiveSampler(overhead_budget=0.01, cost_ns=1000)
+        for _ in range(200):
+            if sampler.sample():
+                sampler.observe(10_000)
+        assert sampler.rate == pytest.approx(0.1)
+        for _ in range(500):
+            if sampler.sample():
+                sampler.observe(1_000_000_000)
+        assert sampler.rate == 1.0
+
+    def test_logs_slow_calls_with_call_site(self) -> None:
+        """Should keep calls above the threshold, slowest first."""
+        log = SlowCallLog()
+
+        @timed(slow_threshold=0.01, slow_log=log)
+        def work(seconds: float) -> None:
+            time.sleep(seconds)
+
+        work(0.0)
+        work(0.02)
+        work(0.04)
+        slowest = log.slowest()
+        assert [call.duration >= 0.04 for call in slowest] == [True, False]
+        assert slowest[0].call_site.startswith(__file__)
+        assert slowest[0].function == work.__qualname__
+
+    def test_captures_profile_of_next_slow_call(self) -> None:
+        """Should profile the call after a slow one and attach the report."""
+        log = SlowCallLog()
+
+        def helper() -> None:
+            time.sleep(0.02)
+
+        @timed(slow_threshold=0.01, capture=ProfileCapture.CPROFILE, slow_log=log)
+        def work() -> None:
+            helper()
+
+        work()
+        work()
+        profiles = [call.profile for call in log.slowest()]
+        assert profiles.count(None) == 1
+        assert any(p and "helper" in p for p in profiles)
+
+    async def test_captures_allocations_of_async_calls(self) -> None:
+        """Should attach a tracemalloc report to slow coroutine calls."""
+        log = SlowCallLog()
+
+        @timed(slow_threshold=0.01, capture=ProfileCapture.TRACEMALLOC, slow_log=log)
+        async def work() -> list[bytes]:
+            await asyncio.sleep(0.02)
+            return [bytes(1000) for _ in range(100)]
+
+        await work()
+        await work()
+        assert any(call.profile and "size=" in call.profile for call in log.slowest())
+
+    def test_capture_requires_threshold(self) -> None:
+        """Should reject capture without a slow threshold."""
+        with pytest.raises(ValueError):
+            timed(capture=ProfileCapture.CPROFILE)
+
+    def test_dump_keeps_top_n(self) -> None:
+        """Should bound the log and format the slowest calls."""
+        log = SlowCallLog(capacity=3)
+        for ms in range(10):
+            log.add(SlowCall("f", ms / 1000, "app.py:1", 0.0))
+        out = io.StringIO()
+        report = log.dump(2, file=out)
+        assert out.getvalue() == report
+        assert report.splitlines() == ["1. f 9.000ms at app.py:1", "2. f 8.000ms at app.py:1"]
+        assert len(log.slowest(10)) == 3
+
+
+class Flaky:
+    """Callable failing a set number of times before returning ``"ok"``."""
+
+    def __init__(self, failures: int, error: type[Exception] = ConnectionError) -> None:
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def __call__(self) -> str:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error(f"failure {self.calls}")
+        return "ok"
+
+
+class TestRetry:
+    """Tests for the retry decorator and its resilience helpers."""
+
+    def test_retries_until_success(self) -> None:
+        """Should call again after retryable failures."""
+        flaky = Flaky(2)
+        assert retry(delay=0)(flaky)() == "ok"
+        assert flaky.calls == 3
+
+    def test_reraises_last_error(self) -> None:
+        """Should raise the final exception once attempts run out."""
+        flaky = Flaky(5)
+        with pytest.raises(ConnectionError, match="failure 3"):
+            retry(max_attempts=3, delay=0)(flaky)()
+
+    def test_does_not_retry_other_exceptions(self) -> None:
+        """Should let non-matching exceptions through immediately."""
+        flaky = Flaky(1, error=KeyError)
+        with pytest.raises(KeyError):
+            retry(delay=0, exceptions=(ConnectionError,))(flaky)()
+        assert flaky.calls == 1
+
+    async def test_retries_coroutines(self) -> None:
+        """Should retry async functions."""
+        flaky = Flaky(1)
+
+        @retry(delay=0)
+        async def call() -> str:
+            return flaky()
+
+        assert await call() == "ok"
+
+    def test_backoff_delays(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Should grow, cap and randomise delays as configured."""
+        kwargs = {"delay": 1.0, "backoff": 2.0, "max_delay": 5.0}
+        assert [backoff_delay(n, 0.0, jitter=Jitter.NONE, **kwargs) for n in range(1, 6)] == [
+            1.0,
+            2.0,
+            4.0,
+            5.0,
+            5.0,
+        ]
+        monkeypatch.setattr("random.uniform", lambda low, high: high)
+        assert backoff_delay(3, 0.0, jitter=Jitter.FULL, **kwargs) == 4.0
+        assert backoff_delay(9, 3.0, jitter=Jitter.DECORRELATED, **kwargs) == 5.0
+        monkeypatch.setattr("random.uniform", lambda low, high: low)
+        assert backoff_delay(3, 0.0, jitter=Jitter.FULL, **kwargs) == 0.0
+        assert backoff_delay(9, 3.0, jitter=Jitter.DECORRELATED, **kwargs) == 1.0
+
+    def test_stops_at_deadline(self) -> None:
+        """Should not start an attempt whose delay crosses the deadline."""
+        flaky = Flaky(5)
+        with pytest.raises(ConnectionError, match="failure 1"):
+            retry(max_attempts=5, delay=1.0, jitter=Jitter.NONE, deadline=0.5)(flaky)()
+
+    def test_budget_limits_retries(self) -> None:
+        """Should stop retrying once the shared budget is spent."""
+        clock = FakeClock()
+        budget = RetryBudget(0.5, min_per_second=0, max_tokens=2, clock=clock)
+        flaky = Flaky(10)
+        with pytest.raises(ConnectionError, match="failure 3"):
+            retry(max_attempts=10, delay=0, budget=budget)(flaky)()
+        assert budget.tokens == 0.0
+        budget.deposit()
+        budget.deposit()
+        assert budget.try_spend()
+        assert not budget.try_spend()
+
+    def test_budget_refills_over_time(self) -> None:
+        """Should add min_per_second tokens as time passes."""
+        clock = FakeClock()
+        budget = RetryBudget(0.0, min_per_second=2, max_tokens=10, clock=clock)
+        while budget.try_spend():
+            pass
+        clock.advance(1.5)
+        assert budget.tokens == 3.0
+
+    def test_breaker_opens_and_recovers(self) -> None:
+        """Should reject calls while open and close after a good trial call."""
+        clock = FakeClock()
+        breaker = CircuitBreaker("db", failure_threshold=2, recovery_timeout=10, clock=clock)
+        flaky = Flaky(2)
+        call = retry(max_attempts=1, breaker=breaker)(flaky)
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                call()
+        assert breaker.state is CircuitState.OPEN
+        with pytest.raises(CircuitOpenError) as excinfo:
+            call()
+        assert excinfo.value.details == {"dependency": "db", "retry_after": 10.0}
+        assert flaky.calls == 2
+        clock.advance(10)
+        assert breaker.state is CircuitState.HALF_OPEN
+        assert call() == "ok"
+        assert breaker.state is CircuitState.CLOSED
+
+    def test_breaker_reopens_on_failed_trial(self) -> None:
+        """Should allow one trial while half-open and reopen if it fails."""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=5, clock=clock)
+        breaker.record_failure()
+        clock.advance(5)
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record_failure()
+        assert breaker.state is CircuitState.OPEN
+
+    def test_breaker_releases_trial_on_non_retryable_error(self) -> None:
+        """Should not lose the half-open trial to an exception it ignores."""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=5, clock=clock)
+        breaker.record_failure()
+        clock.advance(5)
+
+        @retry(max_attempts=1, exceptions=(ConnectionError,), breaker=breaker)
+        def lookup() -> str:
+            raise KeyError("missing")
+
+        with pytest.raises(KeyError):
+            lookup()
+        assert breaker.state is CircuitState.HALF_OPEN
+        assert breaker.allow()
+
+    async def test_breaker_releases_trial_on_cancellation(self) -> None:
+        """Should give the trial back when the attempt is cancelled."""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=5, clock=clock)
+        breaker.record_failure()
+        clock.advance(5)
+
+        @retry(max_attempts=1, breaker=breaker)
+        async def slow() -> None:
+            await asyncio.sleep(10)
+
+        task = asyncio.ensure_future(slow())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert breaker.allow()
+
+    def test_breaker_stops_retry_loop(self) -> None:
+        """Should raise CircuitOpenError, chained to the last failure."""
+        breaker = CircuitBreaker(failure_threshold=2)
+        flaky = Flaky(10)
+        with pytest.raises(CircuitOpenError) as excinfo:
+            retry(max_attempts=5, delay=0, breaker=breaker)(flaky)()
+        assert flaky.calls == 2
+        assert isinstance(excinfo.value.__cause__, ConnectionError)
+
+    def test_breakers_are_shared_per_dependency(self) -> None:
+        """Should return one breaker per dependency name."""
+        assert circuit_breaker("search") is circuit_breaker("search")
+        assert circuit_breaker("search") is not circuit_breaker("billing")
+
+
+class TestHedging:
+    """Tests for hedged attempts on async retry."""
+
+    @staticmethod
+    def _backend(delays: list[float]) -> tuple[Callable[[], object], list[str]]:
+        """Coroutine whose n-th call sleeps ``delays[n]``; logs outcomes."""
+        events: list[str] = []
+        calls = iter(range(len(delays)))
+
+        async def call() -> int:
+            n = next(calls)
+            try:
+                await asyncio.sleep(delays[n])
+            except asyncio.CancelledError:
+                events.append(f"cancelled {n}")
+                raise
+            events.append(f"done {n}")
+            return n
+
+        return call, events
+
+    async def test_first_hedge_to_finish_wins(self) -> None:
+        """Should start a copy after the delay and cancel the slower one."""
+        call, events = self._backend([5.0, 0.0])
+        hedged = retry(hedges=1, hedge_delay=0.01)(call)
+        started = time.perf_counter()
+        assert await hedged() == 1
+        assert time.perf_counter() - started < 1.0
+        await asyncio.sleep(0)
+        assert events == ["done 1", "cancelled 0"]
+
+    async def test_does_not_hedge_fast_calls(self) -> None:
+        """Should not start copies for calls finishing within the delay."""
+        call, events = self._backend([0.0, 0.0])
+        assert await retry(hedges=2, hedge_delay=0.5)(call)() == 0
+        assert events == ["done 0"]
+
+    async def test_hedges_after_observed_p95(self) -> None:
+        """Should hedge once enough latencies are known to estimate p95."""
+        call, events = self._backend([0.0] * 20 + [5.0, 0.0])
+        hedged = retry(hedges=1)(call)
+        for n in range(20):
+            assert await hedged() == n
+        assert await hedged() == 21
+        assert events[-1] == "done 21"
+
+    async def test_waits_for_remaining_copies_on_failure(self) -> None:
+        """Should ignore a failed copy while another may still succeed."""
+        attempts = iter([ConnectionError("down"), None])
+
+        @retry(max_attempts=1, hedges=1, hedge_delay=0.01)
+        async def call() -> str:
+            error = next(attempts)
+            if error:
+                await asyncio.sleep(0.05)
+                raise error
+            await asyncio.sleep(0.1)
+            return "ok"
+
+        assert await call() == "ok"
+
+    async def test_raises_non_retryable_errors(self) -> None:
+        """Should stop hedging on exceptions that are not retried."""
+
+        @retry(hedges=1, hedge_delay=0.01, exceptions=(ConnectionError,))
+        async def call() -> str:
+            raise KeyError("missing")
+
+        with pytest.raises(KeyError):
+            await call()
+
+    def test_requires_coroutine_function(self) -> None:
+        """Should reject hedging of sync functions."""
+        with pytest.raises(ValueError):
+            retry(hedges=1)(lambda: None)
+
+
+class TestLimitConcurrency:
+    """Tests for bulkheads and the limit_concurrency decorator."""
+
+    def test_bounds_threads(self) -> None:
+        """Should never run more calls at once than the limit."""
+        running = peak = 0
+        lock = threading.Lock()
+
+        @limit_concurrency(2, registry=MetricsRegistry())
+        def work() -> None:
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.02)
+            with lock:
+                running -= 1
+
+        threads = [threading.Thread(target=work) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert peak == 2
+
+    async def test_bounds_coroutines(self) -> None:
+        """Should queue coroutines beyond the limit and run them in order."""
+        order: list[int] = []
+        bulkhead = Bulkhead(2, registry=MetricsRegistry())
+
+        @limit_concurrency(bulkhead)
+        async def work(n: int) -> int:
+            order.append(n)
+            assert bulkhead.in_flight <= 2
+            await asyncio.sleep(0.01)
+            return n
+
+        assert await asyncio.gather(*(work(n) for n in range(6))) == list(range(6))
+        assert order == list(range(6))
+        assert bulkhead.in_flight == 0
+
+    async def test_rejects_when_queue_full(self) -> None:
+        """Should shed calls once the queue is full."""
+        registry = MetricsRegistry()
+        bulkhead = Bulkhead(1, max_queue=1, name="db", registry=registry)
+        gate = asyncio.Event()
+
+        @limit_concurrency(bulkhead)
+        async def work() -> None:
+            await gate.wait()
+
+        running = asyncio.gather(work(), work())
+        await asyncio.sleep(0)
+        assert bulkhead.queue_depth == 1
+        assert registry.gauge("bulkhead_queue_depth", bulkhead="db").value == 1
+        with pytest.raises(BulkheadFullError, match="queue full"):
+            await work()
+        gate.set()
+        await running
+        assert registry.counter("bulkhead_rejected", bulkhead="db").snapshot().value == 1
+
+    def test_rejects_after_queue_timeout(self) -> None:
+        """Should give up on threads that waited too long."""
+        bulkhead = Bulkhead(1, queue_timeout=0.01, registry=MetricsRegistry())
+        bulkhead.acquire()
+        with pytest.raises(BulkheadFullError, match="queue timeout"):
+            bulkhead.acquire()
+        assert bulkhead.queue_depth == 0
+        bulkhead.release()
+        bulkhead.acquire()
+
+    async def test_cancelled_waiter_leaves_queue(self) -> None:
+        """Should drop cancelled coroutines from the queue."""
+        bulkhead = Bulkhead(1, registry=MetricsRegistry())
+        await bulkhead.acquire_async()
+        waiter = asyncio.ensure_future(bulkhead.acquire_async())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert bulkhead.queue_depth == 0
+        bulkhead.release()
+        assert bulkhead.in_flight == 0
+
+    def test_aimd_limit(self) -> None:
+        """Should grow additively and back off multiplicatively."""
+        limit = AIMDLimit(10, latency_threshold=1.0)
+        assert limit.update(0.1, in_flight=5, dropped=False) == 11
+        assert limit.update(0.1, in_flight=1, dropped=False) == 11
+        assert limit.update(2.0, in_flight=5, dropped=False) == 9
+        assert limit.update(0.1, in_flight=5, dropped=True) == 8
+
+    def test_gradient_limit(self) -> None:
+        """Should grow while latency is stable and shrink when it rises."""
+        limit = GradientLimit(10)
+        for _ in range(20):
+            limit.update(0.01, in_flight=limit.limit, dropped=False)
+        grown = limit.limit
+        assert grown > 10
+        for _ in range(20):
+            limit.update(0.5, in_flight=limit.limit, dropped=False)
+        assert limit.limit < grown
+
+    def test_adaptive_bulkhead_follows_limit(self) -> None:
+        """Should resize the bulkhead as the adaptive limit changes."""
+        registry = MetricsRegistry()
+        bulkhead = Bulkhead(AIMDLimit(4), name="api", registry=registry)
+        bulkhead.acquire()
+        bulkhead.release(0.1, dropped=True)
+        assert bulkhead.limit == 3
+        assert registry.gauge("bulkhead_limit", bulkhead="api").value == 3
+
+    def test_renders_gauges(self) -> None:
+        """Should export gauges in the Prometheus format."""
+        registry = MetricsRegistry()
+        registry.gauge("queue_depth", queue="q").set(3)
+        exporter = PrometheusExporter()
+        registry.export(exporter)
+        assert exporter.text == '# TYPE queue_depth gauge\nqueue_depth{queue="q"} 3\n'
+
+
+class TestRateLimit:
+    """Tests for rate limiters and the rate_limit decorator."""
+
+    def test_token_bucket_allows_burst_then_refills(self) -> None:
+        """Should allow a burst, then one call per refill interval."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, burst=3, clock=clock)
+        assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert bucket.acquire() == pytest.approx(0.5)
+        clock.advance(0.5)
+        assert bucket.acquire() == 0.0
+        assert bucket.acquire(cost=2) == pytest.approx(1.0)
+
+    def test_token_bucket_admits_full_cost_at_large_clock_values(self) -> None:
+        """Should not reject a call for a rounding error in the clock."""
+        clock = FakeClock()
+        clock.now = 1.7e9
+        bucket = TokenBucket(rate=50, burst=1, clock=clock)
+        assert bucket.acquire() == 0.0
+        assert bucket.acquire() == pytest.approx(0.02)
+        clock.advance(0.02)
+        assert bucket.acquire() == 0.0
+
+    def test_token_bucket_keys_are_independent(self) -> None:
+        """Should keep a separate quota per key and bound the key table."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1, burst=1, max_keys=2, clock=clock)
+        assert bucket.acquire("a") == 0.0
+        assert bucket.acquire("b") == 0.0
+        assert bucket.acquire("a") > 0
+        clock.advance(1)
+        assert bucket.acquire("c") == 0.0
+        assert len(bucket._tats) <= 2
+
+    def test_sliding_window_counter_weights_previous_window(self) -> None:
+        """Should count the overlapping part of the previous window."""
+        clock = FakeClock()
+        limiter = SlidingWindowCounter(limit=10, window=1.0, clock=clock)
+        for _ in range(10):
+            assert limiter.acquire() == 0.0
+        assert limiter.acquire() == pytest.approx(1.0)
+        clock.advance(1.5)  # half of the previous window still counts
+        assert [limiter.acquire() for _ in range(5)] == [0.0] * 5
+        assert limiter.acquire() == pytest.approx(0.1)
+
+    def test_sliding_window_log_is_exact(self) -> None:
+        """Should admit a call once the oldest one leaves the window."""
+        clock = FakeClock()
+        limiter = SlidingWindowLog(limit=2, window=1.0, clock=clock)
+        assert limiter.acquire("k") == 0.0
+        clock.advance(0.4)
+        assert limiter.acquire("k") == 0.0
+        assert limiter.acquire("k") == pytest.approx(0.6)
+        clock.advance(0.6)
+        assert limiter.acquire("k") == 0.0
+
+    def test_shared_bucket_spans_processes(self, tmp_path: Path) -> None:
+        """Should charge tokens taken by another process."""
+        path = tmp_path / "buckets"
+        bucket = SharedTokenBucket(path, rate=1, burst=5, slots=16)
+        process = multiprocessing.get_context("fork").Process(
+            target=_drain_shared_bucket, args=(path,)
+        )
+        process.start()
+        process.join(timeout=10)
+        assert bucket.acquire("tenant") > 0
+        assert bucket.acquire("other") == 0.0
+        bucket.close()
+
+    def test_imports_without_fcntl(self, tmp_path: Path) -> None:
+        """Should import the package where fcntl is missing."""
+        code = (
+            "import sys; sys.modules['fcntl'] = None\n"
+            "import monorepo_core\n"
+            "from monorepo_core.ratelimit import SharedTokenBucket\n"
+            "try:\n"
+            f"    SharedTokenBucket({str(tmp_path / 'buckets')!r}, rate=1)\n"
+            "except ImportError as e:\n"
+            "    print(e)\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+            check=True,
+        )
+        assert "SharedTokenBucket requires POSIX file locking" in result.stdout
+
+    def test_rejects_over_limit(self) -> None:
+        """Should raise with the quota key and retry-after."""
+        clock = FakeClock()
+
+        @rate_limit(TokenBucket(rate=1, burst=1, clock=clock), key=lambda tenant: tenant)
+        def handle(tenant: str) -> str:
+            return tenant
+
+        assert handle("a") == "a"
+        assert handle("b") == "b"
+        with pytest.raises(RateLimitError) as excinfo:
+            handle("a")
+        assert excinfo.value.details == {"retry_after": 1.0, "key": "a"}
+
+    def test_waits_for_capacity(self) -> None:
+        """Should sleep until the limiter admits the call."""
+        limited = rate_limit(TokenBucket(rate=50, burst=1), wait=True)(lambda: 1)
+        started = time.perf_counter()
+        assert [limited() for _ in range(3)] == [1, 1, 1]
+        assert time.perf_counter() - started >= 0.035
+
+    @pytest.mark.parametrize(
+        "limiter",
+        [
+            TokenBucket(rate=10, burst=2),
+            SlidingWindowCounter(limit=2, window=1.0),
+            SlidingWindowLog(limit=2, window=1.0),
+        ],
+        ids=["bucket", "counter", "log"],
+    )
+    def test_rejects_cost_above_capacity(self, limiter: RateLimiter) -> None:
+        """Should fail rather than wait forever for a cost that never fits."""
+        assert limiter.acquire(cost=3) == math.inf
+        limited = rate_limit(limiter, cost=3, wait=True)(lambda: 1)
+        with pytest.raises(ValueError, match="exceeds"):
+            limited()
+
+    async def test_waits_for_capacity_async(self) -> None:
+        """Should suspend coroutines and respect max_wait."""
+
+        @rate_limit(TokenBucket(rate=50, burst=1), wait=True, max_wait=0.05)
+        async def call() -> int:
+            return 1
+
+        assert await asyncio.gather(call(), call()) == [1, 1]
+        with pytest.raises(RateLimitError):
+            await asyncio.gather(*(call() for _ in range(5)))
+
+
+class TestBatched:
+    """Tests for batch loading."""
+
+    @staticmethod
+    def _recorder() -> tuple[list[list[int]], Callable[[list[int]], object]]:
+        calls: list[list[int]] = []
+
+        async def load(ids: list[int]) -> list[int | BaseException]:
+            calls.append(ids)
+            return [ValueError(f"bad {i}") if i < 0 else i * 10 for i in ids]
+
+        return calls, load
+
+    async def test_coalesces_concurrent_loads(self) -> None:
+        """Should issue one bulk call for loads made in the same tick."""
+        calls, load = self._recorder()
+        loader = batched()(load)
+        assert await asyncio.gather(loader(1), loader(2), loader(1)) == [10, 20, 10]
+        assert calls == [[1, 2]]
+        assert loader.__name__ == "load"
+
+    async def test_splits_at_max_batch_size(self) -> None:
+        """Should dispatch a batch as soon as it is full."""
+        calls, load = self._recorder()
+        loader = BatchLoader(load, max_batch_size=2)
+        assert await loader.load_many([1, 2, 3, 4, 5]) == [10, 20, 30, 40, 50]
+        assert calls == [[1, 2], [3, 4], [5]]
+
+    async def test_max_wait_collects_across_awaits(self) -> None:
+        """Should keep the batch open for max_wait seconds."""
+        calls, load = self._recorder()
+        loader = BatchLoader(load, max_wait=0.05)
+
+        async def later(key: int) -> int:
+            await asyncio.sleep(0.01)
+            return await loader(key)
+
+        assert await asyncio.gather(loader(1), later(2)) == [10, 20]
+        assert calls == [[1, 2]]
+
+    async def test_fails_only_the_erroring_key(self) -> None:
+        """Should deliver per-key exceptions to their callers only."""
+        _, load = self._recorder()
+        loader = BatchLoader(load)
+        results = await asyncio.gather(loader(1), loader(-1), return_exceptions=True)
+        assert results[0] == 10
+        assert isinstance(results[1], ValueError)
+
+    async def test_fails_whole_batch_on_error(self) -> None:
+        """Should fail every caller when the bulk call fails or misbehaves."""
+
+        async def short(ids: list[int]) -> list[int]:
+            return ids[:1]
+
+        with pytest.raises(ValueError, match="1 results for 2 keys"):
+            await BatchLoader(short).load_many([1, 2])
+
+    async def test_accepts_mapping_results(self) -> None:
+        """Should resolve keys missing from a mapping to None."""
+
+        async def load(ids: list[str]) -> dict[str, int]:
+            return {"a": 1}
+
+        loader: BatchLoader[str, int | None] = BatchLoader(load)
+        assert await loader.load_many(["a", "b"]) == [1, None]
+
+    async def test_caches_successes_only(self) -> None:
+        """Should reuse cached results across batches, but retry failures."""
+        calls, load = self._recorder()
+        loader = BatchLoader(load, cache=True)
+        assert await loader(1) == 10
+        with pytest.raises(ValueError):
+            await loader(-1)
+        assert await loader(1) == 10
+        with pytest.raises(ValueError):
+            await loader(-1)
+        loader.prime(2, 99)
+        assert await loader(2) == 99
+        loader.clear(1)
+        assert await loader(1) == 10
+        assert calls == [[1], [-1], [-1], [1]]
+
+    async def test_cancelling_one_caller_keeps_others(self) -> None:
+        """Should not cancel the shared load when one waiter is cancelled."""
+        calls, load = self._recorder()
+        loader = BatchLoader(load, max_wait=0.01)
+        first = asyncio.ensure_future(loader(1))
+        second = asyncio.ensure_future(loader(1))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == 10
+        assert calls == [[1]]
+
+    async def test_cancelled_load_releases_callers(self) -> None:
+        """Should cancel waiting callers, uncached, when the bulk call is cancelled."""
+        calls: list[list[int]] = []
+
+        async def load(ids: list[int]) -> list[int]:
+            calls.append(ids)
+            if len(calls) == 1:
+                raise asyncio.CancelledError
+            return [i * 10 for i in ids]
+
+        loader = BatchLoader(load, cache=True)
+        results = await asyncio.wait_for(
+            asyncio.gather(loader(1), loader(2), return_exceptions=True), timeout=1
+        )
+        assert all(isinstance(result, asyncio.CancelledError) for result in results)
+        assert await loader.load_many([1, 2]) == [10, 20]
+
+
+@dataclass
+class Item:
+    """Entity used by the repository tests."""
+
+    id: int
+    name: str | None
+
+
+class DictRepository(BaseRepository[Item, int]):
+    """Repository implementing only the abstract single-entity methods."""
+
+    def __init__(self) -> None:
+        self.items: dict[int, Item] = {}
+
+    async def get(self, id: int) -> Item | None:
+        return self.items.get(id)
+
+    async def get_all(self) -> list[Item]:
+        return list(self.items.values())
+
+    async def create(self, entity: Item) -> Item:
+        self.items[entity.id] = entity
+        return entity
+
+    async def update(self, id: int, entity: Item) -> Item | None:
+        if id not in self.items:
+            return None
+        self.items[id] = entity
+        return entity
+
+    async def delete(self, id: int) -> bool:
+        return self.items.pop(id, None) is not None
+
+    async def exists(self, id: int) -> bool:
+        return id in self.items
+
+
+class TestBaseRepository:
+    """Tests for the default bulk and streaming operations."""
+
+    @staticmethod
+    async def _filled(count: int) -> DictRepository:
+        repository = DictRepository()
+        await repository.create_many(Item(i, f"item-{i}") for i in range(count))
+        return repository
+
+    async def test_bulk_reads_and_writes(self) -> None:
+        """Should apply each bulk operation entity by entity."""
+        repository = await self._filled(3)
+        assert [item and item.id for item in await repository.get_many([2, 9, 0])] == [
+            2,
+            None,
+            0,
+        ]
+        updated = await repository.update_many({1: Item(1, "one"), 7: Item(7, "seven")})
+        assert updated == [Item(1, "one"), None]
+        assert await repository.delete_many([0, 7, 2]) == 2
+        assert await repository.get_all() == [Item(1, "one")]
+
+    async def test_upsert_many(self) -> None:
+        """Should update existing entities and create missing ones."""
+        repository = await self._filled(1)
+        await repository.upsert_many({0: Item(0, "zero"), 5: Item(5, "five")})
+        assert repository.items == {0: Item(0, "zero"), 5: Item(5, "five")}
+
+    async def test_streams_in_chunks(self) -> None:
+        """Should yield chunks of chunk_size and every entity once."""
+        repository = await self._filled(5)
+        chunks = [[item.id for item in chunk] async for chunk in repository.stream(2)]
+        assert chunks == [[0, 1], [2, 3], [4]]
+        assert [item.id async for item in repository.iter_all(3)] == [0, 1, 2, 3, 4]
+
+    async def test_stream_loads_once_without_get_page(self) -> None:
+        """Should call get_all once rather than once per chunk."""
+        calls = 0
+
+        class CountingDictRepository(DictRepository):
+            async def get_all(self) -> list[Item]:
+                nonlocal calls
+                calls += 1
+                return await super().get_all()
+
+        repository = CountingDictRepository()
+        await repository.create_many(Item(i, "") for i in range(5))
+        assert len([chunk async for chunk in repository.stream(2)]) == 3
+        assert calls == 1
+
+    async def test_stream_uses_get_page(self) -> None:
+        """Should page through get_page instead of loading everything."""
+        pages: list[tuple[int, int]] = []
+
+        class PagedRepository(DictRepository):
+            async def get_page(self, offset: int, limit: int) -> list[Item]:
+                pages.append((offset, limit))
+                return [Item(i, "") for i in range(offset, min(offset + limit, 4))]
+
+            async def get_all(self) -> list[Item]:
+                raise AssertionError("stream must not materialize")
+
+        stream: AsyncIterator[Item] = PagedRepository().iter_all(2)
+        assert [item.id async for item in stream] == [0, 1, 2, 3]
+        assert pages == [(0, 2), (2, 2), (4, 2)]
+
+    async def test_paginates_by_cursor(self) -> None:
+        """Should walk every entity once, in sort order, page by page."""
+        repository = DictRepository()
+        names = ["delta", "alpha", "charlie", "alpha", "bravo"]
+        await repository.create_many(Item(i, name) for i, name in enumerate(names))
+        params = CursorParams(page_size=2, sort_by="name", sort_order="desc")
+        seen: list[tuple[str, int]] = []
+        while True:
+            page = await repository.paginate_by_cursor(params, secret="k")
+            seen.extend((item.name, item.id) for item in page.items)
+            if not page.has_next:
+                break
+            params = params.model_copy(update={"cursor": page.next_cursor})
+        assert seen == sorted(((name, i) for i, name in enumerate(names)), reverse=True)
+
+    @pytest.mark.parametrize(
+        ("sort_order", "expected"), [("asc", [2, 0, 1, 3]), ("desc", [3, 1, 0, 2])]
+    )
+    async def test_cursor_pages_sort_missing_values_last(
+        self, sort_order: str, expected: list[int]
+    ) -> None:
+        """Should order None sort values after all others instead of failing."""
+        repository = DictRepository()
+        await repository.create_many(Item(i, name) for i, name in enumerate(["b", None, "a", None]))
+        params = CursorParams(page_size=3, sort_by="name", sort_order=sort_order)
+        seen: list[int] = []
+        while True:
+            page = await repository.paginate_by_cursor(params)
+            seen.extend(item.id for item in page.items)
+            if not page.has_next:
+                break
+            params = params.model_copy(update={"cursor": page.next_cursor})
+        assert seen == expected
+
+    async def test_rejects_invalid_chunk_size(self) -> None:
+        """Should require a positive chunk size."""
+        with pytest.raises(ValueError):
+            await anext(DictRepository().stream(0))
+
+
+@dataclass(frozen=True)
+class Person:
+    """Entity used by the in-memory repository tests."""
+
+    id: int
+    team: str
+    age: int | None
+
+
+class TestInMemoryRepository:
+    """Tests for InMemoryRepository."""
+
+    @staticmethod
+    def _people(**indexes: tuple[str, ...]) -> InMemoryRepository[Person, int]:
+        people = [Person(i, "ab"[i % 2], None if i == 3 else 20 + i % 5) for i in range(10)]
+        return InMemoryRepository(people, **indexes)
+
+    @pytest.mark.parametrize(
+        "indexes",
+        [{}, {"hash_indexes": ("team",), "sorted_indexes": ("age",)}],
+        ids=["scan", "indexed"],
+    )
+    async def test_finds_by_compound_conditions(self, indexes: dict[str, tuple[str, ...]]) -> None:
+        """Should return the same matches with or without indexes."""
+        repository = self._people(**indexes)
+        found = await repository.find(team="a", age=Range(21, 23))
+        assert sorted(person.id for person in found) == [2, 6, 8]
+        assert await repository.count(age=Range(high=21, high_inclusive=False)) == 2
+        assert await repository.count(age=24) == 2
+        assert [person.id for person in await repository.find(age=None)] == [3]
+        assert await repository.count(age=None, team="b") == 1
+
+    async def test_keeps_indexes_in_step_with_writes(self) -> None:
+        """Should reflect updates and deletes in index lookups."""
+        repository = self._people(hash_indexes=("team",), sorted_indexes=("age",))
+        await repository.update(0, Person(0, "c", 99))
+        await repository.delete(1)
+        assert [person.id for person in await repository.find(team="c")] == [0]
+        assert [person.id for person in await repository.find(age=Range(low=90))] == [0]
+        assert await repository.count(team="b") == 4
+        with pytest.raises(ConflictError):
+            await repository.create(Person(2, "a", 1))
+
+    async def test_paginates_by_sort_field(self) -> None:
+        """Should order pages by the sort field, then ID, missing values last."""
+        repository = self._people(sorted_indexes=("age",))
+        params = PaginationParams(page=2, page_size=3, sort_by="age", sort_order="desc")
+        page = await repository.paginate(params)
+        assert page.total == 10
+        assert [person.id for person in page.items] == [8, 7, 2]
+        filtered = await repository.paginate(params.model_copy(update={"page": 1}), team="b")
+        assert [person.id for person in filtered.items] == [3, 9, 7]
+
+    async def test_cursor_pages_use_sorted_index(self) -> None:
+        """Should serve keyset pages from the sorted index."""
+        repository = self._people(sorted_indexes=("age",))
+        params = CursorParams(page_size=4, sort_by="age")
+        seen: list[int] = []
+        while True:
+            page = await repository.paginate_by_cursor(params)
+            seen.extend(person.id for person in page.items)
+            if not page.has_next:
+                break
+            params = params.model_copy(update={"cursor": page.next_cursor})
+        assert seen == [0, 5, 1, 6, 2, 7, 8, 4, 9, 3]
+
+    async def test_streams_a_consistent_view(self) -> None:
+        """Should stream every entity once, unaffected by writes meanwhile."""
+        repository = self._people()
+        seen: list[int] = []
+        async for chunk in repository.stream(4):
+            seen.extend(person.id for person in chunk)
+            await repository.delete(9)
+            await repository.create(Person(10 + len(seen), "a", 1))
+        assert seen == list(range(10))
+
+    async def test_snapshot_is_isolated_from_writes(self) -> None:
+        """Should keep showing the entities as they were when taken."""
+        repository = self._people(hash_indexes=("team",))
+        snapshot = repository.snapshot()
+        await repository.delete(0)
+        await repository.create(Person(10, "a", 30))
+        assert len(snapshot) == 10
+        assert snapshot.get(0) == Person(0, "a", 20)
+        assert 10 not in snapshot
+        assert len(snapshot.find(team="a")) == 5
+        assert len(await repository.find(team="a")) == 5
+        assert await repository.get(10) is not None
+
+
+class CountingRepository(InMemoryRepository[Person, int]):
+    """In-memory repository recording the bulk calls it receives."""
+
+    def __init__(self, entities: Iterable[Person] = ()) -> None:
+        super().__init__(entities)
+        self.calls: list[tuple[str, list[int]]] = []
+
+    async def get_many(self, ids: Iterable[int]) -> list[Person | None]:
+        ids = list(ids)
+        self.calls.append(("get_many", ids))
+        return await super().get_many(ids)
+
+    async def create_many(self, entities: Iterable[Person]) -> list[Person]:
+        entities = list(entities)
+        self.calls.append(("create_many", [person.id for person in entities]))
+        return await super().create_many(entities)
+
+    async def update_many(self, entities: Mapping[int, Person]) -> list[Person | None]:
+        self.calls.append(("update_many", list(entities)))
+        return await super().update_many(entities)
+
+
+class TestCachedRepository:
+    """Tests for CachedRepository."""
+
+    async def test_reads_through_and_coalesces_misses(self) -> None:
+        """Should load concurrent misses with one get_many and cache them."""
+        backend = CountingRepository([Person(1, "a", 20), Person(2, "b", 30)])
+        repository = CachedRepository(backend)
+        first, second, missing = await asyncio.gather(
+            repository.get(1), repository.get(2), repository.get(9)
+        )
+        assert (first, second, missing) == (Person(1, "a", 20), Person(2, "b", 30), None)
+        assert await repository.get_many([2, 9, 1]) == [second, None, first]
+        assert not await repository.exists(9)
+        assert backend.calls == [("get_many", [1, 2, 9])]
+
+    async def test_invalidates_on_write(self) -> None:
+        """Should stop serving an entity once it is updated or deleted."""
+        backend = CountingRepository([Person(1, "a", 20)])
+        repository = CachedRepository(backend)
+        await repository.get(1)
+        await repository.update(1, Person(1, "a", 21))
+        assert await repository.get(1) == Person(1, "a", 21)
+        assert await repository.delete(1)
+        assert await repository.get(1) is None
+
+    async def test_write_behind_batches_until_flush(self) -> None:
+        """Should buffer writes, serve them, and write them in bulk."""
+        backend = CountingRepository([Person(1, "a", 20)])
+        repository = CachedRepository(backend, write_behind=True, flush_interval=60)
+        await repository.initialize()
+        await repository.create(Person(2, "b", 30))
+        await repository.create(Person(3, "b", 40))
+        assert await repository.update(1, Person(1, "a", 21)) is not None
+        assert await repository.update(7, Person(7, "a", 1)) is None
+        with pytest.raises(ConflictError):
+            await repository.create(Person(2, "c", 0))
+        assert await repository.get(3) == Person(3, "b", 40)
+        assert repository.pending == 3
+        assert len(backend) == 1
+        await repository.shutdown()
+        assert repository.pending == 0
+        assert ("create_many", [2, 3]) in backend.calls
+        assert ("update_many", [1]) in backend.calls
+        assert await backend.get(1) == Person(1, "a", 21)
+
+    async def test_write_behind_flushes_when_full(self) -> None:
+        """Should flush as soon as max_pending entities are buffered."""
+        backend = CountingRepository()
+        repository = CachedRepository(backend, write_behind=True, max_pending=2)
+        await repository.create_many(Person(i, "a", i) for i in range(5))
+        assert len(backend) == 4
+        assert repository.pending == 1
+        assert len(await repository.get_all()) == 5
+
+    async def test_failed_flush_keeps_writes(self) -> None:
+        """Should keep entities buffered when the bulk write fails."""
+
+        class FailingRepository(CountingRepository):
+            async def create(self, entity: Person) -> Person:
+                raise ConnectionError("store unavailable")
+
+            async def create_many(self, entities: Iterable[Person]) -> list[Person]:
+                raise ConnectionError("store unavailable")
+
+        repository = CachedRepository(FailingRepository(), write_behind=True)
+        await repository.create(Person(1, "a", 1))
+        with pytest.raises(ConnectionError):
+            await repository.flush()
+        assert repository.pending == 1
+        assert await repository.get(1) == Person(1, "a", 1)
+
+    async def test_partial_bulk_create_does_not_resend_written_rows(self) -> None:
+        """Should create entities one by one when a bulk create fails midway."""
+
+        class PartialRepository(CountingRepository):
+            async def create_many(self, entities: Iterable[Person]) -> list[Person]:
+                await self.create(next(iter(entities)))
+                raise ConnectionError("connection reset")
+
+        backend = PartialRepository([Person(3, "c", 3)])
+        repository = CachedRepository(backend, write_behind=True)
+        await repository.create(Person(1, "a", 1))
+        await repository.create(Person(2, "b", 2))
+        await repository.update(3, Person(3, "c", 4))
+        await repository.flush()
+        assert repository.pending == 0
+        assert await backend.get_many([1, 2, 3]) == [
+            Person(1, "a", 1),
+            Person(2, "b", 2),
+            Person(3, "c", 4),
+        ]
+
+    async def test_write_through_does_not_cache_rows_read_during_writes(self) -> None:
+        """Should not keep serving a row a load read while it was rewritten."""
+
+        class SlowRepository(CountingRepository):
+            async def update(self, id: int, entity: Person) -> Person | None:
+                await asyncio.sleep(0.01)
+                return await super().update(id, entity)
+
+            async def delete(self, id: int) -> bool:
+                await asyncio.sleep(0.01)
+                return await super().delete(id)
+
+        repository = CachedRepository(SlowRepository([Person(1, "a", 1), Person(2, "b", 2)]))
+        update = asyncio.ensure_future(repository.update(1, Person(1, "a", 5)))
+        delete = asyncio.ensure_future(repository.delete(2))
+        await asyncio.sleep(0)
+        assert await repository.get_many([1, 2]) == [Person(1, "a", 1), Person(2, "b", 2)]
+        await asyncio.gather(update, delete)
+        assert await repository.get_many([1, 2]) == [Person(1, "a", 5), None]
+
+    def test_keeps_an_empty_cache_passed_in(self) -> None:
+        """Should use the given cache even though it is empty and so falsy."""
+        cache = Cache(max_entries=5)
+        assert CachedRepository(CountingRepository(), cache=cache).cache is cache
+
+
+class FakeConnection:
+    """Connection made by FakeConnectionFactory."""
+
+    def __init__(self, number: int) -> None:
+        self.number = number
+        self.healthy = True
+        self.closed = False
+
+
+class FakeConnectionFactory:
+    """Local stand-in for a database driver's connect/close functions."""
+
+    def __init__(self) -> None:
+        self.made: list[FakeConnection] = []
+
+    async def connect(self) -> FakeConnection:
+        await asyncio.sleep(0)
+        conn = FakeConnection(len(self.made))
+        self.made.append(conn)
+        return conn
+
+    async def close(self, conn: FakeConnection) -> None:
+        conn.closed = True
+
+    async def ping(self, conn: FakeConnection) -> bool:
+        return conn.healthy
+
+
+class TestConnectionPool:
+    """Tests for ConnectionPool."""
+
+    @staticmethod
+    def _pool(factory: FakeConnectionFactory, **options: Any) -> ConnectionPool[FakeConnection]:
+        return ConnectionPool(
+            factory.connect, close=factory.close, health_check=factory.ping, **options
+        )
+
+    async def test_opens_min_size_and_reuses_most_recent(self) -> None:
+        """Should prefill min_size connections and hand out the warmest first."""
+        factory = FakeConnectionFactory()
+        pool = self._pool(factory, min_size=2, max_size=3)
+        await pool.initialize()
+        assert pool.stats().idle == 2
+        async with pool.acquire() as first, pool.acquire() as second:
+            assert {first.number, second.number} == {0, 1}
+        async with pool.acquire() as conn:
+            assert conn is first
+        stats = pool.stats()
+        assert (stats.size, stats.in_use, stats.acquired, stats.created) == (2, 0, 3, 2)
+        await pool.shutdown()
+        assert all(conn.closed for conn in factory.made)
+
+    async def test_acquire_waits_then_times_out(self) -> None:
+        """Should queue callers at max_size and reject them after the timeout."""
+        pool = self._pool(FakeConnectionFactory(), min_size=0, max_size=1, acquire_timeout=0.05)
+
+        async def hold(seconds: float) -> int:
+            async with pool.acquire() as conn:
+                await asyncio.sleep(seconds)
+                return conn.number
+
+        assert await asyncio.gather(hold(0.01), hold(0)) == [0, 0]
+        holder = asyncio.ensure_future(hold(0.2))
+        await asyncio.sleep(0.01)
+        with pytest.raises(PoolExhaustedError):
+            await hold(0)
+        assert pool.stats().timeouts == 1
+        assert await holder == 0
+        assert pool.stats().waiting == 0
+
+    async def test_replaces_broken_and_unhealthy_connections(self) -> None:
+        """Should discard connections that failed in use or a health check."""
+        factory = FakeConnectionFactory()
+        pool = self._pool(factory, min_size=0, health_check_after=0)
+        with pytest.raises(ConnectionError):
+            async with pool.acquire():
+                raise ConnectionError("reset by peer")
+        async with pool.acquire() as conn:
+            conn.healthy = False
+        async with pool.acquire() as conn:
+            assert conn.number == 2
+        assert factory.made[0].closed and factory.made[1].closed
+        assert pool.stats().failed_health_checks == 1
+
+    async def test_closes_idle_connections_above_min_size(self) -> None:
+        """Should close connections idle for longer than idle_timeout."""
+        factory = FakeConnectionFactory()
+        pool = self._pool(factory, min_size=1, max_size=3, idle_timeout=0.02)
+        await pool.initialize()
+        async with pool.acquire(), pool.acquire(), pool.acquire():
+            pass
+        assert pool.stats().size == 3
+        await asyncio.sleep(0.05)
+        assert pool.stats().size == 1
+        await pool.shutdown()
+        with pytest.raises(PoolExhaustedError):
+            async with pool.acquire():
+                pass
+
+
+class RecordingService(BaseService):
+    """Service appending its lifecycle events to a shared log."""
+
+    def __init__(self, name: str, log: list[str], delay: float = 0.0, fail: bool = False) -> None:
+        self.name = name
+        self.log = log
+        self.delay = delay
+        self.fail = fail
+
+    async def initialize(self) -> None:
+        self.log.append(f"start {self.name}")
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} failed")
+        self.log.append(f"up {self.name}")
+
+    async def shutdown(self) -> None:
+        self.log.append(f"stop {self.name}")
+
+
+class TestServiceRegistry:
+    """Tests for ServiceRegistry."""
+
+    @staticmethod
+    def _registry(log: list[str], **overrides: dict[str, Any]) -> ServiceRegistry:
+        registry = ServiceRegistry(startup_timeout=1.0)
+        graph = {"db": (), "cache": (), "users": ("db", "cache"), "api": ("users",)}
+        for name, depends_on in graph.items():
+            service = RecordingService(name, log, delay=0.02, **overrides.get(name, {}))
+            registry.register(name, service, depends_on=depends_on)
+        return registry
+
+    async def test_starts_independent_services_concurrently(self) -> None:
+        """Should start dependencies first, siblings together, and stop in reverse."""
+        log: list[str] = []
+        registry = self._registry(log)
+        assert registry.startup_order() == [["db", "cache"], ["users"], ["api"]]
+        await registry.initialize()
+        assert log[:2] == ["start db", "start cache"]  # concurrently
+        assert log.index("start users") > max(log.index("up db"), log.index("up cache"))
+        assert set(registry.timings) == {"db", "cache", "users", "api"}
+        log.clear()
+        await registry.shutdown()
+        assert log[0] == "stop api"
+        assert log[1] == "stop users"
+        assert set(log[2:]) == {"stop db", "stop cache"}
+
+    async def test_rolls_back_when_a_service_fails(self) -> None:
+        """Should not start dependents and shut down what already started."""
+        log: list[str] = []
+        registry = self._registry(log, users={"fail": True})
+        with pytest.raises(RuntimeError, match="users failed"):
+            await registry.initialize()
+        assert "start api" not in log
+        assert {"stop db", "stop cache"} <= set(log)
+        assert "stop users" not in log
+
+    async def test_enforces_startup_timeout(self) -> None:
+        """Should fail a service that takes longer than its timeout."""
+        registry = ServiceRegistry()
+        registry.register("slow", RecordingService("slow", [], delay=1), startup_timeout=0.01)
+        with pytest.raises(TimeoutError, match="'slow' did not start"):
+            await registry.initialize()
+
+    def test_rejects_invalid_graphs(self) -> None:
+        """Should reject unknown dependencies and cycles."""
+        registry = ServiceRegistry()
+        registry.register("a", RecordingService("a", []), depends_on=["b"])
+        with pytest.raises(ValueError, match="unknown"):
+            registry.startup_order()
+        registry.register("b", RecordingService("b", []), depends_on=["a"])
+        with pytest.raises(ValueError, match="cycle"):
+            registry.startup_order()
+
+
+@entity
+class Reading:
+    """Slotted entity used by the entity tests."""
+
+    id: int
+    sensor: str
+    value: float
+    count: int
+
+
+class TestEntities:
+    """Tests for slotted entities and EntityBatch."""
+
+    def test_base_entity_has_no_instance_dict(self) -> None:
+        """Should keep the ID in a slot."""
+        assert not hasattr(BaseEntity(1), "__dict__")
+        assert BaseEntity(1) == BaseEntity(1)
+
+    def test_entity_is_slotted_and_compared_by_id(self) -> None:
+        """Should declare a slotted dataclass with ID-based equality."""
+        reading = Reading(1, "t1", 20.5, 3)
+        assert not hasattr(reading, "__dict__")
+        assert reading == Reading(1, "t2", 0.0, 0)
+        assert len({reading, Reading(1, "t3", 1.0, 1)}) == 1
+        with pytest.raises(ValueError, match="no 'id' field"):
+            entity(type("NoId", (), {"__annotations__": {"name": str}}))
+
+    def test_batch_stores_columns_and_materializes_rows(self) -> None:
+        """Should store numeric fields in arrays and rebuild equal entities."""
+        readings = [Reading(i, f"s{i % 3}", i / 2, i * 10) for i in range(100)]
+        batch = EntityBatch(Reading, readings)
+        assert len(batch) == 100
+        assert batch.fields == ("id", "sensor", "value", "count")
+        assert isinstance(batch.column("value"), array)
+        assert sum(batch.column("count")) == sum(r.count for r in readings)
+        assert batch[-1].value == 49.5
+        assert [(r.id, r.sensor, r.value, r.count) for r in batch] == [
+            (r.id, r.sensor, r.value, r.count) for r in readings
+        ]
+
+    def test_batch_rebuilds_base_entity_subclasses(self) -> None:
+        """Should pass the _id slot back to the constructor as id."""
+
+        class User(BaseEntity):
+            __slots__ = ("name",)
+
+            def __init__(self, id: int, name: str) -> None:
+                super().__init__(id)
+                self.name = name
+
+        batch = EntityBatch(User, [User(1, "a"), User(2, "b")])
+        assert batch.fields == ("id", "name")
+        assert isinstance(batch.column("id"), array)
+        assert batch[0] == User(1, "a")
+        assert [(user.id, user.name) for user in batch] == [(1, "a"), (2, "b")]
+
+    def test_batch_rejects_entities_with_unstored_state(self) -> None:
+        """Should refuse classes whose fields would not all be stored."""
+
+        class User(BaseEntity):
+            def __init__(self, id: int, name: str) -> None:
+                super().__init__(id)
+                self.name = name
+
+        class Account(BaseEntity):
+            __slots__ = ("owner",)
+
+            def __init__(self, id: int, owner: str, currency: str = "EUR") -> None:
+                super().__init__(id)
+                self.owner = owner
+
+        with pytest.raises(TypeError, match="__dict__"):
+            EntityBatch(User, [User(1, "alice"), User(2, "bob")])
+        with pytest.raises(TypeError, match="'currency'"):
+            EntityBatch(Account)
+
+    def test_batch_falls_back_to_list_for_unfit_values(self) -> None:
+        """Should keep values that do not fit a typed array."""
+        batch = EntityBatch(Reading, [Reading(1, "a", 1.0, 1)])
+        batch.append(Reading(2, "b", 2.0, 2**70))
+        assert isinstance(batch.column("count"), list)
+        assert batch[1].count == 2**70
+        assert batch[0].count == 1
@@ -1,13 +1,25 @@
 """Unit tests for monorepo-shared package."""
 
+import base64
+import uuid
+from datetime import UTC, date, datetime
+from decimal import Decimal
+
 import pytest
 
 from monorepo_shared import (
     BaseError,
+    BulkheadFullError,
+    CircuitOpenError,
+    Cursor,
+    CursorPaginated,
+    CursorParams,
     Failure,
     NotFoundError,
     Paginated,
     PaginationParams,
+    PoolExhaustedError,
+    RateLimitError,
     Success,
     ValidationError,
 )
@@ -77,6 +89,50 @@ class TestValidationError:
         assert error.details["field"] == "email"
 
 
+class TestCircuitOpenError:
+    """Tests for CircuitOpenError class."""
+
+    def test_creates_error_with_dependency(self) -> None:
+        """Should name the dependency and when to retry."""
+        error = CircuitOpenError("payments", retry_after=2.5)
+        assert error.message == "Circuit for 'payments' is open"
+        assert error.code == "CIRCUIT_OPEN"
+        assert error.details == {"dependency": "payments", "retry_after": 2.5}
+
+
+class TestBulkheadFullError:
+    """Tests for BulkheadFullError class."""
+
+    def test_creates_error_with_reason(self) -> None:
+        """Should name the bulkhead and why the call was shed."""
+        error = BulkheadFullError("db", reason="queue timeout")
+        assert error.message == "Bulkhead 'db' rejected the call: queue timeout"
+        assert error.code == "BULKHEAD_FULL"
+        assert error.details == {"bulkhead": "db", "reason": "queue timeout"}
+
+
+class TestPoolExhaustedError:
+    """Tests for PoolExhaustedError class."""
+
+    def test_creates_error_with_timeout(self) -> None:
+        """Should name the pool and how long the caller waited."""
+        error = PoolExhaustedError("db", timeout=2.0)
+        assert error.message == "No connection available from pool 'db'"
+        assert error.code == "POOL_EXHAUSTED"
+        assert error.details == {"pool": "db", "timeout": 2.0}
+
+
+class TestRateLimitError:
+    """Tests for RateLimitError class."""
+
+    def test_creates_error_with_retry_after(self) -> None:
+        """Should say when to retry and which quota was exceeded."""
+        error = RateLimitError(1.5, key="tenant-1")
+        assert error.message == "Rate limit exceeded, retry after 1.500s"
+        assert error.code == "RATE_LIMITED"
+        assert error.details == {"retry_after": 1.5, "key": "tenant-1"}
+
+
 class TestResult:
     """Tests for Result type."""
 
@@ -157,3 +213,73 @@ class TestPaginated:
         params = PaginationParams(page=2, page_size=10)
         result = Paginated.create(items=[], total=25, params=params)
         assert result.has_previous is True
+
+
+def _b64(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).rstrip(b"=").decode()
+
+
+class TestCursor:
+    """Tests for Cursor and cursor pagination types."""
+
+    def test_round_trips(self) -> None:
+        """Should decode what it encoded."""
+        cursor = Cursor(("alice", 42), sort_by="name", sort_order="desc")
+        token = cursor.encode()
+        assert "alice" not in token
+        assert Cursor.decode(token) == cursor
+
+    def test_rejects_tampered_signed_cursor(self) -> None:
+        """Should verify the signature when a secret is used."""
+        token = Cursor((1,)).encode(secret="s3cret")
+        assert Cursor.decode(token, secret="s3cret") == Cursor((1,))
+        forged = Cursor((999,)).encode() + "." + token.partition(".")[2]
+        with pytest.raises(ValidationError):
+            Cursor.decode(forged, secret="s3cret")
+        with pytest.raises(ValidationError):
+            Cursor.decode(token, secret="other")
+
+    def test_rejects_garbage(self) -> None:
+        """Should raise a validation error for malformed tokens."""
+        with pytest.raises(ValidationError):
+            Cursor.decode("not-a-cursor!")
+        with pytest.raises(ValidationError):
+            Cursor.decode(_b64('[5,null,"asc"]'))
+        with pytest.raises(ValidationError):
+            Cursor.decode(_b64('[[{"$decimal":"nope"}],null,"asc"]'))
+
+    def test_round_trips_rich_sort_keys(self) -> None:
+        """Should keep datetime, date, Decimal and UUID values and their types."""
+        values = (
+            datetime(2024, 5, 1, 12, 30, tzinfo=UTC),
+            date(2024, 5, 1),
+            Decimal("1.10"),
+            uuid.UUID(int=7),
+            {"plain": "dict"},
+        )
+        assert Cursor.decode(Cursor(values).encode()).values == values
+
+    def test_rejects_unencodable_values(self) -> None:
+        """Should raise a validation error for values it cannot encode."""
+        with pytest.raises(ValidationError):
+            Cursor((object(),)).encode()
+
+    def test_params_check_sort(self) -> None:
+        """Should reject cursors issued for another sort."""
+        token = Cursor((1,), sort_by="name").encode()
+        assert CursorParams(cursor=token, sort_by="name").decode_cursor() == Cursor((1,), "name")
+        assert CursorParams().decode_cursor() is None
+        with pytest.raises(ValidationError):
+            CursorParams(cursor=token, sort_by="created_at").decode_cursor()
+
+    def test_creates_page_with_next_cursor(self) -> None:
+        """Should use the extra item only to detect a next page."""
+        params = CursorParams(page_size=2)
+        page = CursorPaginated.create([1, 2, 3], params, lambda item: (item,))
+        assert page.items == [1, 2]
+        assert page.has_next is True
+        assert page.next_cursor is not None
+        assert Cursor.decode(page.next_cursor).values == (2,)
+        last = CursorPaginated.create([4], params, lambda item: (item,), total=4)
+        assert last.has_next is False
+        assert last.total == 4